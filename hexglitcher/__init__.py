@@ -0,0 +1,103 @@
+"""
+HexGlitcher core package.
+
+The modules in this package are headless: they only depend on the standard
+library (and Pillow where decoding is required) so they can be imported on
+render servers, in worker processes and in benchmarks without a display.
+The Tkinter GUI in ``main.py`` is a thin layer on top of this API.
+"""
+
+from .buffer import CowBuffer, map_file, mapped_file
+from .cache import ImageCache, content_key, thumbnail_cache
+from .explore import Exploration, glitch_variant
+from .formats import RegionMap, RegionTracker, detect_format, index_regions
+from .patch import PatchSet
+from .patterns import PATTERN_KINDS, compile_pattern, match_length
+from .pixel import PIXEL_EFFECTS, apply_pixel_effect
+from .png import glitch_png, iter_glitched_png
+from .recipe import Recipe, load_recipe, replay, save_recipe
+from .sequence import run_sequence
+from .stream import stream_glitch
+from .validity import decode_error, precheck, retry_until_decodable
+from .engine import (
+    ALLOWED_EXTENSIONS,
+    BACKENDS,
+    DEFAULT_HEADER_SIZE,
+    DEFAULT_INTENSITY,
+    GLITCH_MODES,
+    MAX_FILE_SIZE,
+    MAX_MAPPED_FILE_SIZE,
+    SYSTEM_DIRS,
+    apply_edits,
+    check_output_path,
+    find_replace,
+    find_spans,
+    load_bytes,
+    load_mapped,
+    new_seed,
+    parse_hex,
+    parse_offset,
+    random_edits,
+    random_glitch,
+    replace_matches,
+    replace_spans,
+    save_bytes,
+    select_spans,
+    split_safe,
+)
+
+__all__ = [
+    "ALLOWED_EXTENSIONS",
+    "BACKENDS",
+    "DEFAULT_HEADER_SIZE",
+    "DEFAULT_INTENSITY",
+    "GLITCH_MODES",
+    "MAX_FILE_SIZE",
+    "MAX_MAPPED_FILE_SIZE",
+    "PATTERN_KINDS",
+    "PIXEL_EFFECTS",
+    "SYSTEM_DIRS",
+    "CowBuffer",
+    "Exploration",
+    "ImageCache",
+    "PatchSet",
+    "Recipe",
+    "RegionMap",
+    "RegionTracker",
+    "apply_edits",
+    "apply_pixel_effect",
+    "check_output_path",
+    "compile_pattern",
+    "content_key",
+    "detect_format",
+    "find_replace",
+    "decode_error",
+    "find_spans",
+    "glitch_png",
+    "glitch_variant",
+    "index_regions",
+    "iter_glitched_png",
+    "load_bytes",
+    "load_mapped",
+    "load_recipe",
+    "map_file",
+    "match_length",
+    "mapped_file",
+    "new_seed",
+    "parse_hex",
+    "parse_offset",
+    "random_edits",
+    "precheck",
+    "random_glitch",
+    "replace_matches",
+    "replace_spans",
+    "replay",
+    "retry_until_decodable",
+    "run_sequence",
+    "save_bytes",
+    "save_recipe",
+    "select_spans",
+    "split_safe",
+    "stream_glitch",
+    "thumbnail_cache",
+]
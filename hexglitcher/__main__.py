@@ -0,0 +1,10 @@
+"""Allow ``python -m hexglitcher`` to run the command-line interface."""
+
+import multiprocessing
+import sys
+
+from .cli import main
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
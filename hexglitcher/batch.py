@@ -0,0 +1,240 @@
+"""
+Batch processing of many files across a process pool.
+
+Each task is a plain tuple of picklable values so it can be shipped to a
+worker process; results stream back in completion order as BatchResult
+records, with failures reported per file instead of aborting the run.
+Files too large to read whole are glitched chunk by chunk (see stream.py).
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import engine
+from .formats import RegionTracker, detect_format
+from .png import DEFAULT_LEVEL, iter_glitched_png
+from .stream import stream_glitch
+from .validity import retry_until_decodable
+
+logger = logging.getLogger(__name__)
+
+
+class BatchResult(NamedTuple):
+    """Outcome of glitching one input file into one output variant."""
+    source: str
+    output: Optional[str]
+    seed: int
+    ok: bool
+    error: Optional[str]
+    seconds: float
+
+
+def expand_inputs(patterns: Iterable[str]) -> List[str]:
+    """
+    Expand input globs and directories into a sorted list of image files.
+
+    Args:
+        patterns: Glob patterns, file paths or directories
+
+    Returns:
+        Unique image paths whose extension is in ALLOWED_EXTENSIONS
+    """
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        for path in glob.glob(pattern, recursive=True):
+            _, ext = os.path.splitext(path.lower())
+            if os.path.isfile(path) and ext in engine.ALLOWED_EXTENSIONS:
+                found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def derive_seed(base_seed: int, name: str, variant: int) -> int:
+    """
+    Derive a per-file seed that does not depend on scheduling order.
+
+    Args:
+        base_seed: Seed of the whole run
+        name: File name the seed is for
+        variant: Variant number of that file
+
+    Returns:
+        A 63-bit integer seed
+    """
+    digest = hashlib.blake2b(f"{base_seed}:{name}:{variant}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
+
+
+def relative_names(files: List[str]) -> List[str]:
+    """
+    Name each input by its path relative to the deepest directory containing them all.
+
+    Files from one directory keep their base names; files gathered from
+    several directories (e.g. by a recursive glob) keep the subdirectories
+    that tell same-named files apart.
+
+    Args:
+        files: Input file paths
+
+    Returns:
+        One relative name per file, in the same order
+    """
+    if not files:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    return [os.path.relpath(os.path.abspath(path), root) for path in files]
+
+
+def output_path(source: str, output_dir: str, variant: int, variants: int, name: Optional[str] = None) -> str:
+    """
+    Build the output file name for one variant of a source file.
+
+    Args:
+        source: Input file path
+        output_dir: Directory the result is written to
+        variant: Variant number
+        variants: Total number of variants per file
+        name: Name of the input relative to the input root (see
+            relative_names); its directories are recreated under
+            output_dir. Defaults to the base name of source
+
+    Returns:
+        The output path, keeping the source extension
+    """
+    name = name if name is not None else os.path.basename(source)
+    stem, ext = os.path.splitext(name)
+    suffix = f"_glitched_{variant:03d}" if variants > 1 else "_glitched"
+    return os.path.join(output_dir, f"{stem}{suffix}{ext}")
+
+
+def glitch_data(data: engine.BytesLike, params: Dict[str, Any], seed: int) -> bytearray:
+    """
+    Apply the batch operations described by params to one buffer.
+
+    Args:
+        data: Original file contents
+        params: Dict with header_size, protect, intensity, mode and optional
+            find (bytes or compiled pattern), replace, probability,
+            max_count, window, png_pixels and png_level
+        seed: Seed for the random corruption
+
+    Returns:
+        The glitched data
+    """
+    result = bytearray(data)
+    tracker = RegionTracker()
+    structure = params.get("protect", "header") == "structure"
+
+    if params.get("find") is not None:
+        header_size, regions = tracker.protection(result, params["header_size"], structure)
+        result, _ = engine.find_replace(result, params["find"], params["replace"], header_size,
+                                        probability=params.get("probability", 1.0),
+                                        max_count=params.get("max_count"),
+                                        window=params.get("window"), seed=seed, regions=regions)
+
+    if params.get("intensity") and params.get("png_pixels") and detect_format(result) == "PNG":
+        result = bytearray(b"".join(iter_glitched_png(result, params["intensity"], params["mode"], seed,
+                                                      params.get("png_level", DEFAULT_LEVEL),
+                                                      params.get("backend", "auto"))))
+    elif params.get("intensity"):
+        header_size, regions = tracker.protection(result, params["header_size"], structure)
+        result = engine.random_glitch(result, params["intensity"], params["mode"], header_size,
+                                      seed=seed, backend=params.get("backend", "auto"), regions=regions)
+
+    return result
+
+
+def process_file(task: Tuple[str, str, int, int, Dict[str, Any], int]) -> BatchResult:
+    """
+    Worker entry point: load, glitch and save a single file.
+
+    Files larger than the maximum size, or all files when params has
+    stream set, are streamed instead of loaded whole. With a retry_budget
+    in params, in-memory files are glitched with new seeds until the result
+    decodes; the seed reported is the one that succeeded.
+
+    Args:
+        task: Tuple of (source, output path, variant, seed, params, max file size)
+
+    Returns:
+        A BatchResult; exceptions are captured rather than raised
+    """
+    source, out_path, variant, seed, params, max_size = task
+    start = time.perf_counter()
+    try:
+        if params.get("stream") or (max_size is not None and os.path.getsize(source) > max_size):
+            stream_glitch(source, out_path, params, seed)
+        elif params.get("retry_budget"):
+            data = engine.load_bytes(source, max_size)
+            retry = retry_until_decodable(lambda s: glitch_data(data, params, s), seed, params["retry_budget"])
+            if retry.data is None:
+                raise ValueError(f"no decodable result in {retry.attempts} attempts")
+            engine.save_bytes(out_path, retry.data)
+            seed = retry.seed
+        else:
+            data = engine.load_bytes(source, max_size)
+            engine.save_bytes(out_path, glitch_data(data, params, seed))
+        return BatchResult(source, out_path, seed, True, None, time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(source, None, seed, False, f"{type(e).__name__}: {e}",
+                           time.perf_counter() - start)
+
+
+def run_batch(files: List[str], output_dir: str, params: Dict[str, Any],
+              variants: int = 1, seed: Optional[int] = None,
+              workers: Optional[int] = None,
+              max_size: Optional[int] = engine.MAX_FILE_SIZE) -> Iterator[BatchResult]:
+    """
+    Glitch every file across a process pool, yielding results as they finish.
+
+    Args:
+        files: Input image paths
+        output_dir: Directory for the glitched files (created if missing)
+        params: Operation parameters, see glitch_data
+        variants: Number of variants to produce per input file
+        seed: Base seed of the run; None picks a random one
+        workers: Number of worker processes; defaults to the core count
+        max_size: Largest input read whole, in bytes; larger files are
+            streamed. None reads every file whole
+
+    Yields:
+        One BatchResult per (file, variant) in completion order
+
+    Raises:
+        ValueError: If the output directory is not allowed or two inputs
+            would be written to the same output file
+    """
+    engine.check_output_path(output_dir)
+
+    if seed is None:
+        seed = engine.new_seed()
+    logger.info(f"Batch of {len(files)} files x {variants} variants, base seed {seed}")
+
+    # Seeds and output names follow the relative name, so same-named files
+    # from different directories neither collide nor share a seed
+    tasks = [
+        (path, output_path(path, output_dir, variant, variants, name), variant,
+         derive_seed(seed, name.replace(os.sep, "/"), variant), params, max_size)
+        for path, name in zip(files, relative_names(files))
+        for variant in range(variants)
+    ]
+    claimed: Dict[str, str] = {}
+    for path, output, *_ in tasks:
+        key = os.path.normcase(output)
+        if key in claimed:
+            raise ValueError(f"{claimed[key]} and {path} would both be written to {output}")
+        claimed[key] = path
+
+    for directory in sorted({os.path.dirname(task[1]) for task in tasks} | {output_dir}):
+        os.makedirs(directory, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(process_file, task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,339 @@
+"""
+Benchmarks for the glitch engine.
+
+Run with ``python -m hexglitcher bench``. Each measurement is the best of
+several repeats so that one-off scheduling noise does not skew comparisons.
+
+bench_random_glitch() compares the two random corruption kernels.
+bench_suite() times the paths the GUI spends its time in (random glitch and
+find & replace through recipe ops, the decode check, fast and high-quality
+preview decodes, pixel effects and saving) on synthetic JPEG, PNG, BMP, GIF
+and WebP images of several sizes. Each measurement also records the peak
+memory allocated while it ran, traced with tracemalloc in a separate run so
+tracing does not distort the timing; tracemalloc sees Python and NumPy
+allocations but not Pillow's internal image buffers. The report is plain
+JSON, and compare_reports() lines two of them up to spot regressions
+between versions.
+"""
+
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+from . import engine
+from .buffer import CowBuffer
+from .cache import thumbnail_cache
+from .formats import RegionTracker
+from .pixel import apply_pixel_effect
+from .preview import render_thumbnail
+from .recipe import apply_step
+from .validity import decode_error
+
+REPORT_FORMAT = "hexglitcher-bench"
+REPORT_VERSION = 1
+SUITE_FORMATS = ("JPEG", "PNG", "BMP", "GIF", "WEBP")
+# Preview box the suite decodes to, about the size of the GUI's preview pane
+PREVIEW_SIZE = (800, 600)
+
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    """
+    Time a callable several times and keep the fastest run.
+
+    Args:
+        func: Zero-argument callable to time
+        repeat: Number of runs
+
+    Returns:
+        Fastest wall-clock time in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_random_glitch(sizes_mb: Iterable[float] = (1, 10), intensities: Iterable[int] = (1000, 100, 10),
+                        modes: Iterable[str] = ("Random", "Bitwise XOR"),
+                        repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    Compare the NumPy and pure-Python random corruption kernels.
+
+    Args:
+        sizes_mb: Buffer sizes to test, in megabytes
+        intensities: Intensity values to test
+        modes: Glitch modes to test
+        repeat: Runs per measurement
+
+    Returns:
+        One result dict per (size, intensity, mode) combination
+    """
+    backends = ["python"] + (["numpy"] if engine.np is not None else [])
+    results = []
+
+    for size_mb in sizes_mb:
+        data = os.urandom(int(size_mb * 1024 * 1024))
+        for intensity in intensities:
+            for mode in modes:
+                row: Dict[str, Any] = {"size_mb": size_mb, "intensity": intensity, "mode": mode}
+                for backend in backends:
+                    row[backend] = best_of(
+                        lambda: engine.random_glitch(data, intensity, mode, engine.DEFAULT_HEADER_SIZE,
+                                                     seed=0, backend=backend),
+                        repeat,
+                    )
+                if "numpy" in row:
+                    row["speedup"] = row["python"] / row["numpy"]
+                results.append(row)
+
+    return results
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    """Render benchmark results as an aligned text table."""
+    lines = [f"{'size':>8} {'intensity':>9} {'mode':>12} {'python':>10} {'numpy':>10} {'speedup':>8}"]
+    for row in results:
+        numpy_time = f"{row['numpy'] * 1000:8.1f}ms" if "numpy" in row else f"{'n/a':>10}"
+        speedup = f"{row['speedup']:7.1f}x" if "speedup" in row else f"{'':>8}"
+        lines.append(f"{row['size_mb']:>6}MB {row['intensity']:>9} {row['mode']:>12} "
+                     f"{row['python'] * 1000:8.1f}ms {numpy_time} {speedup}")
+    return "\n".join(lines)
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """
+    Run a callable once under tracemalloc.
+
+    Args:
+        func: Zero-argument callable to measure
+
+    Returns:
+        Peak traced allocation during the call, in bytes
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    else:  # Python 3.8: clearing the traces also resets the peak
+        tracemalloc.clear_traces()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        func()
+        return max(0, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+
+def synthetic_image(fmt: str, megapixels: float, seed: int = 0) -> bytes:
+    """
+    Encode a synthetic test image: colour gradients with noise, so that
+    compressed formats neither collapse to nothing nor blow up to raw size.
+
+    Args:
+        fmt: Pillow format name, e.g. "JPEG"
+        megapixels: Approximate pixel count in millions, at a 3:2 aspect ratio
+        seed: Varies the noise pattern
+
+    Returns:
+        The encoded file contents
+    """
+    width = max(16, int((megapixels * 1e6 * 1.5) ** 0.5))
+    height = max(16, int(width / 1.5))
+    horizontal = Image.linear_gradient("L").resize((width, height))
+    vertical = Image.linear_gradient("L").rotate(90).resize((width, height))
+    noise = Image.effect_noise((width, height), 24 + seed % 16)
+    image = Image.merge("RGB", (horizontal, vertical, noise))
+
+    out = io.BytesIO()
+    if fmt == "GIF":
+        image = image.quantize(256)
+    options = {"quality": 90} if fmt in ("JPEG", "WEBP") else {}
+    image.save(out, fmt, **options)
+    return out.getvalue()
+
+
+def _measure(func: Callable[[], Any], repeat: int) -> Tuple[float, int]:
+    """Best time over repeat runs, then the peak memory of one traced run."""
+    return best_of(func, repeat), peak_memory(func)
+
+
+def _suite_ops(data: CowBuffer, intensities: Iterable[int]) -> List[Tuple[str, Optional[int], Callable[[], Any]]]:
+    """The (op name, intensity, callable) measurements of the suite for one input."""
+    tracker = RegionTracker()
+    ops: List[Tuple[str, Optional[int], Callable[[], Any]]] = []
+
+    def check(buffer: CowBuffer) -> Optional[str]:
+        # Without clearing, every repeat after the first would be a cache hit
+        thumbnail_cache.clear()
+        return decode_error(buffer)
+
+    for intensity in intensities:
+        op = {"op": "random", "intensity": intensity, "mode": "Random", "header_size": engine.DEFAULT_HEADER_SIZE,
+              "protect_structure": True, "backend": "auto", "seed": 0}
+        glitched = apply_step(data, op, data, tracker)
+        ops.append(("random_glitch", intensity, lambda op=op: apply_step(data, op, data, tracker)))
+        ops.append(("decode_check", intensity, lambda glitched=glitched: check(glitched)))
+
+    find_op = {"op": "find_replace", "find": "00", "replace": "FF", "pattern": "hex",
+               "header_size": engine.DEFAULT_HEADER_SIZE, "protect_structure": True, "seed": 0}
+    ops.append(("find_replace", None, lambda: apply_step(data, find_op, data, tracker)))
+    ops.append(("preview_fast", None, lambda: render_thumbnail(data, PREVIEW_SIZE, "fast")))
+    ops.append(("preview_high", None, lambda: render_thumbnail(data, PREVIEW_SIZE, "high").load()))
+    if engine.np is not None:
+        sort_op = {"op": "pixel", "effect": "sort", "low": 64, "high": 192}
+        ops.append(("pixel_sort", None, lambda: apply_pixel_effect(data, sort_op)))
+
+    def save() -> None:
+        handle, path = tempfile.mkstemp(suffix=".bin")
+        os.close(handle)
+        try:
+            engine.save_bytes(path, data)
+        finally:
+            os.remove(path)
+
+    ops.append(("save", None, save))
+    return ops
+
+
+def bench_suite(formats: Iterable[str] = SUITE_FORMATS, megapixels: Iterable[float] = (1, 4),
+                intensities: Iterable[int] = (10000, 1000, 100), repeat: int = 3) -> Dict[str, Any]:
+    """
+    Time the glitch, decode, preview and save paths on synthetic images.
+
+    Args:
+        formats: Image formats to generate, see SUITE_FORMATS
+        megapixels: Image sizes to test, in millions of pixels
+        intensities: Random glitch intensities to test
+        repeat: Runs per measurement
+
+    Returns:
+        A JSON-serialisable report: environment details plus one result
+        dict per (format, size, op, intensity) with seconds and peak_bytes
+    """
+    intensities = list(intensities)
+    results = []
+    for fmt in formats:
+        for size in megapixels:
+            data = CowBuffer(synthetic_image(fmt, size))
+            for op, intensity, func in _suite_ops(data, intensities):
+                try:
+                    seconds, peak = _measure(func, repeat)
+                except Exception as e:
+                    results.append({"format": fmt, "megapixels": size, "file_bytes": len(data), "op": op,
+                                    "intensity": intensity, "error": str(e)})
+                    continue
+                results.append({"format": fmt, "megapixels": size, "file_bytes": len(data), "op": op,
+                                "intensity": intensity, "seconds": seconds, "peak_bytes": peak})
+
+    return {
+        "format": REPORT_FORMAT,
+        "version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "numpy": engine.np.__version__ if engine.np is not None else None,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def save_report(path: str, report: Dict[str, Any]) -> None:
+    """
+    Write a suite report as JSON.
+
+    Args:
+        path: Destination file
+        report: Report returned by bench_suite
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    """
+    Read a suite report saved by save_report.
+
+    Args:
+        path: Report file to read
+
+    Returns:
+        The report
+
+    Raises:
+        ValueError: If the file is not a benchmark report
+        OSError: If the file cannot be read
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            report = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Benchmark report is not valid JSON: {e}")
+    if not isinstance(report, dict) or report.get("format") != REPORT_FORMAT:
+        raise ValueError("Not a HexGlitcher benchmark report")
+    return report
+
+
+def _result_key(row: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Identity of a measurement across reports."""
+    return row["format"], row["megapixels"], row["op"], row["intensity"]
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Pair up the measurements two reports have in common.
+
+    Args:
+        baseline: The older report
+        current: The newer report
+
+    Returns:
+        One dict per shared measurement with both timings and their ratio
+        (current / baseline, above 1 means slower)
+    """
+    before = {_result_key(row): row for row in baseline["results"] if "seconds" in row}
+    rows = []
+    for row in current["results"]:
+        old = before.get(_result_key(row))
+        if old is None or "seconds" not in row:
+            continue
+        rows.append({"format": row["format"], "megapixels": row["megapixels"], "op": row["op"],
+                     "intensity": row["intensity"], "baseline": old["seconds"], "current": row["seconds"],
+                     "ratio": row["seconds"] / old["seconds"] if old["seconds"] else float("inf")})
+    return rows
+
+
+def format_suite(report: Dict[str, Any]) -> str:
+    """Render suite results as an aligned text table."""
+    lines = [f"{'format':>6} {'MP':>5} {'op':>14} {'intensity':>9} {'time':>10} {'peak':>10}"]
+    for row in report["results"]:
+        intensity = row["intensity"] if row["intensity"] is not None else ""
+        if "error" in row:
+            lines.append(f"{row['format']:>6} {row['megapixels']:>5} {row['op']:>14} {intensity:>9} "
+                         f"failed: {row['error']}")
+            continue
+        lines.append(f"{row['format']:>6} {row['megapixels']:>5} {row['op']:>14} {intensity:>9} "
+                     f"{row['seconds'] * 1000:8.1f}ms {row['peak_bytes'] / (1024 * 1024):8.1f}MB")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    """Render compare_reports() output as an aligned text table."""
+    lines = [f"{'format':>6} {'MP':>5} {'op':>14} {'intensity':>9} {'baseline':>10} {'current':>10} {'ratio':>7}"]
+    for row in rows:
+        intensity = row["intensity"] if row["intensity"] is not None else ""
+        lines.append(f"{row['format']:>6} {row['megapixels']:>5} {row['op']:>14} {intensity:>9} "
+                     f"{row['baseline'] * 1000:8.1f}ms {row['current'] * 1000:8.1f}ms {row['ratio']:6.2f}x")
+    return "\n".join(lines)
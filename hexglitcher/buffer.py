@@ -0,0 +1,268 @@
+"""
+Memory-mapped sources and copy-on-write buffers.
+
+A CowBuffer wraps a read-only base (typically an mmap of the source file)
+and keeps every modification in a sparse PatchSet overlay (see patch.py).
+Reading goes through the overlay; the base is never written to. Because
+patch sets are immutable, copying a buffer is O(1) and a glitch variant
+costs memory proportional to the number of bytes it changed, not to the
+size of the file. Full contents are only materialised for decoding and
+saving, and even those can stream through reader() and write_to().
+"""
+
+import io
+import mmap
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to per-index loops
+    np = None
+
+from .patch import PatchSet
+
+CHUNK_SIZE = 1024 * 1024
+
+BytesLike = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+def map_file(path: str) -> BytesLike:
+    """
+    Map a file read-only into memory.
+
+    Args:
+        path: File to map
+
+    Returns:
+        A read-only mmap of the file, or b"" for an empty file (which
+        cannot be mapped)
+    """
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Zero-length files cannot be mapped
+            return b""
+
+
+@contextmanager
+def mapped_file(path: str) -> Iterator[BytesLike]:
+    """
+    Map a file read-only for the duration of a with block.
+
+    map_file leaves the mapping open for as long as it is referenced, which
+    suits buffers that live as long as the loaded image. Short-lived scans
+    should use this instead, so the mapping and its file handle are released
+    deterministically. Views of the mapping must not outlive the block.
+
+    Args:
+        path: File to map
+
+    Yields:
+        The mapping, as returned by map_file
+    """
+    data = map_file(path)
+    try:
+        yield data
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+class CowBuffer:
+    """Read-only base bytes plus a sparse overlay of patched bytes."""
+
+    def __init__(self, base: BytesLike, patches: Optional[PatchSet] = None) -> None:
+        """
+        Wrap a base buffer.
+
+        Args:
+            base: Bytes-like object providing the original contents
+            patches: Initial overlay; empty if omitted
+        """
+        self.base = base
+        self.patches = patches if patches is not None else PatchSet()
+        self._length = len(base)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __bytes__(self) -> bytes:
+        return self.tobytes()
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[int, bytes]:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                return self.tobytes()[key]
+            return self.read(start, max(0, stop - start))
+
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("CowBuffer index out of range")
+        value = self.patches.get(key)
+        return self.base[key] if value is None else value
+
+    def __setitem__(self, key: Union[int, slice], value: Union[int, bytes]) -> None:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1 or len(value) != stop - start:
+                raise ValueError("CowBuffer only supports same-length contiguous slice assignment")
+            self.write(start, value)
+            return
+
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("CowBuffer index out of range")
+        self.patches = self.patches.merge([key], [value])
+
+    @property
+    def is_pristine(self) -> bool:
+        """True if nothing has been written on top of the base."""
+        return not self.patches
+
+    @property
+    def overlay_bytes(self) -> int:
+        """Memory held by the patch overlay."""
+        return self.patches.nbytes
+
+    def read(self, offset: int, size: int) -> bytes:
+        """
+        Read a contiguous range through the overlay.
+
+        Args:
+            offset: Start offset
+            size: Number of bytes
+
+        Returns:
+            The bytes in [offset, offset + size), clipped to the buffer end
+        """
+        end = min(offset + size, self._length)
+        if offset >= end:
+            return b""
+        lo, hi = self.patches.span(offset, end)
+        if lo == hi:
+            return bytes(self.base[offset:end])
+
+        window = bytearray(self.base[offset:end])
+        self.patches.apply(window, offset)
+        return bytes(window)
+
+    def write(self, offset: int, data: bytes) -> None:
+        """
+        Overwrite a contiguous range without changing the buffer length.
+
+        Args:
+            offset: Start offset
+            data: Replacement bytes; must fit inside the buffer
+        """
+        if offset < 0 or offset + len(data) > self._length:
+            raise IndexError("CowBuffer write out of range")
+        self.patches = self.patches.merge(range(offset, offset + len(data)), data)
+
+    def gather(self, offsets: Sequence[int]) -> Union[List[int], "np.ndarray"]:
+        """
+        Read the current byte values at many offsets.
+
+        Args:
+            offsets: Offsets to read (a NumPy array when NumPy is in use)
+
+        Returns:
+            The byte values, as a uint8 array if offsets is an array
+        """
+        if np is not None and isinstance(offsets, np.ndarray):
+            if not self._length:
+                return np.empty(0, dtype=np.uint8)
+            values = np.frombuffer(self.base, dtype=np.uint8)[offsets]
+            if self.patches:
+                patched = np.frombuffer(self.patches.offsets, dtype=np.int64)
+                pos = np.searchsorted(patched, offsets)
+                pos[pos == len(patched)] = 0
+                hit = patched[pos] == offsets
+                values[hit] = np.frombuffer(self.patches.values, dtype=np.uint8)[pos[hit]]
+            return values
+        return [self[i] for i in offsets]
+
+    def scatter(self, offsets: Sequence[int], values: Iterable[int]) -> None:
+        """
+        Write byte values at many offsets.
+
+        Args:
+            offsets: Offsets to write
+            values: One byte value per offset
+        """
+        if len(offsets):
+            self.patches = self.patches.merge(offsets, values)
+
+    def copy(self) -> "CowBuffer":
+        """Return an independent buffer sharing the base and the (immutable) patches."""
+        return CowBuffer(self.base, self.patches)
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Yield the buffer contents in order without materialising it whole.
+
+        Args:
+            chunk_size: Bytes per chunk
+        """
+        for offset in range(0, self._length, chunk_size):
+            yield self.read(offset, chunk_size)
+
+    def tobytes(self) -> bytes:
+        """Materialise the full contents as a single bytes object."""
+        return self.read(0, self._length)
+
+    def reader(self) -> io.BufferedReader:
+        """
+        Open a seekable read-only file object over the buffer contents.
+
+        Decoders can consume the buffer through this without a full copy.
+        """
+        return io.BufferedReader(_CowReader(self))
+
+    def write_to(self, fileobj) -> None:
+        """
+        Stream the full contents to a binary file object.
+
+        Args:
+            fileobj: Object with a write(bytes) method
+        """
+        for chunk in self.iter_chunks():
+            fileobj.write(chunk)
+
+
+class _CowReader(io.RawIOBase):
+    """Raw, seekable, read-only stream over a CowBuffer."""
+
+    def __init__(self, buf: CowBuffer) -> None:
+        self._buf = buf
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._buf)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, target) -> int:
+        data = self._buf.read(self._pos, len(target))
+        target[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
@@ -0,0 +1,195 @@
+"""
+Byte-budgeted LRU cache of decoded preview images.
+
+Toggling between results, stepping through undo history or re-running a
+seed produces buffers that were already decoded. ImageCache remembers
+decoded thumbnails keyed by a digest of the buffer contents, evicting the
+least recently used images once their pixel memory exceeds a byte budget,
+so a few large previews cannot crowd out many small ones unnoticed.
+
+content_key() hashes a buffer with BLAKE2b. A CowBuffer is keyed by its
+base and its patch overlay: the digest of a base is computed once and
+remembered, so keying an edited buffer only hashes its patches. Equal keys
+always mean equal contents; the same contents reached by a different route
+(a CowBuffer and its materialised bytes) may get different keys, which only
+costs a miss.
+
+thumbnail_cache is the process-wide instance used by the preview worker,
+the variant explorer and decode_error(). Images handed out by the cache are
+shared and must not be modified.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional, Tuple, Union
+
+from PIL import Image
+
+from .buffer import BytesLike, CowBuffer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET = 128 * 1024 * 1024
+# Bases whose digest is remembered; each entry keeps its base alive
+_BASE_DIGESTS_MAX = 8
+
+_base_digests: "OrderedDict[int, Tuple[BytesLike, bytes]]" = OrderedDict()
+_base_lock = threading.Lock()
+
+
+class CacheStats(NamedTuple):
+    """Counters of an ImageCache, for tuning its budget."""
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    nbytes: int
+    budget: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups that hit, 0.0 before the first lookup."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _digest(data: BytesLike) -> bytes:
+    """BLAKE2b digest of a bytes-like object."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _base_digest(base: BytesLike) -> bytes:
+    """Digest of a CowBuffer base, computed once per base object."""
+    with _base_lock:
+        entry = _base_digests.get(id(base))
+        if entry is not None and entry[0] is base:
+            _base_digests.move_to_end(id(base))
+            return entry[1]
+    digest = _digest(base)
+    with _base_lock:
+        _base_digests[id(base)] = (base, digest)
+        _base_digests.move_to_end(id(base))
+        while len(_base_digests) > _BASE_DIGESTS_MAX:
+            _base_digests.popitem(last=False)
+    return digest
+
+
+def content_key(data: Union[BytesLike, CowBuffer]) -> bytes:
+    """
+    Digest identifying the contents of a buffer.
+
+    Args:
+        data: Buffer to key; a CowBuffer's base must not change afterwards
+
+    Returns:
+        A short digest to build cache keys from
+    """
+    if not isinstance(data, CowBuffer):
+        return _digest(data)
+    hasher = hashlib.blake2b(_base_digest(data.base), digest_size=16)
+    hasher.update(data.patches.offsets)
+    hasher.update(data.patches.values)
+    # Tag the key so a patched buffer never collides with raw bytes by construction
+    return b"c" + hasher.digest()
+
+
+def image_nbytes(image: Image.Image) -> int:
+    """Approximate pixel memory of a decoded image."""
+    return image.width * image.height * len(image.getbands())
+
+
+class ImageCache:
+    """Thread-safe LRU mapping of keys to decoded images within a byte budget."""
+
+    def __init__(self, budget: int = DEFAULT_BUDGET) -> None:
+        """
+        Create an empty cache.
+
+        Args:
+            budget: Maximum total pixel bytes held; 0 disables caching
+        """
+        self.budget = budget
+        self._entries: "OrderedDict[Hashable, Tuple[Image.Image, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Image.Image]:
+        """
+        Look up an image and mark it most recently used.
+
+        Args:
+            key: Cache key, usually built from content_key()
+
+        Returns:
+            The cached image, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, image: Image.Image) -> None:
+        """
+        Store an image, evicting the least recently used ones to stay within budget.
+
+        Images larger than the whole budget are not stored.
+
+        Args:
+            key: Cache key
+            image: Decoded image; must not be modified afterwards
+        """
+        size = image_nbytes(image)
+        if size > self.budget:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._nbytes -= old[1]
+            self._entries[key] = (image, size)
+            self._nbytes += size
+            self._evict(self.budget)
+
+    def resize(self, budget: int) -> None:
+        """
+        Change the byte budget, evicting entries if it shrank.
+
+        Args:
+            budget: New maximum total pixel bytes
+        """
+        with self._lock:
+            self.budget = budget
+            self._evict(budget)
+
+    def clear(self) -> None:
+        """Drop every entry; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def stats(self) -> CacheStats:
+        """Snapshot of the hit, miss and eviction counters and current size."""
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self._entries),
+                              self._nbytes, self.budget)
+
+    def _evict(self, budget: int) -> None:
+        """Drop least recently used entries until the total fits budget. Caller holds the lock."""
+        while self._nbytes > budget and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._nbytes -= size
+            self.evictions += 1
+
+
+thumbnail_cache = ImageCache()
@@ -0,0 +1,332 @@
+"""
+Command-line interface for headless glitching.
+
+Usage:
+    python -m hexglitcher batch "photos/*.jpg" -o out --intensity 2000 --seed 42
+    python main.py batch photos/ -o out --variants 20 --mode "Bitwise XOR"
+    python -m hexglitcher batch in.jpg -o out --find "FF ?? D8" --pattern wildcard --replace "00 00 00"
+    python -m hexglitcher replay photo.recipe.json photo.jpg -o out
+    python -m hexglitcher sequence look.recipe.json frames/ -o out --end-recipe peak.recipe.json
+    python -m hexglitcher bench --suite --json before.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+from . import engine, png
+from .patterns import PATTERN_KINDS, compile_pattern, match_length
+from .batch import expand_inputs, output_path, relative_names, run_batch
+from .bench import SUITE_FORMATS
+from .recipe import load_recipe, replay
+from .sequence import run_sequence
+
+
+def positive_int(value: str) -> int:
+    """Argparse type for integers greater than zero."""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError("must be greater than 0")
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    """Argparse type for integers greater than or equal to zero."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError("must be non-negative")
+    return number
+
+
+def probability(value: str) -> float:
+    """Argparse type for a probability in (0, 1]."""
+    number = float(value)
+    if not 0 < number <= 1:
+        raise argparse.ArgumentTypeError("must be greater than 0 and at most 1")
+    return number
+
+
+def offset_range(value: str) -> Tuple[int, int]:
+    """Argparse type for a START:END offset window; either side may be blank."""
+    start_text, sep, end_text = value.partition(":")
+    if not sep:
+        raise argparse.ArgumentTypeError("expected START:END")
+    try:
+        start = engine.parse_offset(start_text, "Range start") or 0
+        end = engine.parse_offset(end_text, "Range end")
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    end = sys.maxsize if end is None else end
+    if end < start:
+        raise argparse.ArgumentTypeError("range end must not be before range start")
+    return start, end
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construct the argument parser with all subcommands."""
+    parser = argparse.ArgumentParser(
+        prog="hexglitcher",
+        description="HexGlitcher - raw hex image databender (headless mode)",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="log engine details to stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    batch = sub.add_parser("batch", help="glitch many files across a process pool")
+    batch.add_argument("inputs", nargs="+", help="input files, directories or glob patterns")
+    batch.add_argument("-o", "--output", required=True, help="output directory")
+    batch.add_argument("--header-size", type=non_negative_int, default=engine.DEFAULT_HEADER_SIZE,
+                       help="protected header bytes (default: %(default)s)")
+    batch.add_argument("--protect", choices=("structure", "header"), default="structure",
+                       help="'structure' glitches only the image data of recognised formats and falls back "
+                            "to --header-size otherwise; 'header' always uses --header-size (default: %(default)s)")
+    batch.add_argument("--intensity", type=non_negative_int, default=engine.DEFAULT_INTENSITY,
+                       help="corrupt 1 in N body bytes, 0 disables random corruption (default: %(default)s)")
+    batch.add_argument("--mode", choices=engine.GLITCH_MODES, default="Random",
+                       help="byte operation (default: %(default)s)")
+    batch.add_argument("--find", help="pattern to find, e.g. 'FF D8' (see --pattern)")
+    batch.add_argument("--pattern", choices=PATTERN_KINDS, default="hex",
+                       help="syntax of --find: hex bytes, hex with ?? wildcards, or a regex (default: %(default)s)")
+    batch.add_argument("--replace", help="hex byte sequence to replace matches with")
+    batch.add_argument("--max-match", type=positive_int, metavar="BYTES",
+                       help="longest match of a regex --find, so streamed files carry enough bytes between "
+                            "chunks; hex and wildcard patterns need none (default: 65536)")
+    batch.add_argument("--probability", type=probability, default=1.0,
+                       help="chance of replacing each match, 0-1 (default: %(default)s)")
+    batch.add_argument("--max-count", type=non_negative_int, help="replace at most this many matches")
+    batch.add_argument("--range", type=offset_range, dest="window", metavar="START:END",
+                       help="only replace matches inside this offset range, e.g. 0x1000:0x8000")
+    batch.add_argument("--png-pixels", action="store_true",
+                       help="for PNG inputs, corrupt the decompressed scanlines and re-encode them "
+                            "instead of the raw bytes, keeping the file decodable")
+    batch.add_argument("--png-level", type=int, choices=range(10), default=png.DEFAULT_LEVEL, metavar="0-9",
+                       help="zlib level for --png-pixels re-encoding (default: %(default)s)")
+    batch.add_argument("--retry-budget", type=float, metavar="SECONDS",
+                       help="retry each file with new seeds until the result decodes, for at most this "
+                            "long (files that are not streamed); most broken attempts are rejected without decoding")
+    batch.add_argument("--stream", action="store_true",
+                       help="process every file in chunks with constant memory; files over "
+                            f"{engine.MAX_FILE_SIZE // (1024 * 1024)}MB are always streamed")
+    batch.add_argument("--seed", type=int, help="base seed for reproducible runs")
+    batch.add_argument("--variants", type=positive_int, default=1, help="variants per input file")
+    batch.add_argument("--workers", type=positive_int, help="worker processes (default: core count)")
+    batch.add_argument("--backend", choices=engine.BACKENDS, default="auto",
+                       help="random corruption kernel (default: %(default)s)")
+    batch.set_defaults(func=cmd_batch)
+
+    replay_cmd = sub.add_parser("replay", help="reproduce a recipe exported from the GUI on files")
+    replay_cmd.add_argument("recipe", help="recipe JSON file")
+    replay_cmd.add_argument("inputs", nargs="+", help="input files, directories or glob patterns")
+    replay_cmd.add_argument("-o", "--output", required=True, help="output directory")
+    replay_cmd.set_defaults(func=cmd_replay)
+
+    seq = sub.add_parser("sequence", help="apply a recipe to every frame of an image sequence")
+    seq.add_argument("recipe", help="recipe JSON file for the first frame")
+    seq.add_argument("inputs", nargs="+", help="frame files, directories or glob patterns")
+    seq.add_argument("-o", "--output", required=True, help="output directory; frames keep their names")
+    seq.add_argument("--end-recipe", help="recipe with the same steps for the last frame; numeric "
+                                          "parameters are interpolated across the sequence")
+    seq.add_argument("--reseed", action="store_true",
+                     help="new seeds every frame (flickering glitches) instead of the recorded ones")
+    seq.add_argument("--workers", type=positive_int, help="worker processes (default: core count)")
+    seq.set_defaults(func=cmd_sequence)
+
+    bench = sub.add_parser("bench", help="benchmark the random corruption kernels, or the whole pipeline with --suite")
+    bench.add_argument("--sizes", type=float, nargs="+", default=[1, 10], help="buffer sizes in MB")
+    bench.add_argument("--intensities", type=positive_int, nargs="+",
+                       help="intensities to test (default: 1000 100 10, or 10000 1000 100 with --suite)")
+    bench.add_argument("--modes", choices=engine.GLITCH_MODES, nargs="+", default=["Random", "Bitwise XOR"])
+    bench.add_argument("--repeat", type=positive_int, default=3, help="runs per measurement")
+    bench.add_argument("--suite", action="store_true",
+                       help="time glitch ops, decode checks, previews, pixel effects and saving on "
+                            "synthetic images, with peak memory")
+    bench.add_argument("--formats", nargs="+", type=str.upper, choices=SUITE_FORMATS, default=list(SUITE_FORMATS),
+                       help="image formats for --suite")
+    bench.add_argument("--megapixels", type=float, nargs="+", default=[1, 4], help="image sizes for --suite")
+    bench.add_argument("--json", metavar="PATH", help="write the --suite report as JSON to PATH ('-' for stdout)")
+    bench.add_argument("--compare", metavar="BASELINE", help="compare the --suite run with a saved JSON report")
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def cmd_batch(args: argparse.Namespace) -> int:
+    """Run the batch subcommand and stream progress to stdout."""
+    if (args.find is None) != (args.replace is None):
+        print("error: --find and --replace must be used together", file=sys.stderr)
+        return 2
+
+    try:
+        find = compile_pattern(args.find, args.pattern) if args.find is not None else None
+        max_match = args.max_match
+        if find is not None and max_match is None:
+            max_match = match_length(args.find, args.pattern)
+        replace = engine.parse_hex(args.replace, "Replace") if args.replace is not None else None
+        engine.check_output_path(args.output)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("error: no matching image files", file=sys.stderr)
+        return 2
+
+    params = {
+        "header_size": args.header_size,
+        "protect": args.protect,
+        "intensity": args.intensity,
+        "mode": args.mode,
+        "find": find,
+        "max_match": max_match,
+        "replace": replace,
+        "probability": args.probability,
+        "max_count": args.max_count,
+        "window": args.window,
+        "backend": args.backend,
+        "png_pixels": args.png_pixels,
+        "png_level": args.png_level,
+        "stream": args.stream,
+        "retry_budget": args.retry_budget,
+    }
+
+    total = len(files) * args.variants
+    failures = 0
+    start = time.perf_counter()
+
+    try:
+        for done, result in enumerate(run_batch(files, args.output, params, args.variants,
+                                                args.seed, args.workers), 1):
+            if result.ok:
+                print(f"[{done}/{total}] ok    {result.source} -> {result.output} "
+                      f"(seed {result.seed}, {result.seconds:.2f}s)", flush=True)
+            else:
+                failures += 1
+                print(f"[{done}/{total}] FAIL  {result.source}: {result.error}", file=sys.stderr, flush=True)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    elapsed = time.perf_counter() - start
+    print(f"Done: {total - failures}/{total} succeeded in {elapsed:.1f}s", flush=True)
+    return 1 if failures else 0
+
+
+def cmd_replay(args: argparse.Namespace) -> int:
+    """Run the replay subcommand, applying one recipe to every input file."""
+    try:
+        recipe = load_recipe(args.recipe)
+        engine.check_output_path(args.output)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("error: no matching image files", file=sys.stderr)
+        return 2
+
+    failures = 0
+    for done, (source, name) in enumerate(zip(files, relative_names(files)), 1):
+        start = time.perf_counter()
+        try:
+            result = replay(engine.load_mapped(source), recipe)
+            target = output_path(source, args.output, 1, 1, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            written = engine.save_bytes(target, result)
+        except (OSError, ValueError) as e:
+            failures += 1
+            print(f"[{done}/{len(files)}] FAIL  {source}: {e}", file=sys.stderr, flush=True)
+            continue
+        print(f"[{done}/{len(files)}] ok    {source} -> {written} "
+              f"({len(recipe.steps)} steps, {time.perf_counter() - start:.2f}s)", flush=True)
+
+    print(f"Done: {len(files) - failures}/{len(files)} succeeded", flush=True)
+    return 1 if failures else 0
+
+
+def cmd_sequence(args: argparse.Namespace) -> int:
+    """Run the sequence subcommand, reporting frames in order."""
+    try:
+        start = load_recipe(args.recipe)
+        end = load_recipe(args.end_recipe) if args.end_recipe else None
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    failures = done = 0
+    began = time.perf_counter()
+    try:
+        for result in run_sequence(args.inputs, args.output, start, end, args.reseed, args.workers):
+            done += 1
+            if result.ok:
+                print(f"frame {result.index:5d}  ok    {result.source} -> {result.output} "
+                      f"({result.seconds:.2f}s)", flush=True)
+            else:
+                failures += 1
+                print(f"frame {result.index:5d}  FAIL  {result.source}: {result.error}",
+                      file=sys.stderr, flush=True)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    elapsed = time.perf_counter() - began
+    print(f"Done: {done - failures}/{done} frames in {elapsed:.1f}s "
+          f"({done / elapsed * 60 if elapsed else 0:.0f} frames/min)", flush=True)
+    return 1 if failures else 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    """Run the bench subcommand and print a comparison table."""
+    from . import bench
+
+    if not args.suite:
+        if engine.np is None:
+            print("NumPy is not installed; only the pure-Python kernel is measured", file=sys.stderr)
+        intensities = args.intensities or [1000, 100, 10]
+        print(bench.format_table(bench.bench_random_glitch(args.sizes, intensities, args.modes, args.repeat)))
+        return 0
+
+    try:
+        baseline = bench.load_report(args.compare) if args.compare else None
+    except (OSError, ValueError) as e:
+        print(f"Cannot read baseline: {e}", file=sys.stderr)
+        return 2
+
+    report = bench.bench_suite(args.formats, args.megapixels, args.intensities or [10000, 1000, 100], args.repeat)
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print(bench.format_suite(report))
+        if args.json:
+            bench.save_report(args.json, report)
+            print(f"Report written to {args.json}")
+    if baseline is not None:
+        print(bench.format_comparison(bench.compare_reports(baseline, report)),
+              file=sys.stderr if args.json == "-" else sys.stdout)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point for the command-line interface.
+
+    Args:
+        argv: Argument list; defaults to sys.argv[1:]
+
+    Returns:
+        Process exit code
+    """
+    args = build_parser().parse_args(argv)
+
+    if args.verbose:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logging.getLogger("hexglitcher").addHandler(handler)
+        logging.getLogger("hexglitcher").setLevel(logging.INFO)
+
+    return args.func(args)
@@ -0,0 +1,743 @@
+"""
+Headless glitch engine.
+
+Implementations of the byte-level glitch operations. Nothing in this module
+touches Tkinter: every function takes raw bytes plus explicit parameters and
+returns new bytes, raising ``ValueError`` on invalid input so callers (GUI,
+CLI, workers) can decide how to report it.
+
+NumPy is optional. When it is installed the random corruption kernel runs as
+bulk array operations; otherwise a pure-Python loop with the same semantics
+is used.
+
+Operations accept either plain bytes-like objects or a CowBuffer (see
+buffer.py). Given a CowBuffer they return a new CowBuffer sharing the same
+read-only base with the edits recorded as a sparse patch set, so a result
+costs memory proportional to the bytes it changed.
+"""
+
+import logging
+import mmap
+import os
+import random
+import re
+import secrets
+from array import array
+from bisect import bisect_right
+from typing import List, Optional, Pattern, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to the pure-Python kernels
+    np = None
+
+from .buffer import CowBuffer, map_file
+
+logger = logging.getLogger(__name__)
+
+BytesLike = Union[bytes, bytearray, memoryview, mmap.mmap]
+BufferLike = Union[BytesLike, CowBuffer]
+
+# Configuration constants
+DEFAULT_HEADER_SIZE = 500
+DEFAULT_INTENSITY = 1000
+MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB, for whole-file reads
+MAX_MAPPED_FILE_SIZE = 1024 * 1024 * 1024  # 1GB, for memory-mapped loads
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tif', '.tiff'}
+GLITCH_MODES = ("Random", "Increment", "Decrement", "Zero", "Bitwise XOR")
+BACKENDS = ("auto", "numpy", "python")
+SYSTEM_DIRS = ['/etc', '/bin', '/sbin', '/usr/bin', '/usr/sbin', '/boot', '/sys', '/proc']
+
+HEX_DIGITS = set('0123456789ABCDEFabcdef')
+
+
+def _check_source(path: str, max_size: Optional[int]) -> int:
+    """Validate extension and size of a source file, returning its size."""
+    _, ext = os.path.splitext(path.lower())
+    if ext not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"Invalid file type. Supported: {', '.join(sorted(ALLOWED_EXTENSIONS))}")
+
+    file_size = os.path.getsize(path)
+    if max_size is not None and file_size > max_size:
+        raise ValueError(f"File too large. Maximum size is {max_size // (1024*1024)}MB.")
+    return file_size
+
+
+def load_bytes(path: str, max_size: Optional[int] = MAX_FILE_SIZE) -> bytearray:
+    """
+    Read an image file into memory as raw bytes.
+
+    Args:
+        path: Path of the file to load
+        max_size: Maximum accepted file size in bytes, or None for no limit
+
+    Returns:
+        The file contents as a bytearray
+
+    Raises:
+        ValueError: If the extension is not allowed or the file is too large
+        OSError: If the file cannot be read
+    """
+    _check_source(path, max_size)
+
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+
+    logger.info(f"Loaded {path} ({len(data)} bytes)")
+    return data
+
+
+def load_mapped(path: str, max_size: Optional[int] = MAX_MAPPED_FILE_SIZE) -> CowBuffer:
+    """
+    Memory-map an image file behind a copy-on-write buffer.
+
+    The file contents are paged in by the OS on demand and never copied
+    as a whole; edits go to the buffer's overlay.
+
+    Args:
+        path: Path of the file to load
+        max_size: Maximum accepted file size in bytes, or None for no limit
+
+    Returns:
+        A pristine CowBuffer over a read-only mapping of the file
+
+    Raises:
+        ValueError: If the extension is not allowed or the file is too large
+        OSError: If the file cannot be mapped
+    """
+    file_size = _check_source(path, max_size)
+    buf = CowBuffer(map_file(path))
+    logger.info(f"Mapped {path} ({file_size} bytes)")
+    return buf
+
+
+def check_output_path(path: str) -> str:
+    """
+    Validate a destination path before writing glitched data to it.
+
+    Args:
+        path: Requested output path
+
+    Returns:
+        The absolute output path
+
+    Raises:
+        ValueError: If the path points into a system directory
+    """
+    abs_path = os.path.abspath(path)
+    if any(abs_path.startswith(d) for d in SYSTEM_DIRS):
+        raise ValueError("Cannot save to system directories")
+    return abs_path
+
+
+def save_bytes(path: str, data: BufferLike) -> str:
+    """
+    Write glitched data to disk after validating the destination.
+
+    The data is written to a temporary file that then replaces the target,
+    so overwriting a file that is still memory-mapped as a source is safe.
+
+    Args:
+        path: Output path
+        data: Bytes or CowBuffer to write
+
+    Returns:
+        The absolute path written
+
+    Raises:
+        ValueError: If the path points into a system directory
+        OSError: If the file cannot be written
+    """
+    abs_path = check_output_path(path)
+    tmp_path = f"{abs_path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            if isinstance(data, CowBuffer):
+                data.write_to(f)
+            else:
+                f.write(data)
+        os.replace(tmp_path, abs_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logger.info(f"Saved {len(data)} bytes to {abs_path}")
+    return abs_path
+
+
+def parse_hex(value: str, label: str = "Hex") -> bytes:
+    """
+    Convert a user-entered hex string (spaces allowed) into bytes.
+
+    Args:
+        value: Hex text such as ``"FF D8"``
+        label: Field name used in error messages
+
+    Returns:
+        The decoded byte sequence
+
+    Raises:
+        ValueError: If the value is empty, contains non-hex characters or
+            does not describe complete bytes
+    """
+    cleaned = value.strip().replace(" ", "")
+    if not cleaned:
+        raise ValueError(f"{label} value is required")
+    if not all(c in HEX_DIGITS for c in cleaned):
+        raise ValueError(f"{label} value contains invalid hex characters")
+    if len(cleaned) % 2 != 0:
+        raise ValueError("Hex values must have even number of characters (complete bytes)")
+    return bytes.fromhex(cleaned)
+
+
+def parse_offset(value: str, label: str = "Offset") -> Optional[int]:
+    """
+    Convert a user-entered file offset into an integer.
+
+    Args:
+        value: Decimal or 0x-prefixed hex text; blank means "not set"
+        label: Field name used in error messages
+
+    Returns:
+        The offset, or None if value is blank
+
+    Raises:
+        ValueError: If the value is not a non-negative integer
+    """
+    cleaned = value.strip()
+    if not cleaned:
+        return None
+    try:
+        offset = int(cleaned, 0)
+    except ValueError:
+        raise ValueError(f"{label} must be a decimal or 0x-prefixed hex number")
+    if offset < 0:
+        raise ValueError(f"{label} must be non-negative")
+    return offset
+
+
+def split_safe(data: BytesLike, header_size: int) -> Tuple[bytes, bytes]:
+    """
+    Separate the file data into protected header and modifiable body.
+
+    Args:
+        data: The complete file contents
+        header_size: Number of leading bytes to protect
+
+    Returns:
+        Tuple of (header, body)
+
+    Raises:
+        ValueError: If header_size is negative
+    """
+    if header_size < 0:
+        raise ValueError("Header protection must be non-negative")
+
+    if header_size > len(data):
+        logger.warning(f"Header size {header_size} exceeds file size {len(data)}")
+        header_size = len(data)
+
+    view = memoryview(data)
+    return bytes(view[:header_size]), bytes(view[header_size:])
+
+
+def _contiguous(data: BufferLike) -> BytesLike:
+    """Return a contiguous bytes-like view of data, materialising a patched CowBuffer."""
+    if isinstance(data, CowBuffer):
+        return data.base if data.is_pristine else data.tobytes()
+    return data
+
+
+def replace_matches(data: BufferLike, offsets: Sequence[int], match_len: int,
+                    replace: bytes) -> Union[bytearray, CowBuffer]:
+    """
+    Overwrite known, non-overlapping matches with a replacement.
+
+    Same-length replacements are written in place over a copy (recorded as
+    patches for a CowBuffer); otherwise the data is rebuilt from the
+    segments between matches.
+
+    Args:
+        data: The complete file contents
+        offsets: Increasing start offsets of equal-length matches, e.g. from
+            find_spans
+        match_len: Length of each match
+        replace: Bytes written in place of every match
+
+    Returns:
+        The new data; a CowBuffer if data was one
+    """
+    if match_len == len(replace):
+        if isinstance(data, CowBuffer):
+            result = data.copy()
+            # One merge for all matches keeps the patch set update O(edits)
+            result.scatter([offset + i for offset in offsets for i in range(match_len)],
+                           replace * len(offsets))
+            return result
+        result = bytearray(data)
+        for offset in offsets:
+            result[offset:offset + match_len] = replace
+        return result
+
+    source = memoryview(_contiguous(data))
+    parts = []
+    prev = 0
+    for offset in offsets:
+        parts.append(source[prev:offset])
+        parts.append(replace)
+        prev = offset + match_len
+    parts.append(source[prev:])
+    joined = b"".join(parts)
+    return CowBuffer(joined) if isinstance(data, CowBuffer) else bytearray(joined)
+
+
+def _search_range(length: int, header_size: int,
+                  window: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    """Clip an optional (start, end) window to the unprotected body."""
+    start, end = min(header_size, length), length
+    if window is not None:
+        lo, hi = window
+        if lo < 0 or hi < lo:
+            raise ValueError("Offset range must satisfy 0 <= start <= end")
+        start, end = max(start, min(lo, length)), min(end, hi)
+    return start, max(start, end)
+
+
+def select_spans(starts: Sequence[int], ends: Sequence[int], probability: float = 1.0,
+                 max_count: Optional[int] = None, seed: Optional[int] = None) -> Tuple[array, array]:
+    """
+    Pick a subset of matches to replace.
+
+    Each match is kept independently with the given probability, then the
+    first max_count survivors (in file order) are returned.
+
+    Args:
+        starts: Increasing match start offsets
+        ends: Matching end offsets
+        probability: Chance of replacing each match, in (0, 1]
+        max_count: Replace at most this many matches; None for no limit
+        seed: Seed for a private random generator; None for a random run
+
+    Returns:
+        Tuple of array('q') start offsets and array('q') end offsets
+
+    Raises:
+        ValueError: If probability is outside (0, 1] or max_count is negative
+    """
+    if not 0 < probability <= 1:
+        raise ValueError("Replace probability must be between 0 and 1")
+    if max_count is not None and max_count < 0:
+        raise ValueError("Max matches must be non-negative")
+
+    if probability < 1:
+        rng = random.Random(seed)
+        keep = [i for i in range(len(starts)) if rng.random() < probability]
+    else:
+        keep = range(len(starts))
+    if max_count is not None:
+        keep = keep[:max_count]
+    return array("q", (starts[i] for i in keep)), array("q", (ends[i] for i in keep))
+
+
+def find_spans(data: BufferLike, pattern: Pattern[bytes], header_size: int = DEFAULT_HEADER_SIZE,
+               window: Optional[Tuple[int, int]] = None,
+               regions: Optional[Sequence[Tuple[int, int]]] = None) -> Tuple[array, array]:
+    """
+    Locate non-overlapping matches of a compiled pattern outside the header.
+
+    The searched range is scanned once, left to right, exactly as re.sub
+    would scan it.
+
+    Args:
+        data: The complete file contents
+        pattern: Compiled bytes pattern (see patterns.compile_pattern)
+        header_size: Number of leading bytes to protect
+        window: Optional (start, end) offsets; only matches lying entirely
+            inside [start, end) are found
+        regions: Optional sorted (start, end) target ranges; matches that
+            are not entirely inside one of them are skipped
+
+    Returns:
+        Tuple of array('q') start offsets and array('q') end offsets
+
+    Raises:
+        ValueError: If header_size is negative or the window is invalid
+    """
+    if header_size < 0:
+        raise ValueError("Header protection must be non-negative")
+
+    source = _contiguous(data)
+    start, end = _search_range(len(source), header_size, window)
+    starts, ends = array("q"), array("q")
+    if regions is not None:
+        ranges = _target_ranges(len(source), start, regions)
+        if not ranges:
+            return starts, ends
+        firsts = [lo for lo, _ in ranges]
+        start, end = max(start, ranges[0][0]), min(end, ranges[-1][1])
+
+    # Slicing the view bounds the scan without copying the searched range
+    for match in pattern.finditer(memoryview(source)[start:end]):
+        match_start, match_end = start + match.start(), start + match.end()
+        if regions is not None:
+            j = bisect_right(firsts, match_start) - 1
+            if j < 0 or match_end > ranges[j][1]:
+                continue
+        starts.append(match_start)
+        ends.append(match_end)
+    return starts, ends
+
+
+def replace_spans(data: BufferLike, starts: Sequence[int], ends: Sequence[int],
+                  replace: bytes) -> Union[bytearray, CowBuffer]:
+    """
+    Overwrite known, non-overlapping spans with a replacement.
+
+    Like replace_matches, but each span may have its own length (wildcard
+    and regex matches). When every span is as long as the replacement, a
+    CowBuffer result is recorded as patches instead of being rebuilt.
+
+    Args:
+        data: The complete file contents
+        starts: Increasing span start offsets
+        ends: Matching span end offsets
+        replace: Bytes written in place of every span
+
+    Returns:
+        The new data; a CowBuffer if data was one
+    """
+    if all(end - start == len(replace) for start, end in zip(starts, ends)):
+        return replace_matches(data, starts, len(replace), replace)
+
+    source = memoryview(_contiguous(data))
+    parts = []
+    prev = 0
+    for start, end in zip(starts, ends):
+        parts.append(source[prev:start])
+        parts.append(replace)
+        prev = end
+    parts.append(source[prev:])
+    joined = b"".join(parts)
+    return CowBuffer(joined) if isinstance(data, CowBuffer) else bytearray(joined)
+
+
+def find_replace(data: BufferLike, find: Union[bytes, Pattern[bytes]], replace: bytes,
+                 header_size: int = DEFAULT_HEADER_SIZE, probability: float = 1.0,
+                 max_count: Optional[int] = None, window: Optional[Tuple[int, int]] = None,
+                 seed: Optional[int] = None,
+                 regions: Optional[Sequence[Tuple[int, int]]] = None) -> Tuple[Union[bytearray, CowBuffer], int]:
+    """
+    Replace matches of a byte sequence or pattern outside the header.
+
+    The searched range is scanned once and the returned count is the exact
+    number of matches replaced. By default every match is replaced; a
+    probability, max_count or window restricts that to a subset, chosen
+    from the match offsets. Matches as long as the replacement are written
+    in place (recorded as patches for a CowBuffer); otherwise the data is
+    rebuilt.
+
+    Args:
+        data: The complete file contents
+        find: Literal byte sequence, or a compiled bytes pattern for
+            wildcard/regex searches (see patterns.compile_pattern)
+        replace: Byte sequence to substitute, inserted verbatim
+        header_size: Number of leading bytes to protect
+        probability: Chance of replacing each match, in (0, 1]
+        max_count: Replace at most this many matches; None for no limit
+        window: Optional (start, end) offsets limiting the search
+        seed: Seed for the probabilistic selection; None for a random run
+        regions: Optional sorted (start, end) target ranges matches must
+            lie in, e.g. from formats.index_regions
+
+    Returns:
+        Tuple of (new data, number of replacements); the new data is a
+        CowBuffer if data was one
+
+    Raises:
+        ValueError: If find is empty, header_size is negative, or the
+            selection parameters are invalid
+    """
+    if not isinstance(find, re.Pattern):
+        if not find:
+            raise ValueError("Find value is required")
+        find = re.compile(re.escape(find))
+    if header_size < 0:
+        raise ValueError("Header protection must be non-negative")
+
+    selective = probability != 1 or max_count is not None or window is not None
+    if isinstance(data, CowBuffer) or selective or regions is not None:
+        starts, ends = find_spans(data, find, header_size, window, regions)
+        if selective:
+            total = len(starts)
+            starts, ends = select_spans(starts, ends, probability, max_count, seed)
+            logger.info(f"Find/Replace: selected {len(starts)} of {total} matches")
+        result = replace_spans(data, starts, ends, replace)
+        logger.info(f"Find/Replace: {find.pattern!r}->{replace.hex()}, {len(starts)} replacements")
+        return result, len(starts)
+
+    header, body = split_safe(data, header_size)
+    # Escaped backslashes make re.subn insert replace verbatim, not as a template
+    new_body, replacements = find.subn(replace.replace(b"\\", b"\\\\"), body)
+
+    logger.info(f"Find/Replace: {find.pattern!r}->{replace.hex()}, {replacements} replacements")
+    return bytearray(header + new_body), replacements
+
+
+def new_seed() -> int:
+    """
+    Draw a fresh seed for one operation from the OS entropy source.
+
+    Operations never share the global ``random`` state: each one is given
+    an explicit seed (recorded so it can be replayed) and builds its own
+    generator from it.
+
+    Returns:
+        A 63-bit integer seed
+    """
+    return secrets.randbits(63)
+
+
+def resolve_backend(backend: str) -> str:
+    """
+    Pick the concrete kernel implementation for a backend name.
+
+    Args:
+        backend: One of BACKENDS
+
+    Returns:
+        "numpy" or "python"
+
+    Raises:
+        ValueError: If the backend is unknown or NumPy is requested but missing
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    if backend == "auto":
+        return "numpy" if np is not None else "python"
+    if backend == "numpy" and np is None:
+        raise ValueError("NumPy backend requested but NumPy is not installed")
+    return backend
+
+
+def _target_ranges(length: int, header_size: int,
+                   regions: Optional[Sequence[Tuple[int, int]]]) -> List[Tuple[int, int]]:
+    """Clip optional target regions to the unprotected body; the whole body if regions is None."""
+    start = min(header_size, length)
+    if regions is None:
+        return [(start, length)] if start < length else []
+    ranges = []
+    for lo, hi in sorted(regions):
+        lo, hi = max(lo, start), min(hi, length)
+        if lo < hi:
+            ranges.append((lo, hi))
+    return ranges
+
+
+def _range_index(ranges: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """First offsets of ranges and their cumulative start positions (plus the total)."""
+    firsts, cumulative = [], [0]
+    for lo, hi in ranges:
+        firsts.append(lo)
+        cumulative.append(cumulative[-1] + hi - lo)
+    return firsts, cumulative
+
+
+def _edits_python(data: "BufferLike", ranges: List[Tuple[int, int]], count: int, mode: str,
+                  seed: Optional[int]) -> Tuple[List[int], List[int]]:
+    """Pure-Python kernel: pick ``count`` distinct offsets within ranges and their new values."""
+    rng = random.Random(seed)
+    if len(ranges) == 1:
+        indices: List[int] = rng.sample(range(*ranges[0]), count)
+    else:
+        firsts, cumulative = _range_index(ranges)
+        positions = rng.sample(range(cumulative[-1]), count)
+        indices = []
+        for pos in positions:
+            j = bisect_right(cumulative, pos) - 1
+            indices.append(firsts[j] + pos - cumulative[j])
+
+    # Dispatch on mode once instead of once per byte
+    if mode == "Random":
+        values = [rng.randint(0, 255) for _ in indices]
+    elif mode == "Increment":
+        values = [(data[i] + 1) % 256 for i in indices]
+    elif mode == "Decrement":
+        values = [(data[i] - 1) % 256 for i in indices]
+    elif mode == "Zero":
+        values = [0] * len(indices)
+    else:  # Bitwise XOR
+        values = [data[i] ^ 0xFF for i in indices]
+    return indices, values
+
+
+def _sorted_unique(values: "np.ndarray") -> "np.ndarray":
+    """Sort an index array in place and drop duplicates (cheaper than np.unique)."""
+    values.sort()
+    keep = np.empty(len(values), dtype=bool)
+    keep[:1] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def _sample_indices_numpy(gen: "np.random.Generator", n: int, k: int) -> "np.ndarray":
+    """
+    Draw k distinct indices from range(n) without materialising range(n).
+
+    Sparse draws oversample with replacement and deduplicate, which keeps
+    memory proportional to k. Dense draws fall back to a permutation.
+    """
+    if k * 4 > n:
+        return gen.permutation(n)[:k]
+
+    idx = _sorted_unique(gen.integers(0, n, size=k + k // 8 + 16, dtype=np.intp))
+    while len(idx) < k:
+        extra = gen.integers(0, n, size=(k - len(idx)) * 2 + 16, dtype=np.intp)
+        idx = _sorted_unique(np.concatenate((idx, extra)))
+    if len(idx) > k:
+        idx = gen.choice(idx, k, replace=False)
+    return idx
+
+
+def _gather_numpy(data: "BufferLike", idx: "np.ndarray") -> "np.ndarray":
+    """Read the current values at idx as a new uint8 array."""
+    if isinstance(data, CowBuffer):
+        return data.gather(idx)
+    return np.frombuffer(data, dtype=np.uint8)[idx]
+
+
+def _edits_numpy(data: "BufferLike", ranges: List[Tuple[int, int]], count: int, mode: str,
+                 seed: Optional[int]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Vectorized kernel: pick ``count`` distinct offsets within ranges and their new values."""
+    gen = np.random.default_rng(seed)
+    firsts, cumulative = _range_index(ranges)
+    idx = _sample_indices_numpy(gen, cumulative[-1], count)
+    if len(ranges) == 1:
+        idx += firsts[0]
+    else:
+        # Map positions in the concatenated ranges back to file offsets
+        cumulative = np.asarray(cumulative, dtype=np.intp)
+        j = np.searchsorted(cumulative, idx, side="right") - 1
+        idx += np.asarray(firsts, dtype=np.intp)[j] - cumulative[j]
+
+    # uint8 arithmetic wraps modulo 256 like the Python kernel
+    if mode == "Random":
+        values = gen.integers(0, 256, size=count, dtype=np.uint8)
+    elif mode == "Zero":
+        values = np.zeros(count, dtype=np.uint8)
+    else:
+        values = _gather_numpy(data, idx)
+        if mode == "Increment":
+            values += np.uint8(1)
+        elif mode == "Decrement":
+            values -= np.uint8(1)
+        else:  # Bitwise XOR
+            values ^= np.uint8(0xFF)
+    return idx, values
+
+
+def apply_edits(target: Union[bytearray, "CowBuffer"], offsets: Sequence[int],
+                values: Sequence[int]) -> None:
+    """
+    Write byte values at the given offsets in place.
+
+    Args:
+        target: Mutable buffer to modify
+        offsets: Offsets to write (list or NumPy array)
+        values: One byte value per offset
+    """
+    if isinstance(target, CowBuffer):
+        target.scatter(offsets, values)
+    elif np is not None and isinstance(offsets, np.ndarray):
+        # Offsets are unique, so a fancy-indexed assignment is well defined
+        np.frombuffer(target, dtype=np.uint8)[offsets] = values
+    else:
+        for offset, value in zip(offsets, values):
+            target[offset] = value
+
+
+def random_edits(data: "BufferLike", intensity: int = DEFAULT_INTENSITY, mode: str = "Random",
+                 header_size: int = DEFAULT_HEADER_SIZE, seed: Optional[int] = None,
+                 backend: str = "auto", regions: Optional[Sequence[Tuple[int, int]]] = None,
+                 count: Optional[int] = None) -> Tuple[Sequence[int], Sequence[int]]:
+    """
+    Compute a random corruption as (offsets, new values) without applying it.
+
+    Roughly one in ``intensity`` target bytes is selected; the targets are
+    the body after the header, or only the given regions. Both backends pick
+    the same number of distinct positions and apply the same byte operation,
+    but they draw from different generators, so a seed reproduces results
+    only within one backend.
+
+    Args:
+        data: The complete file contents (bytes-like or CowBuffer)
+        intensity: Corrupt one byte per this many body bytes
+        mode: One of GLITCH_MODES
+        header_size: Number of leading bytes to protect
+        seed: Seed for a private random generator; None for a random run
+        backend: "numpy", "python", or "auto" to use NumPy when available
+        regions: Optional sorted (start, end) ranges to confine edits to,
+            e.g. from formats.index_regions
+        count: Exact number of bytes to corrupt instead of deriving it from
+            intensity; may be 0, e.g. for one piece of a larger stream
+
+    Returns:
+        Tuple of (offsets, values); NumPy arrays with the NumPy backend
+
+    Raises:
+        ValueError: If intensity is not positive, or mode or backend is unknown
+    """
+    if intensity <= 0:
+        raise ValueError("Intensity must be greater than 0")
+    if mode not in GLITCH_MODES:
+        raise ValueError(f"Unknown glitch mode: {mode}")
+    if header_size < 0:
+        raise ValueError("Header protection must be non-negative")
+
+    kernel = _edits_numpy if resolve_backend(backend) == "numpy" else _edits_python
+    ranges = _target_ranges(len(data), header_size, regions)
+
+    body_len = sum(hi - lo for lo, hi in ranges)
+    if body_len <= 0:
+        return [], []
+
+    if count is None:
+        count = max(1, body_len // intensity)
+    num_bytes_to_glitch = min(count, body_len)
+    if num_bytes_to_glitch <= 0:
+        return [], []
+    logger.info(f"Glitching {num_bytes_to_glitch} bytes with mode: {mode}")
+
+    return kernel(data, ranges, num_bytes_to_glitch, mode, seed)
+
+
+def random_glitch(data: "BufferLike", intensity: int = DEFAULT_INTENSITY, mode: str = "Random",
+                  header_size: int = DEFAULT_HEADER_SIZE, seed: Optional[int] = None,
+                  backend: str = "auto", regions: Optional[Sequence[Tuple[int, int]]] = None,
+                  count: Optional[int] = None) -> Union[bytearray, "CowBuffer"]:
+    """
+    Apply random byte corruption to the file body.
+
+    Indices are sampled up front instead of iterating over every byte; see
+    random_edits for the sampling rules.
+
+    Args:
+        data: The complete file contents
+        intensity: Corrupt one byte per this many body bytes
+        mode: One of GLITCH_MODES
+        header_size: Number of leading bytes to protect
+        seed: Seed for a private random generator; None for a random run
+        backend: "numpy", "python", or "auto" to use NumPy when available
+        regions: Optional sorted (start, end) ranges to confine edits to
+        count: Exact number of bytes to corrupt, overriding intensity
+
+    Returns:
+        The glitched data: a CowBuffer sharing the base if data is a
+        CowBuffer, otherwise a new bytearray
+
+    Raises:
+        ValueError: If intensity is not positive, or mode or backend is unknown
+    """
+    offsets, values = random_edits(data, intensity, mode, header_size, seed, backend, regions, count)
+    result = data.copy() if isinstance(data, CowBuffer) else bytearray(data)
+    apply_edits(result, offsets, values)
+    return result
@@ -0,0 +1,173 @@
+"""
+Parallel variant exploration.
+
+Instead of glitching and decoding one attempt at a time on the UI thread,
+an Exploration renders many seeded variants of the same buffer across a
+process pool. Each worker receives the source once through the pool
+initializer (a file path plus its patch set when possible, so the file is
+memory-mapped in the worker rather than pickled), then glitches and decodes
+a thumbnail per seed. Results stream back as they finish.
+
+glitch_variant() is the single definition of a variant: calling it in the
+main process with the same buffer, params and seed reproduces exactly the
+variant a worker rendered, which is how a chosen thumbnail is promoted.
+"""
+
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from PIL import Image
+
+from . import engine
+from .buffer import CowBuffer, map_file
+from .cache import content_key, thumbnail_cache
+from .formats import detect_format
+from .patch import PatchSet
+from .png import DEFAULT_LEVEL, glitch_png
+from .preview import render_thumbnail
+from .validity import precheck
+
+logger = logging.getLogger(__name__)
+
+# Either the bytes themselves or (path, patches) to re-map in the worker
+ExploreSource = Union[bytes, Tuple[str, PatchSet]]
+
+# Per-process state set by _init_worker
+_worker_data: Optional[engine.BufferLike] = None
+_worker_params: Dict[str, Any] = {}
+_worker_size: Tuple[int, int] = (0, 0)
+
+
+class VariantResult(NamedTuple):
+    """A rendered variant, or the reason it could not be decoded."""
+    seed: int
+    image: Optional[Image.Image]
+    error: Optional[str]
+
+
+def glitch_variant(data: engine.BufferLike, params: Dict[str, Any],
+                   seed: int) -> Union[bytearray, CowBuffer]:
+    """
+    Produce one seeded variant of data.
+
+    Args:
+        data: The buffer to glitch
+        params: Dict with intensity, mode, header_size and optional regions,
+            png_pixels, png_level and backend
+        seed: Seed selecting the variant
+
+    Returns:
+        The glitched buffer; a CowBuffer if data is one
+
+    Raises:
+        ValueError: If the parameters are invalid
+    """
+    if params.get("png_pixels") and detect_format(data[:12]) == "PNG":
+        return glitch_png(data, params["intensity"], params["mode"], seed,
+                          params.get("png_level", DEFAULT_LEVEL), params.get("backend", "auto"))
+    return engine.random_glitch(data, params["intensity"], params["mode"], params["header_size"],
+                                seed=seed, backend=params.get("backend", "auto"),
+                                regions=params.get("regions"))
+
+
+def variant_source(data: CowBuffer, path: Optional[str]) -> ExploreSource:
+    """
+    Describe a buffer compactly for shipping to worker processes.
+
+    Args:
+        data: The buffer to explore
+        path: File the buffer's base was mapped from, if any
+
+    Returns:
+        (path, patches) when data is still backed by that file, else its bytes
+    """
+    if path is not None and not isinstance(data.base, bytes) and len(data.base) == os.path.getsize(path):
+        return path, data.patches
+    return data.tobytes()
+
+
+def _init_worker(source: ExploreSource, params: Dict[str, Any], size: Tuple[int, int]) -> None:
+    """Pool initializer: load the shared source once per worker process."""
+    global _worker_data, _worker_params, _worker_size
+    if isinstance(source, tuple):
+        path, patches = source
+        _worker_data = CowBuffer(map_file(path), patches)
+    else:
+        _worker_data = CowBuffer(source)
+    _worker_params = params
+    _worker_size = size
+
+
+def _render_variant(seed: int) -> VariantResult:
+    """Worker entry point: glitch the shared source with seed and decode a thumbnail."""
+    try:
+        variant = glitch_variant(_worker_data, _worker_params, seed)
+        # Variants that leave the buffer unchanged, e.g. with nothing to target, repeat
+        key = (content_key(variant), _worker_size, "fast")
+        image = thumbnail_cache.get(key)
+        if image is None:
+            reason = precheck(variant)
+            if reason is not None:
+                return VariantResult(seed, None, reason)
+            image = render_thumbnail(variant, _worker_size, "fast")
+            image.load()
+            thumbnail_cache.put(key, image)
+        return VariantResult(seed, image, None)
+    except Exception as e:
+        return VariantResult(seed, None, str(e))
+
+
+class Exploration:
+    """A batch of seeded variants rendering on a dedicated process pool."""
+
+    def __init__(self, source: ExploreSource, params: Dict[str, Any], seeds: List[int],
+                 size: Tuple[int, int], workers: Optional[int] = None) -> None:
+        """
+        Start rendering every seed.
+
+        Args:
+            source: Buffer description from variant_source
+            params: Variant parameters, see glitch_variant
+            seeds: One seed per variant
+            size: Maximum (width, height) of each thumbnail
+            workers: Worker processes; defaults to the CPU count
+        """
+        self.seeds = list(seeds)
+        workers = min(workers or os.cpu_count() or 1, len(self.seeds)) or 1
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                             initargs=(source, params, size))
+        self._pending: Dict[Future, int] = {
+            self._executor.submit(_render_variant, seed): index for index, seed in enumerate(self.seeds)
+        }
+        logger.info(f"Exploring {len(self.seeds)} variants on {workers} workers")
+
+    @property
+    def done(self) -> bool:
+        """True once every variant has finished or been cancelled."""
+        return not self._pending
+
+    def poll(self) -> List[Tuple[int, VariantResult]]:
+        """
+        Collect variants that finished since the last poll. Never blocks.
+
+        Returns:
+            (index, result) pairs, index being the seed's position in seeds
+        """
+        finished = []
+        for future in [f for f in self._pending if f.done()]:
+            index = self._pending.pop(future)
+            if not future.cancelled():
+                finished.append((index, future.result()))
+        if not self._pending:
+            # Release the worker processes as soon as the last variant lands
+            self._executor.shutdown(wait=False)
+        return finished
+
+    def cancel(self) -> None:
+        """Drop pending variants and shut the pool down without waiting."""
+        for future in self._pending:
+            future.cancel()
+        self._pending = {}
+        self._executor.shutdown(wait=False)
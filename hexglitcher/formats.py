@@ -0,0 +1,336 @@
+"""
+Format-aware protect/target region maps.
+
+A fixed header safe zone is a poor fit for real files: EXIF and ICC
+blocks can push a JPEG's first scan well past 500 bytes, while a BMP
+header is only 54 bytes long. index_regions() walks the container
+structure once and returns the byte ranges that hold compressed image
+data (the "targets"); everything else (markers, chunk headers, lengths,
+checksums, palettes, metadata) is protected. Glitch operations given these
+regions leave the structure intact, so far fewer results fail to decode.
+
+Supported containers:
+
+- JPEG: entropy-coded scan data after each SOS, split at restart markers
+- PNG: IDAT chunk payloads, minus the two-byte zlib header
+- GIF: LZW data sub-block payloads, minus the sub-block length bytes
+- BMP: the pixel array from bfOffBits to the end of the file
+- RIFF/WebP: VP8/VP8L/ALPH bitstreams (past their frame headers), also
+  inside ANMF frames, and the ``data`` chunk of other RIFF files
+
+Other formats (e.g. TIFF) are not indexed; callers fall back to the fixed
+header size.
+"""
+
+import hashlib
+import logging
+import re
+import struct
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from .buffer import BytesLike, CowBuffer
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int]
+
+# Any marker that ends entropy-coded data: FF followed by something other
+# than a stuffed zero. Restart markers (D0-D7) are handled by the caller.
+_JPEG_MARKER = re.compile(rb"\xff[^\x00]")
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Leading bytes detect_format() looks at
+SIGNATURE_BYTES = 12
+_ZLIB_HEADER_SIZE = 2
+
+# Bytes at the start of each WebP bitstream chunk that describe the frame
+# (size, dimensions, version) and must stay intact
+_WEBP_HEADERS = {b"VP8 ": 10, b"VP8L": 5, b"ALPH": 1}
+_WEBP_FRAME_HEADER = 16
+
+
+class RegionMap(NamedTuple):
+    """Where glitches may land in one file."""
+    format: str
+    targets: List[Region]
+
+    @property
+    def target_bytes(self) -> int:
+        """Total size of all target regions."""
+        return sum(end - start for start, end in self.targets)
+
+
+def _index_jpeg(data: BytesLike, targets: List[Region]) -> None:
+    """Scan data regions of a JPEG, walking marker segments from SOI."""
+    n = len(data)
+    pos = 2
+    while pos + 4 <= n:
+        if data[pos] != 0xFF:
+            break
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Fill byte before a marker
+            pos += 1
+            continue
+        if marker == 0xD9:  # EOI
+            break
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # Standalone markers
+            pos += 2
+            continue
+
+        seg_end = pos + 2 + struct.unpack_from(">H", data, pos + 2)[0]
+        if marker != 0xDA:
+            pos = seg_end
+            continue
+
+        # SOS: entropy-coded data follows the segment until the next marker;
+        # restart markers split it but must themselves stay intact
+        start = seg_end
+        while True:
+            match = _JPEG_MARKER.search(data, start)
+            end = match.start() if match else n
+            if end > start:
+                targets.append((start, end))
+            if match is None or not 0xD0 <= data[end + 1] <= 0xD7:
+                break
+            start = end + 2
+        pos = end
+
+
+def _index_png(data: BytesLike, targets: List[Region]) -> None:
+    """IDAT payloads of a PNG, keeping the zlib stream header intact."""
+    n = len(data)
+    pos = len(_PNG_SIGNATURE)
+    first_idat = True
+    while pos + 8 <= n:
+        length, chunk_type = struct.unpack_from(">I4s", data, pos)
+        start = pos + 8
+        end = min(start + length, n)
+        if chunk_type == b"IDAT":
+            if first_idat:
+                start = min(start + _ZLIB_HEADER_SIZE, end)
+                first_idat = False
+            if end > start:
+                targets.append((start, end))
+        elif chunk_type == b"IEND":
+            break
+        pos += 12 + length  # Length, type, payload and CRC
+
+
+def _skip_sub_blocks(data: BytesLike, pos: int, targets: Optional[List[Region]] = None) -> int:
+    """Walk GIF data sub-blocks from pos, optionally recording their payloads."""
+    n = len(data)
+    while pos < n:
+        size = data[pos]
+        pos += 1
+        if size == 0:
+            break
+        if targets is not None:
+            targets.append((pos, min(pos + size, n)))
+        pos += size
+    return pos
+
+
+def _index_gif(data: BytesLike, targets: List[Region]) -> None:
+    """LZW sub-block payloads of every GIF image."""
+    n = len(data)
+    flags = data[10]
+    pos = 13
+    if flags & 0x80:  # Global color table
+        pos += 3 * (2 << (flags & 0x07))
+
+    while pos < n:
+        block = data[pos]
+        if block == 0x21:  # Extension: label byte then sub-blocks
+            pos = _skip_sub_blocks(data, pos + 2)
+        elif block == 0x2C:  # Image descriptor
+            flags = data[pos + 9] if pos + 9 < n else 0
+            pos += 10
+            if flags & 0x80:  # Local color table
+                pos += 3 * (2 << (flags & 0x07))
+            pos = _skip_sub_blocks(data, pos + 1, targets)  # After LZW minimum code size
+        else:  # Trailer (0x3B) or garbage
+            break
+
+
+def _index_bmp(data: BytesLike, targets: List[Region]) -> None:
+    """Pixel array of a BMP, located by bfOffBits."""
+    offset = struct.unpack_from("<I", data, 10)[0]
+    if offset < len(data):
+        targets.append((offset, len(data)))
+
+
+def _index_riff(data: BytesLike, targets: List[Region], pos: int, end: int, webp: bool) -> None:
+    """Bitstream chunks of a RIFF container between pos and end."""
+    while pos + 8 <= end:
+        fourcc, size = struct.unpack_from("<4sI", data, pos)
+        start = pos + 8
+        stop = min(start + size, end)
+        if webp and fourcc in _WEBP_HEADERS:
+            start += _WEBP_HEADERS[fourcc]
+            if stop > start:
+                targets.append((start, stop))
+        elif webp and fourcc == b"ANMF":
+            _index_riff(data, targets, start + _WEBP_FRAME_HEADER, stop, webp)
+        elif not webp and fourcc == b"data":
+            targets.append((start, stop))
+        pos = start + size + (size & 1)  # Chunks are padded to even sizes
+
+
+def detect_format(data: BytesLike) -> Optional[str]:
+    """
+    Identify the container format from its magic bytes.
+
+    Args:
+        data: File contents (at least the first SIGNATURE_BYTES)
+
+    Returns:
+        "JPEG", "PNG", "GIF", "BMP", "WEBP" or "RIFF", or None if unknown
+    """
+    head = bytes(data[:SIGNATURE_BYTES])
+    if head.startswith(b"\xff\xd8"):
+        return "JPEG"
+    if head.startswith(_PNG_SIGNATURE):
+        return "PNG"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    if head.startswith(b"BM") and len(head) >= 12:
+        return "BMP"
+    if head.startswith(b"RIFF") and len(head) >= 12:
+        return "WEBP" if head[8:12] == b"WEBP" else "RIFF"
+    return None
+
+
+def index_regions(data: BytesLike) -> Optional[RegionMap]:
+    """
+    Walk the file structure once and map the regions safe to glitch.
+
+    Truncated or malformed structures are indexed as far as they parse.
+
+    Args:
+        data: The complete file contents (contiguous bytes-like, e.g. an mmap)
+
+    Returns:
+        The RegionMap, or None if the format is not recognised or no
+        target regions were found
+    """
+    fmt = detect_format(data)
+    if fmt is None:
+        return None
+
+    targets: List[Region] = []
+    try:
+        if fmt == "JPEG":
+            _index_jpeg(data, targets)
+        elif fmt == "PNG":
+            _index_png(data, targets)
+        elif fmt == "GIF":
+            _index_gif(data, targets)
+        elif fmt == "BMP":
+            _index_bmp(data, targets)
+        else:
+            _index_riff(data, targets, 12, len(data), fmt == "WEBP")
+    except (struct.error, IndexError) as e:
+        # Keep whatever was indexed before the structure broke off
+        logger.warning(f"{fmt} structure ended unexpectedly: {e}")
+
+    if not targets:
+        logger.warning(f"No glitchable {fmt} data found, falling back to header protection")
+        return None
+
+    regions = RegionMap(fmt, targets)
+    logger.info(f"{fmt}: {len(targets)} target regions, {regions.target_bytes} of {len(data)} bytes")
+    return regions
+
+
+def _protected_digest(data: Union[BytesLike, CowBuffer], regions: Optional[RegionMap]) -> bytes:
+    """
+    Digest of the bytes a region map protects.
+
+    Without a map only the leading SIGNATURE_BYTES are covered: an
+    unrecognised file is re-indexed if an edit gives it a known signature.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if regions is None:
+        digest.update(data[:SIGNATURE_BYTES])
+        return digest.digest()
+    prev = 0
+    for start, end in regions.targets:
+        digest.update(data[prev:start])
+        prev = end
+    digest.update(data[prev:len(data)])
+    return digest.digest()
+
+
+class RegionTracker:
+    """
+    Region map of an evolving buffer, re-indexed only when its structure may have changed.
+
+    The map of the last indexed state is kept until the length changes (a
+    splice or a replace of a different length) or an edit touches a
+    protected byte, i.e. one outside the target regions. Edits inside the
+    targets cannot move the structure, and reusing the map also keeps bytes
+    that a glitch happened to turn into marker-like sequences from cutting
+    the target regions short. Checking costs one digest of the protected
+    bytes, read through the buffer's slices, never the whole file.
+
+    The map therefore follows the sequence of buffers the tracker is shown.
+    The GUI, batch runs and recipe replay all apply the same rule step by
+    step, so a replayed recipe picks the same regions; background jobs take
+    a copy() of the tracker they continue from.
+    """
+
+    def __init__(self) -> None:
+        self._length: Optional[int] = None
+        self._guard: Optional[bytes] = None
+        self._regions: Optional[RegionMap] = None
+
+    def reset(self) -> None:
+        """Forget the cached map, e.g. after loading a new file."""
+        self._length = None
+        self._guard = None
+        self._regions = None
+
+    def copy(self) -> "RegionTracker":
+        """Return an independent tracker holding the same map."""
+        other = RegionTracker()
+        other._length, other._guard, other._regions = self._length, self._guard, self._regions
+        return other
+
+    def regions(self, data: Union[BytesLike, CowBuffer]) -> Optional[RegionMap]:
+        """
+        Region map for data, indexing it if its length or protected bytes changed.
+
+        Args:
+            data: The current buffer
+
+        Returns:
+            The RegionMap, or None if the format is not recognised
+        """
+        if self._length == len(data) and self._guard == _protected_digest(data, self._regions):
+            return self._regions
+        source = data
+        if isinstance(data, CowBuffer):
+            source = data.base if data.is_pristine else data.tobytes()
+        self._regions = index_regions(source)
+        self._length = len(data)
+        self._guard = _protected_digest(data, self._regions)
+        return self._regions
+
+    def protection(self, data: Union[BytesLike, CowBuffer], header_size: int,
+                   structure: bool) -> Tuple[int, Optional[List[Region]]]:
+        """
+        Decide which bytes of data an operation may modify.
+
+        Args:
+            data: The current buffer
+            header_size: Fixed number of leading bytes to protect
+            structure: Use the format's data regions when it is recognised
+
+        Returns:
+            Tuple of (header_size, target regions or None); with structure
+            protection on a recognised format, the regions replace the header
+        """
+        if structure:
+            regions = self.regions(data)
+            if regions is not None:
+                return 0, regions.targets
+        return header_size, None
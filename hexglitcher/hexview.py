@@ -0,0 +1,157 @@
+"""
+Row model for a virtualised hex view.
+
+A hex view of a multi-gigabyte file cannot format the whole file. The
+functions here only ever touch the rows that are on screen: format_rows()
+reads one window of the buffer (a CowBuffer read costs the same anywhere in
+the file) and lays it out as offset, hex and ASCII columns, marking the
+bytes that differ from a reference buffer such as the original file. The
+cost of a refresh depends on the window size, never on the file size.
+
+next_difference() finds where the next modified byte is, so a view can jump
+straight to where a glitch landed. Buffers sharing one base are compared
+through their patch overlays; other buffers of equal length are compared
+chunk by chunk.
+"""
+
+import heapq
+from bisect import bisect_left
+from typing import List, NamedTuple, Optional, Union
+
+from .buffer import BytesLike, CowBuffer
+
+BYTES_PER_ROW = 16
+# Bytes compared per step when scanning for the next difference
+SCAN_CHUNK = 1024 * 1024
+
+Buffer = Union[BytesLike, CowBuffer]
+
+# Printable ASCII shows as itself, everything else as a dot
+_ASCII = bytes(b if 0x20 <= b < 0x7F else 0x2E for b in range(256))
+
+
+class HexRow(NamedTuple):
+    """One formatted row of the hex view."""
+    offset: int
+    text: str
+    modified: List[int]  # Columns (0 to BYTES_PER_ROW - 1) that differ from the reference
+
+
+def offset_width(length: int) -> int:
+    """Hex digits needed for the offsets of a buffer of length bytes, at least 8."""
+    return max(8, len(f"{max(length - 1, 0):X}"))
+
+
+def row_count(length: int) -> int:
+    """Number of rows needed to show length bytes."""
+    return -(-length // BYTES_PER_ROW)
+
+
+def hex_column(width: int, index: int) -> int:
+    """Text column of the hex digits of byte index within a row."""
+    return width + 2 + 3 * index
+
+
+def ascii_column(width: int, index: int) -> int:
+    """Text column of the ASCII character of byte index within a row."""
+    return width + 3 + 3 * BYTES_PER_ROW + index
+
+
+def byte_index(width: int, column: int) -> Optional[int]:
+    """
+    Map a text column back to the byte it shows.
+
+    Args:
+        width: Offset width of the view, see offset_width
+        column: Character column within a row
+
+    Returns:
+        The byte index within the row, or None for the offset column and gaps
+    """
+    first_ascii = ascii_column(width, 0)
+    if first_ascii <= column < first_ascii + BYTES_PER_ROW:
+        return column - first_ascii
+    index, within = divmod(column - hex_column(width, 0), 3)
+    if 0 <= index < BYTES_PER_ROW and within < 2:
+        return index
+    return None
+
+
+def format_rows(data: Buffer, first_row: int, count: int, reference: Optional[Buffer] = None) -> List[HexRow]:
+    """
+    Format a window of rows.
+
+    Args:
+        data: The buffer to show
+        first_row: Index of the first row to format
+        count: Maximum number of rows
+        reference: Buffer to compare with for highlighting; ignored unless
+            it has the same length as data
+
+    Returns:
+        One HexRow per row in the window, fewer at the end of the buffer
+    """
+    width = offset_width(len(data))
+    start = first_row * BYTES_PER_ROW
+    end = min(start + count * BYTES_PER_ROW, len(data))
+    if start >= end:
+        return []
+    window = bytes(data[start:end])
+    original = bytes(reference[start:end]) if reference is not None and len(reference) == len(data) else None
+
+    rows = []
+    for pos in range(0, len(window), BYTES_PER_ROW):
+        chunk = window[pos:pos + BYTES_PER_ROW]
+        hex_part = chunk.hex(" ").upper().ljust(3 * BYTES_PER_ROW - 1)
+        text = f"{start + pos:0{width}X}  {hex_part}  {chunk.translate(_ASCII).decode('ascii')}"
+        modified = []
+        if original is not None:
+            before = original[pos:pos + BYTES_PER_ROW]
+            if before != chunk:
+                modified = [i for i, (a, b) in enumerate(zip(chunk, before)) if a != b]
+        rows.append(HexRow(start + pos, text, modified))
+    return rows
+
+
+def _first_mismatch(a: bytes, b: bytes) -> int:
+    """Index of the first differing byte of two unequal, equally long byte strings."""
+    lo, hi = 0, len(a)
+    # Bisect on prefix equality, each comparison a memcmp
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def next_difference(data: Buffer, reference: Buffer, start: int = 0) -> Optional[int]:
+    """
+    Find the first offset at or after start where data differs from reference.
+
+    Args:
+        data: The modified buffer
+        reference: The buffer to compare with, of the same length
+        start: Offset to search from
+
+    Returns:
+        The offset, or None if there is no later difference or the lengths differ
+    """
+    if len(data) != len(reference):
+        return None
+    if isinstance(data, CowBuffer) and isinstance(reference, CowBuffer) and data.base is reference.base:
+        # Only patched offsets can differ; check them in order
+        candidates = heapq.merge(*(patches.offsets[bisect_left(patches.offsets, start):]
+                                   for patches in (data.patches, reference.patches)))
+        for offset in candidates:
+            if data[offset] != reference[offset]:
+                return offset
+        return None
+
+    for offset in range(start, len(data), SCAN_CHUNK):
+        a = bytes(data[offset:offset + SCAN_CHUNK])
+        b = bytes(reference[offset:offset + SCAN_CHUNK])
+        if a != b:
+            return offset + _first_mismatch(a, b)
+    return None
@@ -0,0 +1,370 @@
+"""
+Undo/redo history for stacked glitch operations.
+
+Each step stores only what changed between two buffer states, never a full
+copy. Same-length edits of a CowBuffer become a PatchStep (the touched
+offsets with their old and new byte values). A length-changing find and
+replace becomes a ReplaceStep (the match offsets plus both patterns), and
+any other length change becomes a SpliceStep holding just the differing
+middle segment. The oldest steps are evicted once the history exceeds its
+byte budget; the newest step is always kept.
+
+Undoing and redoing a PatchStep only touches the overlay: patches that
+write a base byte back are dropped, so undoing to the start gives a
+pristine buffer again. Steps that change the length cannot share the base
+and build a new one, one copy of the file per undo or redo.
+"""
+
+import logging
+from array import array
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to per-offset loops
+    np = None
+
+from . import engine
+from .buffer import CowBuffer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_STEPS = 500
+
+
+class PatchStep:
+    """Same-length change: offsets plus their values before and after."""
+
+    def __init__(self, label: str, offsets: array, old: array, new: array,
+                 op: Optional[Dict[str, Any]] = None) -> None:
+        self.label = label
+        self.offsets = offsets
+        self.old = old
+        self.new = new
+        self.op = op
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by this step."""
+        return len(self.offsets) * self.offsets.itemsize + len(self.old) + len(self.new)
+
+    def undo(self, buf: CowBuffer) -> CowBuffer:
+        """Return a copy of buf with this step reverted, dropping patches that restore base bytes."""
+        return self._write(buf, self.old)
+
+    def redo(self, buf: CowBuffer) -> CowBuffer:
+        """Return a copy of buf with this step reapplied."""
+        return self._write(buf, self.new)
+
+    def _write(self, buf: CowBuffer, values: array) -> CowBuffer:
+        # Writing a base byte back removes its overlay entry, so undoing every
+        # step returns a pristine buffer instead of one full of no-op patches
+        return CowBuffer(buf.base, buf.patches.merge(self.offsets, values).prune(buf.base))
+
+
+class SpliceStep:
+    """Length-changing edit: one segment replaced by another at start."""
+
+    def __init__(self, label: str, start: int, old: bytes, new: bytes,
+                 op: Optional[Dict[str, Any]] = None) -> None:
+        self.label = label
+        self.start = start
+        self.old = old
+        self.new = new
+        self.op = op
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by this step."""
+        return len(self.old) + len(self.new)
+
+    def _swap(self, buf: CowBuffer, remove: bytes, insert: bytes) -> CowBuffer:
+        # A buffer of another length needs a new contiguous base, so this
+        # costs one O(file) copy; only the segments are kept between swaps
+        end = self.start + len(remove)
+        data = bytearray(buf.read(0, self.start))
+        data += insert
+        data += buf.read(end, len(buf) - end)
+        return CowBuffer(bytes(data))
+
+    def undo(self, buf: CowBuffer) -> CowBuffer:
+        """Return buf with the new segment swapped back for the old one."""
+        return self._swap(buf, self.new, self.old)
+
+    def redo(self, buf: CowBuffer) -> CowBuffer:
+        """Return buf with the old segment swapped for the new one."""
+        return self._swap(buf, self.old, self.new)
+
+
+class ReplaceStep:
+    """Find/replace of one pattern at known offsets, possibly changing length."""
+
+    def __init__(self, label: str, offsets: array, find: bytes, replace: bytes,
+                 op: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Args:
+            label: Human-readable name of the operation
+            offsets: array('q') of match offsets in the buffer before the step
+            find: The matched bytes
+            replace: The bytes written in place of each match
+            op: Optional machine-readable description of the operation
+        """
+        self.label = label
+        self.offsets = offsets
+        self.find = find
+        self.replace = replace
+        self.op = op
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by this step."""
+        return len(self.offsets) * self.offsets.itemsize + len(self.find) + len(self.replace)
+
+    def undo(self, buf: CowBuffer) -> CowBuffer:
+        """Return buf with every replacement swapped back for the original match."""
+        delta = len(self.replace) - len(self.find)
+        shifted = [offset + i * delta for i, offset in enumerate(self.offsets)]
+        result = engine.replace_matches(buf, shifted, len(self.replace), self.find)
+        if result.base is buf.base:
+            # Same-length replacements patch the shared base; drop the no-op patches
+            result = CowBuffer(result.base, result.patches.prune(result.base))
+        return result
+
+    def redo(self, buf: CowBuffer) -> CowBuffer:
+        """Return buf with the replacements reapplied."""
+        return engine.replace_matches(buf, self.offsets, len(self.find), self.replace)
+
+
+Step = Union[PatchStep, SpliceStep, ReplaceStep]
+
+
+def _patch_diff(label: str, before: CowBuffer, after: CowBuffer,
+                op: Optional[Dict[str, Any]]) -> PatchStep:
+    """Diff two buffers over the same base by comparing only patched offsets."""
+    if np is not None:
+        candidates = np.union1d(np.frombuffer(before.patches.offsets, dtype=np.int64),
+                                np.frombuffer(after.patches.offsets, dtype=np.int64))
+        old = before.gather(candidates)
+        new = after.gather(candidates)
+        changed = old != new
+        offsets = array("q")
+        offsets.frombytes(candidates[changed].tobytes())
+        return PatchStep(label, offsets, array("B", old[changed].tobytes()),
+                         array("B", new[changed].tobytes()), op)
+
+    candidates = sorted(set(before.patches.offsets) | set(after.patches.offsets))
+    offsets, old, new = array("q"), array("B"), array("B")
+    for offset in candidates:
+        a, b = before[offset], after[offset]
+        if a != b:
+            offsets.append(offset)
+            old.append(a)
+            new.append(b)
+    return PatchStep(label, offsets, old, new, op)
+
+
+def _common_prefix(a: bytes, b: bytes, limit: int, step: int = 64 * 1024) -> int:
+    """Length of the common prefix of a and b, comparing in chunks."""
+    prefix = 0
+    while prefix < limit:
+        chunk = min(step, limit - prefix)
+        if a[prefix:prefix + chunk] != b[prefix:prefix + chunk]:
+            while a[prefix] == b[prefix]:
+                prefix += 1
+            return prefix
+        prefix += chunk
+    return limit
+
+
+def _splice_diff(label: str, before: bytes, after: bytes,
+                 op: Optional[Dict[str, Any]]) -> SpliceStep:
+    """Diff two byte strings as a single replaced middle segment."""
+    limit = min(len(before), len(after))
+    prefix = _common_prefix(before, after, limit)
+    # The common suffix is the common prefix of the reversed remainders
+    suffix = _common_prefix(before[prefix:][::-1], after[prefix:][::-1], limit - prefix)
+
+    return SpliceStep(label, prefix, before[prefix:len(before) - suffix],
+                      after[prefix:len(after) - suffix], op)
+
+
+def diff_buffers(label: str, before: CowBuffer, after: CowBuffer,
+                 op: Optional[Dict[str, Any]] = None) -> Step:
+    """
+    Build the compact history step that turns before into after.
+
+    Args:
+        label: Human-readable name of the operation
+        before: Buffer state prior to the operation
+        after: Buffer state produced by the operation
+        op: Optional machine-readable description of the operation
+
+    Returns:
+        A PatchStep when both share a base and length, else a SpliceStep
+    """
+    if after.base is before.base and len(after) == len(before):
+        return _patch_diff(label, before, after, op)
+    return _splice_diff(label, before.tobytes(), after.tobytes(), op)
+
+
+class History:
+    """Bounded undo/redo stacks of compact diff steps."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_steps: int = DEFAULT_MAX_STEPS) -> None:
+        """
+        Create an empty history.
+
+        Args:
+            max_bytes: Memory budget for stored steps; oldest are evicted first
+            max_steps: Maximum number of undoable steps
+        """
+        self.max_bytes = max_bytes
+        self.max_steps = max_steps
+        self._undo: Deque[Step] = deque()
+        self._redo: Deque[Step] = deque()
+        self._bytes = 0
+        # Ops of evicted steps: no longer undoable, but still part of the recipe
+        self._evicted_ops: List[Optional[Dict[str, Any]]] = []
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by all stored steps."""
+        return self._bytes
+
+    @property
+    def undo_count(self) -> int:
+        """Number of steps that can be undone."""
+        return len(self._undo)
+
+    @property
+    def redo_count(self) -> int:
+        """Number of steps that can be redone."""
+        return len(self._redo)
+
+    @property
+    def last(self) -> Optional[Step]:
+        """The most recent undoable step, or None."""
+        return self._undo[-1] if self._undo else None
+
+    def clear(self) -> None:
+        """Forget all steps."""
+        self._undo.clear()
+        self._redo.clear()
+        self._bytes = 0
+        self._evicted_ops.clear()
+
+    def ops(self) -> List[Dict[str, Any]]:
+        """
+        Operation descriptions from the original file to the current state.
+
+        Includes steps that were evicted from the undo stack.
+
+        Returns:
+            The op dicts in the order they were applied
+
+        Raises:
+            ValueError: If a step was recorded without an op description
+        """
+        ops = self._evicted_ops + [step.op for step in self._undo]
+        if any(op is None for op in ops):
+            raise ValueError("History contains steps that cannot be exported")
+        return ops
+
+    def push(self, label: str, before: CowBuffer, after: CowBuffer,
+             op: Optional[Dict[str, Any]] = None) -> Step:
+        """
+        Record an operation that turned before into after.
+
+        Clears the redo stack and evicts old steps if over budget.
+
+        Args:
+            label: Human-readable name of the operation
+            before: Buffer state prior to the operation
+            after: Buffer state produced by the operation
+            op: Optional machine-readable description of the operation
+
+        Returns:
+            The recorded step
+        """
+        return self.push_step(diff_buffers(label, before, after, op))
+
+    def push_step(self, step: Step) -> Step:
+        """
+        Record a step built by the caller, e.g. a ReplaceStep.
+
+        Args:
+            step: The step to record
+
+        Returns:
+            The recorded step
+        """
+        for old in self._redo:
+            self._bytes -= old.nbytes
+        self._redo.clear()
+
+        self._undo.append(step)
+        self._bytes += step.nbytes
+        self._evict()
+        logger.info(f"History: {step.label} ({step.nbytes} bytes, {len(self._undo)} steps)")
+        return step
+
+    def replace_last(self, label: str, before: CowBuffer, after: CowBuffer,
+                     op: Optional[Dict[str, Any]] = None) -> Step:
+        """
+        Swap the most recent step for a new one, e.g. to re-run it with other parameters.
+
+        Args:
+            label: Human-readable name of the operation
+            before: Buffer state prior to the step being replaced
+            after: Buffer state produced by the new operation
+            op: Optional machine-readable description of the operation
+
+        Returns:
+            The recorded step
+        """
+        if self._undo:
+            old = self._undo.pop()
+            self._bytes -= old.nbytes
+        return self.push(label, before, after, op)
+
+    def undo(self, buf: CowBuffer) -> Optional[CowBuffer]:
+        """
+        Revert the most recent step.
+
+        Args:
+            buf: The current buffer state
+
+        Returns:
+            The previous buffer state, or None if there is nothing to undo
+        """
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self._redo.append(step)
+        return step.undo(buf)
+
+    def redo(self, buf: CowBuffer) -> Optional[CowBuffer]:
+        """
+        Reapply the most recently undone step.
+
+        Args:
+            buf: The current buffer state
+
+        Returns:
+            The next buffer state, or None if there is nothing to redo
+        """
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self._undo.append(step)
+        return step.redo(buf)
+
+    def _evict(self) -> None:
+        """Drop the oldest undo steps until within both limits, keeping the newest."""
+        while len(self._undo) > 1 and (self._bytes > self.max_bytes or len(self._undo) > self.max_steps):
+            old = self._undo.popleft()
+            self._bytes -= old.nbytes
+            self._evicted_ops.append(old.op)
+            logger.info(f"History: evicted '{old.label}' ({old.nbytes} bytes)")
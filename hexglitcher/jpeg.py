@@ -0,0 +1,213 @@
+"""
+Baseline JPEG scan layout for partial re-decoding.
+
+A sequential JPEG with a restart interval (DRI) is coded as independent
+runs of MCUs: at every RSTn marker the decoder resets its DC predictions
+and byte-aligns, so decoding can start at any restart marker. When a
+restart interval begins at the left edge of an MCU row, everything from
+that marker on is a valid scan for the lower part of the image.
+
+suffix_jpeg() builds such a file: the original headers with the frame
+height reduced, followed by the scan data after a restart marker. Decoding
+it gives exactly the rows below that marker, so a preview only needs to
+re-decode the rows at and after the first modified byte and can reuse the
+rows above from an earlier decode.
+
+The decoder expects the first marker of a scan to be RST0, so the markers
+in the copied scan data are renumbered by a constant rotation. Their
+relative numbering is unchanged, so a decoder resynchronising on damaged
+markers behaves as it would in the full file.
+
+Restart markers of an edited CowBuffer are found from those of its base:
+a patch can only create or destroy a marker at the patched byte or the one
+before it, so patched_restart_markers() re-checks just those positions
+instead of scanning a materialised copy of the file.
+"""
+
+import re
+import struct
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple, Optional
+
+from .buffer import BytesLike, CowBuffer
+
+_RESTART = re.compile(rb"\xff[\xd0-\xd7]")
+# Sequential Huffman frames; progressive and lossless scans cannot be split
+_SEQUENTIAL_SOF = (0xC0, 0xC1)
+
+
+class ScanLayout(NamedTuple):
+    """Where a single-scan, restart-coded JPEG keeps its geometry and scan data."""
+    height_offset: int     # Offset of the 2-byte frame height in SOF
+    scan_start: int        # First byte of entropy-coded data
+    width: int
+    height: int
+    mcu_height: int        # Pixel rows per MCU row
+    mcus_per_row: int
+    restart_interval: int  # MCUs per restart interval
+
+
+def scan_layout(data: BytesLike) -> Optional[ScanLayout]:
+    """
+    Parse the headers of a JPEG that can be re-decoded from a restart marker.
+
+    Args:
+        data: The complete JPEG file contents
+
+    Returns:
+        The ScanLayout, or None unless the file is a sequential JPEG with a
+        restart interval and one scan covering all components
+    """
+    if bytes(data[:2]) != b"\xff\xd8":
+        return None
+    n = len(data)
+    pos = 2
+    frame = None
+    restart_interval = 0
+    try:
+        while pos + 4 <= n and data[pos] == 0xFF:
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                pos += 1
+                continue
+            length = struct.unpack_from(">H", data, pos + 2)[0]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                if marker not in _SEQUENTIAL_SOF:
+                    return None
+                height, width, count = struct.unpack_from(">HHB", data, pos + 5)
+                factors = [data[pos + 11 + 3 * i] for i in range(count)]
+                frame = (pos + 5, width, height, count, factors)
+            elif marker == 0xDD:
+                restart_interval = struct.unpack_from(">H", data, pos + 4)[0]
+            elif marker == 0xDA:
+                if frame is None or not restart_interval or data[pos + 4] != frame[3]:
+                    return None
+                height_offset, width, height, count, factors = frame
+                if count == 1:
+                    # A single component is coded in 8x8 blocks regardless of sampling
+                    mcu_width = mcu_height = 8
+                else:
+                    mcu_width = 8 * max(f >> 4 for f in factors)
+                    mcu_height = 8 * max(f & 0x0F for f in factors)
+                if not width or not height or not mcu_width or not mcu_height:
+                    return None
+                return ScanLayout(height_offset, pos + 2 + length, width, height, mcu_height,
+                                  -(-width // mcu_width), restart_interval)
+            pos += 2 + length
+    except (struct.error, IndexError):
+        return None
+    return None
+
+
+def restart_candidates(data: BytesLike, layout: ScanLayout) -> array:
+    """
+    Offsets of every RSTn marker-like byte pair in the scan, in sequence or not.
+
+    Args:
+        data: The complete JPEG file contents
+        layout: Its scan layout
+
+    Returns:
+        array('q') of increasing offsets
+    """
+    return array("q", (layout.scan_start + match.start()
+                       for match in _RESTART.finditer(memoryview(data)[layout.scan_start:])))
+
+
+def _in_sequence(data: "BytesLike | CowBuffer", candidates: array) -> array:
+    """The leading candidates numbered RST0, RST1, ... in order."""
+    markers = array("q")
+    for i, offset in enumerate(candidates):
+        if data[offset + 1] != 0xD0 + i % 8:
+            break
+        markers.append(offset)
+    return markers
+
+
+def restart_markers(data: BytesLike, layout: ScanLayout) -> array:
+    """
+    Offsets of the restart markers in the scan, in order.
+
+    Stops at the first marker out of sequence: after a damaged, missing or
+    spurious marker the count no longer tells which interval follows.
+
+    Args:
+        data: The complete JPEG file contents
+        layout: Its scan layout
+
+    Returns:
+        array('q') of marker offsets; marker i ends restart interval i
+    """
+    return _in_sequence(data, restart_candidates(data, layout))
+
+
+def patched_restart_markers(buf: CowBuffer, layout: ScanLayout, base_candidates: array) -> array:
+    """
+    restart_markers() of an edited buffer, from the candidates of its base.
+
+    Args:
+        buf: The edited buffer; no patch may lie before layout.scan_start
+        layout: The scan layout of buf.base
+        base_candidates: restart_candidates() of buf.base
+
+    Returns:
+        array('q') of marker offsets, as restart_markers(buf.tobytes(), layout)
+    """
+    end = len(buf) - 1
+    touched = set()
+    for offset in buf.patches.offsets:
+        touched.update(pos for pos in (offset - 1, offset) if layout.scan_start <= pos < end)
+    if not touched:
+        return _in_sequence(buf, base_candidates)
+    kept = [offset for offset in base_candidates if offset not in touched]
+    created = [pos for pos in touched if buf[pos] == 0xFF and 0xD0 <= buf[pos + 1] <= 0xD7]
+    return _in_sequence(buf, array("q", sorted(kept + created)))
+
+
+def resume_point(layout: ScanLayout, markers: array, offset: int) -> Optional[int]:
+    """
+    Choose the last restart marker before offset from which decoding can resume.
+
+    Args:
+        layout: The scan layout
+        markers: Restart marker offsets from restart_markers
+        offset: First modified byte; the returned marker lies before it
+
+    Returns:
+        Index into markers, or None if no usable marker precedes offset.
+        Decoding resumes after markers[i] at the start of MCU row
+        (i + 1) * restart_interval // mcus_per_row.
+    """
+    # The marker itself must lie before offset, not just where it starts
+    for i in range(bisect_right(markers, offset - 2) - 1, -1, -1):
+        if (i + 1) * layout.restart_interval % layout.mcus_per_row == 0:
+            return i
+    return None
+
+
+def resume_row(layout: ScanLayout, index: int) -> int:
+    """First pixel row decoded when resuming after restart marker index."""
+    return (index + 1) * layout.restart_interval // layout.mcus_per_row * layout.mcu_height
+
+
+def suffix_jpeg(data: BytesLike, layout: ScanLayout, markers: array, index: int) -> bytes:
+    """
+    Build a JPEG holding only the rows after restart marker index, decodable on its own.
+
+    Args:
+        data: The complete JPEG file contents
+        layout: Its scan layout
+        markers: Restart marker offsets from restart_markers
+        index: The marker to resume after, from resume_point
+
+    Returns:
+        The suffix file, resume_row(layout, index) rows shorter than data
+    """
+    header = bytearray(data[:layout.scan_start])
+    struct.pack_into(">H", header, layout.height_offset, layout.height - resume_row(layout, index))
+    scan = bytes(data[markers[index] + 2:])
+    shift = (index + 1) % 8
+    if shift:
+        scan = _RESTART.sub(lambda m: bytes((0xFF, 0xD0 + (m.group()[1] - 0xD0 - shift) % 8)), scan)
+    return bytes(header) + scan
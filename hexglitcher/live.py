@@ -0,0 +1,63 @@
+"""
+Live re-running of an operation while its parameters change.
+
+Dragging a slider produces dozens of value changes per second, far more
+than an engine run plus a decode can keep up with on a large file. The GUI
+throttles the events to one submission per frame budget, and LiveRunner
+coalesces what is left: it runs jobs on a background thread, and a job
+submitted while another is running replaces any job still waiting, so at
+most one run is in flight and one is queued however fast values change.
+Results of superseded jobs are dropped instead of being delivered.
+
+LiveRunner and PreviewWorker share that thread (see worker.LatestWorker);
+results are polled from the Tk thread, which then commits the newest one.
+"""
+
+import logging
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+from .worker import LatestWorker
+
+logger = logging.getLogger(__name__)
+
+
+class LiveResult(NamedTuple):
+    """A finished live job."""
+    generation: int
+    value: Any
+    error: Optional[str]
+    seconds: float
+
+
+class LiveRunner(LatestWorker):
+    """Background thread that runs the most recently submitted job."""
+
+    def __init__(self) -> None:
+        """Start the worker thread."""
+        self.runs = 0
+        super().__init__("live-runner")
+
+    def submit(self, job: Callable[[], Any]) -> int:
+        """
+        Queue job, replacing any job that has not started yet.
+
+        Args:
+            job: Callable producing the result; it must not touch Tk
+
+        Returns:
+            The generation number identifying this job
+        """
+        return self._submit(job)
+
+    def process(self, generation: int, job: Callable[[], Any]) -> LiveResult:
+        """Run one job, timing it and catching its errors."""
+        began = time.perf_counter()
+        value, error = None, None
+        try:
+            value = job()
+        except Exception as e:
+            logger.warning(f"Live run failed: {e}")
+            error = str(e)
+        self.runs += 1
+        return LiveResult(generation, value, error, time.perf_counter() - began)
@@ -0,0 +1,216 @@
+"""
+Sparse byte patches.
+
+A PatchSet records byte overwrites as two parallel, sorted arrays: the
+offsets that changed and their new values. It is immutable, so buffers
+can share one freely; combining edits produces a new PatchSet. Memory is
+nine bytes per modified byte regardless of the size of the file being
+patched.
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to pure-Python merging
+    np = None
+
+
+def _to_array(typecode: str, values: Iterable[int]) -> array:
+    """Build a stdlib array, converting from NumPy without a Python loop."""
+    if np is not None and isinstance(values, np.ndarray):
+        result = array(typecode)
+        result.frombytes(values.astype(np.int64 if typecode == "q" else np.uint8).tobytes())
+        return result
+    return array(typecode, values)
+
+
+def _np_values(values: Sequence[int]) -> "np.ndarray":
+    """View or convert byte values as a uint8 array."""
+    if isinstance(values, (bytes, bytearray, memoryview, array)):
+        return np.frombuffer(values, dtype=np.uint8)
+    return np.asarray(values, dtype=np.uint8)
+
+
+class PatchSet:
+    """Immutable sorted set of (offset, value) byte overwrites."""
+
+    __slots__ = ("offsets", "values")
+
+    def __init__(self, offsets: Optional[array] = None, values: Optional[array] = None) -> None:
+        """
+        Wrap already sorted, duplicate-free arrays. Use from_edits otherwise.
+
+        Args:
+            offsets: array('q') of strictly increasing offsets
+            values: array('B') with one value per offset
+        """
+        self.offsets = offsets if offsets is not None else array("q")
+        self.values = values if values is not None else array("B")
+
+    @classmethod
+    def from_edits(cls, offsets: Sequence[int], values: Sequence[int]) -> "PatchSet":
+        """
+        Build a PatchSet from unordered edits; later duplicates win.
+
+        Args:
+            offsets: Offsets to overwrite (list or NumPy array)
+            values: One byte value per offset
+
+        Returns:
+            The normalised PatchSet
+        """
+        if len(offsets) != len(values):
+            raise ValueError("offsets and values must have the same length")
+        if not len(offsets):
+            return cls()
+
+        if np is not None:
+            o = np.asarray(offsets, dtype=np.int64)
+            v = _np_values(values)
+            order = np.argsort(o, kind="stable")
+            o, v = o[order], v[order]
+            # Keep the last edit of each run of equal offsets
+            keep = np.empty(len(o), dtype=bool)
+            keep[-1] = True
+            np.not_equal(o[1:], o[:-1], out=keep[:-1])
+            return cls(_to_array("q", o[keep]), _to_array("B", v[keep]))
+
+        merged_offsets = array("q")
+        merged_values = array("B")
+        for offset, value in sorted(zip(offsets, values), key=lambda edit: edit[0]):
+            if merged_offsets and merged_offsets[-1] == offset:
+                merged_values[-1] = value
+            else:
+                merged_offsets.append(offset)
+                merged_values.append(value)
+        return cls(merged_offsets, merged_values)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __bool__(self) -> bool:
+        return len(self.offsets) > 0
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the offset and value arrays."""
+        return len(self.offsets) * self.offsets.itemsize + len(self.values) * self.values.itemsize
+
+    @property
+    def first_offset(self) -> Optional[int]:
+        """Lowest patched offset, or None if empty."""
+        return self.offsets[0] if self.offsets else None
+
+    @property
+    def last_offset(self) -> Optional[int]:
+        """Highest patched offset, or None if empty."""
+        return self.offsets[-1] if self.offsets else None
+
+    def first_difference(self, other: "PatchSet") -> Optional[int]:
+        """
+        Lowest offset at which two overlays on the same base may read differently.
+
+        Args:
+            other: The PatchSet to compare with
+
+        Returns:
+            The offset of the first edit the two do not share, or None if
+            they are identical
+        """
+        if self is other:
+            return None
+        # Bisect for the longest common prefix, comparing raw bytes with memcmp
+        offsets = (memoryview(self.offsets).cast("B"), memoryview(other.offsets).cast("B"))
+        values = (memoryview(self.values), memoryview(other.values))
+        size = self.offsets.itemsize
+        lo, hi = 0, min(len(self), len(other))
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if offsets[0][:mid * size] == offsets[1][:mid * size] and values[0][:mid] == values[1][:mid]:
+                lo = mid
+            else:
+                hi = mid - 1
+        if lo == len(self) and lo == len(other):
+            return None
+        return min(patches.offsets[lo] for patches in (self, other) if lo < len(patches))
+
+    def merge(self, offsets: Sequence[int], values: Sequence[int]) -> "PatchSet":
+        """
+        Return a new PatchSet with extra edits layered on top of this one.
+
+        Args:
+            offsets: Offsets to overwrite
+            values: One byte value per offset
+
+        Returns:
+            The combined PatchSet; the new edits win on conflicts
+        """
+        if not self:
+            return PatchSet.from_edits(offsets, values)
+        if np is not None:
+            return PatchSet.from_edits(
+                np.concatenate((np.frombuffer(self.offsets, dtype=np.int64), np.asarray(offsets, dtype=np.int64))),
+                np.concatenate((np.frombuffer(self.values, dtype=np.uint8), _np_values(values))),
+            )
+        return PatchSet.from_edits(list(self.offsets) + list(offsets), list(self.values) + list(values))
+
+    def prune(self, base: Union[bytes, bytearray, memoryview]) -> "PatchSet":
+        """
+        Drop the patches that write the byte the base already holds.
+
+        Such patches change nothing, but they keep a buffer from reading as
+        pristine and give equal contents different overlays.
+
+        Args:
+            base: The bytes this overlay is applied to
+
+        Returns:
+            This PatchSet if nothing is redundant, else a smaller new one
+        """
+        if not self:
+            return self
+        if np is not None:
+            o = np.frombuffer(self.offsets, dtype=np.int64)
+            v = np.frombuffer(self.values, dtype=np.uint8)
+            keep = np.frombuffer(base, dtype=np.uint8)[o] != v
+            if keep.all():
+                return self
+            return PatchSet(_to_array("q", o[keep]), _to_array("B", v[keep]))
+
+        kept = [(offset, value) for offset, value in zip(self.offsets, self.values) if base[offset] != value]
+        if len(kept) == len(self):
+            return self
+        return PatchSet(array("q", (offset for offset, _ in kept)), array("B", (value for _, value in kept)))
+
+    def span(self, start: int, end: int) -> Tuple[int, int]:
+        """Index range [lo, hi) of patches whose offsets fall in [start, end)."""
+        return bisect_left(self.offsets, start), bisect_left(self.offsets, end)
+
+    def get(self, offset: int) -> Optional[int]:
+        """Patched value at offset, or None if that byte is unpatched."""
+        i = bisect_left(self.offsets, offset)
+        if i < len(self.offsets) and self.offsets[i] == offset:
+            return self.values[i]
+        return None
+
+    def apply(self, target: Union[bytearray, memoryview], base_offset: int = 0) -> None:
+        """
+        Write the patches that fall inside a window into target.
+
+        Args:
+            target: Writable buffer holding bytes [base_offset, base_offset + len(target))
+            base_offset: File offset of target[0]
+        """
+        lo, hi = self.span(base_offset, base_offset + len(target))
+        if lo == hi:
+            return
+        if np is not None:
+            window = np.frombuffer(target, dtype=np.uint8)
+            window[np.frombuffer(self.offsets, dtype=np.int64)[lo:hi] - base_offset] = \
+                np.frombuffer(self.values, dtype=np.uint8)[lo:hi]
+            return
+        for i in range(lo, hi):
+            target[self.offsets[i] - base_offset] = self.values[i]
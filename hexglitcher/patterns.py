@@ -0,0 +1,111 @@
+"""
+Byte search patterns for find/replace.
+
+Three kinds of pattern text are understood, all compiled to a bytes
+``re.Pattern`` so that a single scanner handles every kind:
+
+- ``hex``: a literal byte sequence such as ``"FF D8"``
+- ``wildcard``: hex bytes where ``??`` matches any single byte, e.g.
+  ``"FF ?? D8"``
+- ``regex``: a Python ``re`` bytes pattern, written as text; characters
+  map one-to-one to bytes (latin-1), so ``\\xff\\xd8.{2}`` works as expected
+
+Compiled patterns are cached per (text, kind), so repeated operations with
+the same pattern do not re-parse it. Hex and wildcard patterns always match
+a fixed number of bytes (see match_length); a regex's match length is only
+known to its author.
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional, Pattern
+
+from .engine import HEX_DIGITS, parse_hex
+
+PATTERN_KINDS = ("hex", "wildcard", "regex")
+WILDCARD = "??"
+
+
+def _wildcard_regex(text: str) -> bytes:
+    """Translate wildcard hex text into an escaped regex source."""
+    cleaned = text.strip().replace(" ", "")
+    if not cleaned:
+        raise ValueError("Find value is required")
+    if len(cleaned) % 2 != 0:
+        raise ValueError("Wildcard patterns must consist of complete bytes or '??'")
+
+    parts = []
+    for i in range(0, len(cleaned), 2):
+        token = cleaned[i:i + 2]
+        if token == WILDCARD:
+            parts.append(b".")
+        elif all(c in HEX_DIGITS for c in token):
+            parts.append(re.escape(bytes.fromhex(token)))
+        else:
+            raise ValueError(f"Invalid wildcard token: {token}")
+    return b"".join(parts)
+
+
+@lru_cache(maxsize=64)
+def compile_pattern(text: str, kind: str = "hex") -> Pattern[bytes]:
+    """
+    Compile user-entered pattern text into a bytes regular expression.
+
+    Args:
+        text: Pattern text in the syntax of kind
+        kind: One of PATTERN_KINDS
+
+    Returns:
+        The compiled pattern (DOTALL, so ``.`` matches every byte)
+
+    Raises:
+        ValueError: If kind is unknown, the text is invalid, or the
+            pattern can match the empty string
+    """
+    if kind == "hex":
+        source = re.escape(parse_hex(text, "Find"))
+    elif kind == "wildcard":
+        source = _wildcard_regex(text)
+    elif kind == "regex":
+        if not text:
+            raise ValueError("Find value is required")
+        try:
+            source = text.encode("latin-1")
+        except UnicodeEncodeError:
+            raise ValueError("Regex patterns may only contain characters \\x00-\\xff")
+    else:
+        raise ValueError(f"Unknown pattern kind: {kind}")
+
+    try:
+        pattern = re.compile(source, re.DOTALL)
+    except re.error as e:
+        raise ValueError(f"Invalid regex: {e}")
+
+    # An empty match would insert the replacement between every byte
+    if pattern.fullmatch(b"") is not None:
+        raise ValueError("Pattern must not match an empty byte sequence")
+    return pattern
+
+
+def match_length(text: str, kind: str = "hex") -> Optional[int]:
+    """
+    Length in bytes of every match of a fixed-length pattern.
+
+    Args:
+        text: Pattern text in the syntax of kind
+        kind: One of PATTERN_KINDS
+
+    Returns:
+        The match length for hex and wildcard patterns, None for regex
+
+    Raises:
+        ValueError: If kind is unknown or the text is invalid
+    """
+    if kind == "hex":
+        return len(parse_hex(text, "Find"))
+    if kind == "wildcard":
+        _wildcard_regex(text)  # Validates the tokens
+        return len(text.strip().replace(" ", "")) // 2
+    if kind == "regex":
+        return None
+    raise ValueError(f"Unknown pattern kind: {kind}")
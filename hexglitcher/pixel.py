@@ -0,0 +1,382 @@
+"""
+Pixel-domain glitch effects.
+
+Byte-level ops corrupt the encoded file and often leave it undecodable.
+The effects here work on the decoded image instead, so their results
+always open:
+
+- sort: pixel sorting. Runs of pixels whose luminance lies between two
+  thresholds are sorted by luminance along each row (or column)
+- channel_shift: each colour channel is moved by its own (dx, dy) offset,
+  wrapping around the edges
+- slices: random horizontal bands are displaced sideways, seeded
+
+The kernels take and return (height, width, channels) uint8 arrays and are
+vectorized: the only Python loops run over channels or bands, never over
+pixels. Pixel sorting builds one packed integer key per pixel (where its
+run starts, luminance, column) and sorts every row with a single np.sort,
+which keeps runs in place and breaks ties by position.
+
+apply_pixel_effect() decodes a buffer, applies an effect and re-encodes it
+in the original format, reusing the JPEG quantization tables and chroma
+subsampling so the result keeps the source's compression character. The
+result is an ordinary buffer, so pixel effects and byte-level ops stack in
+the same history and recipes. Only the first frame of animated files is
+kept. Large images are processed in parallel bands by tiling.map_bands().
+NumPy is required for these effects.
+"""
+
+import io
+import logging
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; pixel effects need it
+    np = None
+
+from PIL import Image, JpegImagePlugin
+
+from .buffer import BytesLike, CowBuffer
+from .tiling import map_bands
+
+logger = logging.getLogger(__name__)
+
+PIXEL_EFFECTS = ("sort", "channel_shift", "slices")
+
+Buffer = Union[BytesLike, CowBuffer]
+
+# Integer Rec. 601 luma weights, summing to 256
+_LUMA = (77, 150, 29)
+
+
+def _require_numpy() -> None:
+    """Raise a ValueError if NumPy is not installed."""
+    if np is None:
+        raise ValueError("Pixel effects require NumPy (pip install numpy)")
+
+
+def luminance(pixels: "np.ndarray") -> "np.ndarray":
+    """
+    Approximate luma of an image array.
+
+    Args:
+        pixels: (height, width, channels) uint8 array; channels beyond
+            the first three (alpha) are ignored
+
+    Returns:
+        (height, width) uint8 array
+    """
+    if pixels.shape[2] < 3:
+        return pixels[..., 0].copy()
+    # Widen before multiplying: NumPy 1.x keeps uint8 * np.uint16 scalar in uint8
+    luma = pixels[..., 0].astype(np.uint16) * _LUMA[0]
+    luma += pixels[..., 1].astype(np.uint16) * _LUMA[1]
+    luma += pixels[..., 2].astype(np.uint16) * _LUMA[2]
+    luma >>= 8
+    return luma.astype(np.uint8)
+
+
+def pixel_sort(pixels: "np.ndarray", low: int = 64, high: int = 192, vertical: bool = False,
+               reverse: bool = False) -> "np.ndarray":
+    """
+    Sort runs of pixels with luminance in [low, high] by luminance.
+
+    Args:
+        pixels: (height, width, channels) uint8 array
+        low: Lowest luminance included in a run, 0 to 255
+        high: Highest luminance included in a run, 0 to 255
+        vertical: Sort along columns instead of rows
+        reverse: Sort from bright to dark
+
+    Returns:
+        A new array of the same shape
+
+    Raises:
+        ValueError: If the thresholds are out of range
+    """
+    _require_numpy()
+    if not 0 <= low <= high <= 255:
+        raise ValueError("Sort thresholds must satisfy 0 <= low <= high <= 255")
+    if vertical:
+        return pixel_sort(pixels.transpose(1, 0, 2), low, high, False, reverse).transpose(1, 0, 2).copy()
+
+    height, width, channels = pixels.shape
+    luma = luminance(pixels)
+    selected = (luma >= low) & (luma <= high)
+    if not selected.any():
+        return np.array(pixels, copy=True, order="C")
+    if reverse:
+        np.subtract(255, luma, out=luma)
+
+    # Every unselected pixel, and every selected one that begins a row or
+    # follows an unselected pixel, starts a segment; the key of a pixel is
+    # (column its segment starts at, luminance, column). Sorting each row by
+    # key sorts the runs and leaves unselected pixels (luminance 0, alone in
+    # their segment) where they are.
+    column_bits = int(width - 1).bit_length()
+    dtype = np.uint32 if 2 * column_bits + 8 <= 32 else np.uint64
+    columns = np.arange(width, dtype=dtype)
+    starts = ~selected
+    starts[:, 0] = True
+    starts[:, 1:] |= ~selected[:, :-1]
+    keys = np.where(starts, columns, dtype(0))
+    np.maximum.accumulate(keys, axis=1, out=keys)
+    luma[~selected] = 0
+    keys <<= dtype(8)
+    keys |= luma
+    keys <<= dtype(column_bits)
+    keys |= columns
+    keys.sort(axis=1)
+    keys &= dtype((1 << column_bits) - 1)
+
+    # Move whole pixels at once by viewing each one as a single opaque item
+    index = keys.astype(np.intp)
+    index += np.arange(0, height * width, width, dtype=np.intp)[:, None]
+    flat = np.ascontiguousarray(pixels).view(np.dtype((np.void, channels))).reshape(-1)
+    return np.take(flat, index.reshape(-1)).view(np.uint8).reshape(height, width, channels)
+
+
+def channel_shift(pixels: "np.ndarray", offsets: Sequence[Tuple[int, int]]) -> "np.ndarray":
+    """
+    Move each colour channel by its own offset, wrapping around the edges.
+
+    Args:
+        pixels: (height, width, channels) uint8 array
+        offsets: One (dx, dy) pair per channel, e.g. [(8, 0), (0, 0), (-8, 0)];
+            channels without a pair stay in place
+
+    Returns:
+        A new array of the same shape
+    """
+    _require_numpy()
+    result = np.array(pixels, copy=True, order="C")
+    for channel, (dx, dy) in enumerate(offsets[:pixels.shape[2]]):
+        if dx or dy:
+            result[..., channel] = np.roll(pixels[..., channel], (int(dy), int(dx)), axis=(0, 1))
+    return result
+
+
+def slice_offsets(height: int, count: int, max_shift: int, seed: Optional[int] = None,
+                  max_height: Optional[int] = None) -> "np.ndarray":
+    """
+    Pick random horizontal bands and their sideways shifts.
+
+    Args:
+        height: Image height in rows
+        count: Number of bands
+        max_shift: Largest shift in pixels, in either direction
+        seed: Seed for band placement and shifts
+        max_height: Tallest band in rows; defaults to a tenth of the height
+
+    Returns:
+        int64 array with the shift of every row, 0 outside the bands
+
+    Raises:
+        ValueError: If count or max_shift is negative
+    """
+    _require_numpy()
+    if count < 0 or max_shift < 0:
+        raise ValueError("Slice count and shift must be non-negative")
+    row_shift = np.zeros(height, dtype=np.int64)
+    if not count or not max_shift:
+        return row_shift
+
+    gen = np.random.default_rng(seed)
+    tallest = max(1, max_height if max_height is not None else height // 10)
+    tops = gen.integers(0, height, size=count)
+    heights = gen.integers(1, tallest + 1, size=count)
+    shifts = gen.integers(-max_shift, max_shift + 1, size=count)
+    # Later bands overwrite earlier ones where they overlap
+    for top, rows, shift in zip(tops, heights, shifts):
+        row_shift[top:top + rows] = shift
+    return row_shift
+
+
+def shift_rows(pixels: "np.ndarray", row_shift: "np.ndarray") -> "np.ndarray":
+    """
+    Shift every row sideways by its own amount, wrapping around the edges.
+
+    Args:
+        pixels: (height, width, channels) uint8 array
+        row_shift: One shift per row
+
+    Returns:
+        A new array of the same shape
+    """
+    _require_numpy()
+    height, width, channels = pixels.shape
+    result = np.array(pixels, copy=True, order="C")
+    rows = np.flatnonzero(row_shift)
+    if not len(rows):
+        return result
+    columns = (np.arange(width, dtype=np.int64) - row_shift[rows, None]) % width
+    flat = np.ascontiguousarray(pixels).view(np.dtype((np.void, channels))).reshape(height, width)
+    out = result.view(np.dtype((np.void, channels))).reshape(height, width)
+    out[rows] = np.take_along_axis(flat[rows], columns, axis=1)
+    return result
+
+
+def slice_displace(pixels: "np.ndarray", count: int, max_shift: int, seed: Optional[int] = None,
+                   max_height: Optional[int] = None) -> "np.ndarray":
+    """
+    Shift random horizontal bands sideways, wrapping around the edges.
+
+    Args:
+        pixels: (height, width, channels) uint8 array
+        count: Number of bands
+        max_shift: Largest shift in pixels, in either direction
+        seed: Seed for band placement and shifts
+        max_height: Tallest band in rows; defaults to a tenth of the height
+
+    Returns:
+        A new array of the same shape
+
+    Raises:
+        ValueError: If count or max_shift is negative
+    """
+    return shift_rows(pixels, slice_offsets(pixels.shape[0], count, max_shift, seed, max_height))
+
+
+# Band kernels for map_bands(); module-level so process pools can pickle them
+
+def _sort_band(tile: "np.ndarray", first_row: int, low: int, high: int, reverse: bool) -> "np.ndarray":
+    """Pixel-sort the rows of one band."""
+    return pixel_sort(tile, low, high, False, reverse)
+
+
+def _shift_band(tile: "np.ndarray", first_row: int, offsets: List[Tuple[int, int]]) -> "np.ndarray":
+    """Channel-shift one band; the band's overlap covers the largest vertical offset."""
+    return channel_shift(tile, offsets)
+
+
+def _slices_band(tile: "np.ndarray", first_row: int, row_shift: "np.ndarray") -> "np.ndarray":
+    """Displace the rows of one band by their precomputed shifts."""
+    return shift_rows(tile, row_shift[first_row:first_row + len(tile)])
+
+
+def run_effect(pixels: "np.ndarray", op: Dict[str, Any], workers: Optional[int] = None,
+               mode: str = "thread") -> "np.ndarray":
+    """
+    Apply the effect an op describes to an image array.
+
+    Large images are split into bands processed in parallel (see tiling);
+    the result is identical to processing the image in one piece.
+
+    Args:
+        pixels: (height, width, channels) uint8 array
+        op: Dict with "effect" (one of PIXEL_EFFECTS) and its parameters
+        workers: Threads or processes for large images; defaults to the core count
+        mode: "thread" or "process", see tiling.TILE_MODES
+
+    Returns:
+        The new array
+
+    Raises:
+        ValueError: If the effect is unknown or its parameters are invalid
+    """
+    _require_numpy()
+    effect = op.get("effect")
+    if effect == "sort":
+        low, high = op.get("low", 64), op.get("high", 192)
+        if not 0 <= low <= high <= 255:
+            raise ValueError("Sort thresholds must satisfy 0 <= low <= high <= 255")
+        # Runs never cross rows (or columns), so bands need no overlap
+        kernel = partial(_sort_band, low=low, high=high, reverse=op.get("reverse", False))
+        return map_bands(pixels, kernel, axis=1 if op.get("vertical", False) else 0, workers=workers, mode=mode)
+    if effect == "channel_shift":
+        offsets = [(int(dx), int(dy)) for dx, dy in op["offsets"]]
+        reach = max((abs(dy) for _, dy in offsets), default=0)
+        return map_bands(pixels, partial(_shift_band, offsets=offsets), overlap=reach, wrap=True,
+                         workers=workers, mode=mode)
+    if effect == "slices":
+        row_shift = slice_offsets(pixels.shape[0], op["count"], op["max_shift"], op.get("seed"),
+                                  op.get("max_height"))
+        return map_bands(pixels, partial(_slices_band, row_shift=row_shift), workers=workers, mode=mode)
+    raise ValueError(f"Unknown pixel effect: {effect}")
+
+
+def decode_pixels(data: Buffer) -> Tuple["np.ndarray", Image.Image]:
+    """
+    Decode an image into an RGB or RGBA array.
+
+    Args:
+        data: Encoded image file contents
+
+    Returns:
+        Tuple of (array, the opened source image for its format and metadata)
+
+    Raises:
+        ValueError: If NumPy is missing or the data does not decode
+    """
+    _require_numpy()
+    stream = data.reader() if isinstance(data, CowBuffer) else io.BytesIO(data)
+    try:
+        source = Image.open(stream)
+        source.load()
+    except Exception as e:
+        raise ValueError(f"Pixel effects need an image that decodes: {e}")
+    has_alpha = "A" in source.getbands() or "transparency" in source.info
+    image = source if source.mode in ("RGB", "RGBA") else source.convert("RGBA" if has_alpha else "RGB")
+    return np.asarray(image), source
+
+
+def encode_pixels(pixels: "np.ndarray", source: Image.Image) -> bytes:
+    """
+    Encode an array in the format of the image it was decoded from.
+
+    JPEGs reuse the source's quantization tables and chroma subsampling;
+    ICC profiles and EXIF data are carried over where the format allows.
+
+    Args:
+        pixels: (height, width, channels) uint8 array
+        source: The image returned by decode_pixels
+
+    Returns:
+        The encoded file contents
+    """
+    image = Image.fromarray(pixels)
+    fmt = source.format or "PNG"
+    options: Dict[str, Any] = {}
+    for key in ("icc_profile", "exif"):
+        if source.info.get(key) and fmt in ("JPEG", "PNG", "WEBP", "TIFF"):
+            options[key] = source.info[key]
+    if fmt == "JPEG":
+        if image.mode == "RGBA":
+            image = image.convert("RGB")
+        if getattr(source, "quantization", None):
+            options["qtables"] = source.quantization
+        sampling = JpegImagePlugin.get_sampling(source)
+        if sampling != -1:
+            options["subsampling"] = sampling
+    elif fmt == "WEBP":
+        options["quality"] = 90
+    out = io.BytesIO()
+    image.save(out, fmt, **options)
+    return out.getvalue()
+
+
+def apply_pixel_effect(data: Buffer, op: Dict[str, Any], workers: Optional[int] = None,
+                       mode: str = "thread") -> CowBuffer:
+    """
+    Decode data, apply a pixel effect and re-encode it in the same format.
+
+    Args:
+        data: Encoded image file contents
+        op: Dict with "effect" and its parameters, see run_effect
+        workers: Threads or processes for large images; defaults to the core count
+        mode: "thread" or "process", see tiling.TILE_MODES
+
+    Returns:
+        A new buffer holding the re-encoded image
+
+    Raises:
+        ValueError: If NumPy is missing, data does not decode or the
+            effect parameters are invalid
+    """
+    pixels, source = decode_pixels(data)
+    result = run_effect(pixels, op, workers, mode)
+    encoded = encode_pixels(result, source)
+    logger.info(f"Pixel effect {op.get('effect')} on {source.format} {source.size[0]}x{source.size[1]}")
+    return CowBuffer(encoded)
@@ -0,0 +1,280 @@
+"""
+PNG pixel-stream glitching.
+
+Corrupting raw PNG bytes nearly always breaks a chunk CRC or the zlib
+stream, so the file no longer decodes. This module instead inflates the
+IDAT stream, corrupts the filtered scanline bytes, deflates the result
+again and writes fresh IDAT chunks with correct CRCs. The one byte per
+scanline that selects the row filter is left intact, because an unknown
+filter type is a hard decode error; everything else is fair game, and the
+filters smear each corrupted byte along the rest of its row.
+
+Work is streamed chunk by chunk: compressed input is inflated in bounded
+pieces, each piece is glitched and handed straight to the compressor, and
+output chunks are yielded as they fill. Memory stays proportional to the
+piece size, not to the image size.
+"""
+
+import logging
+import random
+import struct
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+from . import engine
+from .buffer import CowBuffer
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+DEFAULT_LEVEL = 1
+INFLATE_PIECE = 256 * 1024
+IDAT_SIZE = 64 * 1024
+
+# Samples per pixel by PNG color type
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# Adam7 passes as (x0, y0, dx, dy)
+_ADAM7 = ((0, 0, 8, 8), (4, 0, 8, 8), (0, 4, 4, 8), (2, 0, 4, 4),
+          (0, 2, 2, 4), (1, 0, 2, 2), (0, 1, 1, 2))
+
+
+def _chunk(chunk_type: bytes, payload: bytes) -> bytes:
+    """Serialise one PNG chunk with its length and CRC."""
+    return struct.pack(">I", len(payload)) + chunk_type + payload + \
+        struct.pack(">I", zlib.crc32(payload, zlib.crc32(chunk_type)))
+
+
+def iter_chunks(data: engine.BufferLike) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload offset, payload length) for every chunk after the signature."""
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", bytes(data[pos:pos + 8]))
+        if pos + 12 + length > len(data):
+            raise ValueError(f"PNG chunk {chunk_type!r} is truncated")
+        yield chunk_type, pos + 8, length
+        pos += 12 + length
+        if chunk_type == b"IEND":
+            return
+
+
+def scanline_layout(ihdr: bytes) -> List[Tuple[int, int]]:
+    """
+    Describe the filtered image stream as runs of equally sized scanlines.
+
+    Args:
+        ihdr: The 13-byte IHDR payload
+
+    Returns:
+        List of (row_count, row_size) runs in stream order, where row_size
+        includes the leading filter-type byte
+
+    Raises:
+        ValueError: If the header uses an unknown color type or interlace method
+    """
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", ihdr)
+    if color_type not in _CHANNELS:
+        raise ValueError(f"Unsupported PNG color type: {color_type}")
+    bits_per_pixel = _CHANNELS[color_type] * bit_depth
+
+    def row_size(pixels: int) -> int:
+        return 1 + (pixels * bits_per_pixel + 7) // 8
+
+    if interlace == 0:
+        return [(height, row_size(width))]
+    if interlace != 1:
+        raise ValueError(f"Unsupported PNG interlace method: {interlace}")
+
+    runs = []
+    for x0, y0, dx, dy in _ADAM7:
+        pass_width = (width - x0 + dx - 1) // dx
+        pass_height = (height - y0 + dy - 1) // dy
+        if pass_width > 0 and pass_height > 0:
+            runs.append((pass_height, row_size(pass_width)))
+    return runs
+
+
+class FilterBytes:
+    """Tracks where filter-type bytes fall in a stream consumed piece by piece."""
+
+    def __init__(self, runs: List[Tuple[int, int]]) -> None:
+        self._runs = [run for run in runs if run[0] > 0]
+        self._run = 0
+        self._rows_left = self._runs[0][0] if self._runs else 0
+        self._next = 0  # Stream offset of the next filter byte
+        self._pos = 0   # Stream offset of the next piece
+
+    def positions(self, length: int) -> List[Tuple[int, int, int]]:
+        """
+        Locate the filter bytes inside the next length bytes of the stream.
+
+        Returns:
+            (first, step, count) runs of piece-relative positions
+        """
+        result = []
+        end = self._pos + length
+        while self._run < len(self._runs) and self._next < end:
+            size = self._runs[self._run][1]
+            count = min(self._rows_left, (end - 1 - self._next) // size + 1)
+            result.append((self._next - self._pos, size, count))
+            self._next += count * size
+            self._rows_left -= count
+            if not self._rows_left:
+                self._run += 1
+                if self._run < len(self._runs):
+                    self._rows_left = self._runs[self._run][0]
+        self._pos = end
+        return result
+
+
+def _glitch_piece(piece: bytes, filters: FilterBytes, edits: int, mode: str,
+                  seed: int, backend: str) -> bytes:
+    """Corrupt edits bytes of one inflated piece, then restore its filter-type bytes."""
+    positions = filters.positions(len(piece))
+    if not edits:
+        return piece
+    glitched = engine.random_glitch(piece, mode=mode, header_size=0, seed=seed, backend=backend, count=edits)
+    for first, step, count in positions:
+        stop = first + step * (count - 1) + 1
+        glitched[first:stop:step] = piece[first:stop:step]
+    return bytes(glitched)
+
+
+class EditBudget:
+    """Spreads one stream-wide edit count over the pieces the stream arrives in."""
+
+    def __init__(self, total_bytes: int, intensity: int) -> None:
+        """
+        Budget one edit per intensity bytes of a stream.
+
+        Args:
+            total_bytes: Expected length of the whole inflated stream
+            intensity: Corrupt one byte per this many stream bytes
+        """
+        self.total_bytes = max(1, total_bytes)
+        self.edits = max(1, total_bytes // intensity)
+        self._pos = 0
+
+    def take(self, length: int) -> int:
+        """Edits due in the next length bytes, proportional to their share of the stream."""
+        start = min(self._pos, self.total_bytes)
+        self._pos += length
+        end = min(self._pos, self.total_bytes)
+        return self.edits * end // self.total_bytes - self.edits * start // self.total_bytes
+
+
+def iter_glitched_png(data: engine.BufferLike, intensity: int = engine.DEFAULT_INTENSITY,
+                      mode: str = "Random", seed: Optional[int] = None, level: int = DEFAULT_LEVEL,
+                      backend: str = "auto") -> Iterator[bytes]:
+    """
+    Stream a PNG with its pixel data corrupted and re-compressed.
+
+    All non-IDAT chunks are copied unchanged. The IDAT stream is inflated
+    in pieces of INFLATE_PIECE bytes, each piece is corrupted, deflated at
+    ``level`` and emitted as new IDAT chunks with valid CRCs. The edit count
+    (one byte in ``intensity`` of the filtered scanlines, at least one) is
+    computed once for the stream size the header declares and shared out
+    between the pieces, so the result does not depend on the piece size.
+    Edits that land on a filter-type byte are undone.
+
+    Args:
+        data: The complete PNG file contents
+        intensity: Corrupt one byte per this many inflated bytes
+        mode: One of engine.GLITCH_MODES
+        seed: Seed for reproducible results; None for a random run
+        level: zlib compression level, 0-9; low levels are fastest
+        backend: Random corruption kernel, see engine.random_edits
+
+    Yields:
+        Consecutive pieces of the output file
+
+    Raises:
+        ValueError: If data is not a PNG, the parameters are invalid, or
+            the chunk structure or zlib stream is damaged
+    """
+    if bytes(data[:len(PNG_SIGNATURE)]) != PNG_SIGNATURE:
+        raise ValueError("Not a PNG file")
+    if intensity <= 0:
+        raise ValueError("Intensity must be greater than 0")
+    if mode not in engine.GLITCH_MODES:
+        raise ValueError(f"Unknown glitch mode: {mode}")
+    if not 0 <= level <= 9:
+        raise ValueError("Compression level must be between 0 and 9")
+
+    rng = random.Random(seed)
+    inflater = zlib.decompressobj()
+    deflater = zlib.compressobj(level)
+    filters: Optional[FilterBytes] = None
+    budget: Optional[EditBudget] = None
+    raw = bytearray()       # Inflated bytes waiting to be glitched
+    pending = bytearray()   # Deflated bytes waiting to fill an IDAT chunk
+    seen_idat = idat_done = False
+    raw_bytes = 0
+
+    def encode(final: bool) -> Iterator[bytes]:
+        """Glitch and deflate buffered raw bytes, yielding every full IDAT chunk."""
+        nonlocal raw_bytes
+        while len(raw) >= INFLATE_PIECE or (final and raw):
+            piece = bytes(raw[:INFLATE_PIECE])
+            del raw[:INFLATE_PIECE]
+            raw_bytes += len(piece)
+            pending.extend(deflater.compress(
+                _glitch_piece(piece, filters, budget.take(len(piece)), mode, rng.getrandbits(64), backend)))
+        if final:
+            pending.extend(deflater.flush())
+        while len(pending) >= IDAT_SIZE or (final and pending):
+            yield _chunk(b"IDAT", bytes(pending[:IDAT_SIZE]))
+            del pending[:IDAT_SIZE]
+
+    yield PNG_SIGNATURE
+    for chunk_type, offset, length in iter_chunks(data):
+        if chunk_type != b"IDAT":
+            if seen_idat and not idat_done:
+                # First chunk after the IDAT run: finish the new stream
+                yield from encode(final=True)
+                idat_done = True
+            if chunk_type == b"IHDR":
+                layout = scanline_layout(bytes(data[offset:offset + length]))
+                filters = FilterBytes(layout)
+                budget = EditBudget(sum(rows * size for rows, size in layout), intensity)
+            yield bytes(data[offset - 8:offset + length + 4])
+            continue
+
+        if filters is None:
+            raise ValueError("PNG IDAT chunk before IHDR")
+        if idat_done:
+            raise ValueError("PNG IDAT chunks are not consecutive")
+        seen_idat = True
+
+        # Inflate with a bounded output size so a highly compressed chunk
+        # cannot expand into one huge buffer
+        for start in range(offset, offset + length, INFLATE_PIECE):
+            compressed = bytes(data[start:min(start + INFLATE_PIECE, offset + length)])
+            while compressed and not inflater.eof:
+                try:
+                    raw += inflater.decompress(compressed, INFLATE_PIECE)
+                except zlib.error as e:
+                    raise ValueError(f"Damaged PNG image data: {e}")
+                compressed = inflater.unconsumed_tail
+                yield from encode(final=False)
+
+    if not seen_idat:
+        raise ValueError("PNG has no image data")
+    if not idat_done:
+        # Truncated file without IEND: still close the image stream
+        yield from encode(final=True)
+    logger.info(f"PNG: re-encoded {raw_bytes} bytes of scanline data with {budget.edits} edits at level {level}")
+
+
+def glitch_png(data: engine.BufferLike, intensity: int = engine.DEFAULT_INTENSITY,
+               mode: str = "Random", seed: Optional[int] = None, level: int = DEFAULT_LEVEL,
+               backend: str = "auto") -> CowBuffer:
+    """
+    Corrupt a PNG's pixel data and return the re-encoded file.
+
+    See iter_glitched_png for the parameters and errors.
+
+    Returns:
+        The glitched PNG as a CowBuffer
+    """
+    return CowBuffer(b"".join(iter_glitched_png(data, intensity, mode, seed, level, backend)))
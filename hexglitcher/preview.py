@@ -0,0 +1,279 @@
+"""
+Preview rendering off the UI thread.
+
+render_thumbnail() decodes a (possibly glitched) buffer into a small PIL
+image and is safe to call from any thread or process. In "fast" quality it
+asks the JPEG decoder for the smallest DCT scale (1/2, 1/4 or 1/8) that
+still covers the preview box and finishes with a cheap bilinear resize;
+"high" quality keeps the full LANCZOS path for on-demand inspection.
+
+IncrementalDecoder renders "fast" previews of successive edits of one
+CowBuffer. It keeps the last reduced-scale decode and, when the next buffer
+only differs after a restart marker of a baseline JPEG (see jpeg.py),
+decodes just the rows from that marker down and pastes them over the old
+decode. A random glitch late in the file then costs a fraction of a full
+decode. Progressive JPEGs, files without restart markers and all other
+formats are decoded in full. Because the JPEG decoder smooths chroma across
+rows, the row on either side of the pasted boundary can differ slightly
+from a full decode of the same bytes.
+
+PreviewWorker runs it on a background thread with latest-request-wins
+semantics (see worker.LatestWorker): submitting a new buffer supersedes any
+request that has not started yet, and results for superseded requests are
+dropped instead of being delivered. The GUI polls for finished results from
+the Tk thread, because PhotoImage objects must be created there. Buffers
+that validity.precheck() rejects are reported as broken without a decode
+attempt, and buffers rendered before are served from cache.thumbnail_cache.
+Decode and shrink times are recorded in profiling.stage_timer.
+"""
+
+import io
+import logging
+from array import array
+from typing import NamedTuple, Optional, Tuple, Union
+
+from PIL import Image
+
+from .buffer import CowBuffer
+from .cache import content_key, thumbnail_cache
+from .formats import detect_format
+from .jpeg import (ScanLayout, patched_restart_markers, restart_candidates, resume_point, resume_row,
+                   restart_markers, scan_layout, suffix_jpeg)
+from .patch import PatchSet
+from .profiling import stage_timer
+from .validity import precheck
+from .worker import LatestWorker
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_QUALITIES = ("fast", "high")
+# DCT scales the JPEG decoder can decode at
+_JPEG_SCALES = (1, 2, 4, 8)
+
+
+class PreviewResult(NamedTuple):
+    """A finished preview render."""
+    generation: int
+    image: Optional[Image.Image]
+    error: Optional[str]
+
+
+class _Decoded(NamedTuple):
+    """The reduced-scale decode of one buffer, kept for IncrementalDecoder."""
+    base: object
+    length: int
+    patches: PatchSet
+    size: Tuple[int, int]
+    image: Image.Image
+    layout: Optional[ScanLayout]
+    markers: array
+
+
+def _decode_fast(data: Union[bytes, CowBuffer], size: Tuple[int, int]) -> Image.Image:
+    """Open data and decode it at the cheapest JPEG scale that still fills size."""
+    stream = data.reader() if isinstance(data, CowBuffer) else io.BytesIO(data)
+    pil_image = Image.open(stream)
+    # JPEG only: other formats ignore draft() and rely on reduce() when shrinking
+    pil_image.draft(None, size)
+    return pil_image
+
+
+def _shrink_fast(pil_image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Cheap bilinear resize of a fast decode to fit within size, in place."""
+    pil_image.thumbnail(size, Image.Resampling.BILINEAR, reducing_gap=1.5)
+    return pil_image
+
+
+def render_thumbnail(data: Union[bytes, CowBuffer], size: Tuple[int, int], quality: str = "fast") -> Image.Image:
+    """
+    Decode image bytes and shrink the result to fit within size.
+
+    Args:
+        data: Encoded image file contents; a CowBuffer is streamed
+            through its overlay instead of being copied
+        size: Maximum (width, height) of the thumbnail
+        quality: "fast" for reduced-scale decoding and bilinear resizing,
+            "high" for LANCZOS resampling
+
+    Returns:
+        The decoded, resized image
+
+    Raises:
+        ValueError: If quality is unknown
+        Exception: Whatever Pillow raises for undecodable data
+    """
+    if quality not in PREVIEW_QUALITIES:
+        raise ValueError(f"Unknown preview quality: {quality}")
+
+    if quality == "fast":
+        return _shrink_fast(_decode_fast(data, size), size)
+
+    stream = data.reader() if isinstance(data, CowBuffer) else io.BytesIO(data)
+    pil_image = Image.open(stream)
+    pil_image.thumbnail(size, Image.Resampling.LANCZOS)
+    return pil_image
+
+
+class IncrementalDecoder:
+    """Renders fast previews, re-decoding only the changed rows of restart-coded JPEGs."""
+
+    def __init__(self) -> None:
+        self._last: Optional[_Decoded] = None
+        # (base, layout, restart candidates) of the last base seen, scanned once per file
+        self._base_scan: Optional[Tuple[object, Optional[ScanLayout], array]] = None
+        self.partial_decodes = 0
+        self.full_decodes = 0
+
+    def render(self, data: Union[bytes, CowBuffer], size: Tuple[int, int]) -> Image.Image:
+        """
+        Decode data and shrink it to fit within size, as render_thumbnail(data, size, "fast").
+
+        Args:
+            data: Encoded image file contents; only CowBuffers sharing the
+                base of the previous call can reuse its decode
+            size: Maximum (width, height) of the thumbnail
+
+        Returns:
+            The decoded, resized image
+
+        Raises:
+            Exception: Whatever Pillow raises for undecodable data
+        """
+        with stage_timer.time("decode"):
+            image = self._reuse(data, size)
+            if image is None:
+                image = _decode_fast(data, size)
+                image.load()
+                self.full_decodes += 1
+                self._remember(data, size, image)
+        with stage_timer.time("thumbnail"):
+            return _shrink_fast(image.copy(), size)
+
+    def clear(self) -> None:
+        """Forget the kept decode."""
+        self._last = None
+        self._base_scan = None
+
+    def _remember(self, data: Union[bytes, CowBuffer], size: Tuple[int, int], image: Image.Image) -> None:
+        """Keep a full decode of a CowBuffer, with its restart markers if it is a JPEG."""
+        if not isinstance(data, CowBuffer):
+            self._last = None
+            return
+        layout, markers = None, array("q")
+        if detect_format(data[:16]) == "JPEG":
+            if self._base_scan is None or self._base_scan[0] is not data.base:
+                base_layout = scan_layout(data.base)
+                candidates = restart_candidates(data.base, base_layout) if base_layout else array("q")
+                self._base_scan = (data.base, base_layout, candidates)
+            _, base_layout, candidates = self._base_scan
+            # Edited headers may move the scan; such buffers are decoded in full
+            offsets = data.patches.offsets
+            if base_layout is not None and (not offsets or offsets[0] >= base_layout.scan_start):
+                layout = base_layout
+                markers = patched_restart_markers(data, layout, candidates)
+        self._last = _Decoded(data.base, len(data), data.patches, size, image, layout, markers)
+
+    def _reuse(self, data: Union[bytes, CowBuffer], size: Tuple[int, int]) -> Optional[Image.Image]:
+        """Build the decode of data from the kept one, or return None to decode in full."""
+        last = self._last
+        if (last is None or not isinstance(data, CowBuffer) or last.base is not data.base
+                or last.length != len(data) or last.size != size):
+            return None
+        first = last.patches.first_difference(data.patches)
+        if first is None:
+            return last.image
+        layout = last.layout
+        if layout is None or first < layout.scan_start:
+            return None
+        index = resume_point(layout, last.markers, first)
+        if index is None:
+            return None
+
+        width, height = last.image.size
+        scale = next((s for s in _JPEG_SCALES
+                      if -(-layout.width // s) == width and -(-layout.height // s) == height), None)
+        row = resume_row(layout, index)
+        if scale is None or (layout.height - row) // scale == 0:
+            return None
+        suffix = suffix_jpeg(data, layout, last.markers, index)
+        try:
+            lower = Image.open(io.BytesIO(suffix))
+            lower.draft(None, (layout.width // scale, (layout.height - row) // scale))
+            lower.load()
+        except Exception as e:
+            logger.debug(f"Partial decode failed, decoding in full: {e}")
+            return None
+        if lower.mode != last.image.mode or lower.size != (width, height - row // scale):
+            return None
+
+        image = last.image.copy()
+        image.paste(lower, (0, row // scale))
+        # Markers before the resume point are unchanged; the rest come from the suffix
+        shift = last.markers[index] + 2 - layout.scan_start
+        markers = last.markers[:index + 1]
+        markers.extend(offset + shift for offset in restart_markers(suffix, layout))
+        self._last = _Decoded(data.base, len(data), data.patches, size, image, layout, markers)
+        self.partial_decodes += 1
+        logger.debug(f"Re-decoded preview rows from {row} of {layout.height}")
+        return image
+
+
+class PreviewWorker(LatestWorker):
+    """Background thread that renders the most recently submitted buffer."""
+
+    def __init__(self, size: Tuple[int, int]) -> None:
+        """
+        Start the worker thread.
+
+        Args:
+            size: Maximum (width, height) of rendered previews
+        """
+        self.size = size
+        self._decoder = IncrementalDecoder()
+        super().__init__("preview-worker")
+
+    def submit(self, data: Union[bytes, CowBuffer], quality: str = "fast") -> int:
+        """
+        Request a render of data, superseding any earlier request.
+
+        The caller must not mutate data after submitting it.
+
+        Args:
+            data: Encoded image file contents
+            quality: One of PREVIEW_QUALITIES
+
+        Returns:
+            The generation number identifying this request
+        """
+        return self._submit((data, quality))
+
+    @property
+    def decoder(self) -> IncrementalDecoder:
+        """The worker's decoder, for its partial/full decode counters."""
+        return self._decoder
+
+    def process(self, generation: int, request: Tuple[Union[bytes, CowBuffer], str]) -> PreviewResult:
+        """Render one request, from the cache when it was rendered before."""
+        data, quality = request
+        key = (content_key(data), self.size, quality)
+        image = thumbnail_cache.get(key)
+        if image is not None:
+            logger.debug(f"Preview served from cache ({thumbnail_cache.stats().hit_rate:.0%} hit rate)")
+            return PreviewResult(generation, image, None)
+        # Files that certainly cannot decode skip the decode attempt
+        reason = precheck(data)
+        if reason is not None:
+            logger.info(f"Preview skipped: {reason}")
+            return PreviewResult(generation, None, reason)
+        try:
+            if quality == "fast":
+                image = self._decoder.render(data, self.size)
+            else:
+                with stage_timer.time("thumbnail (HQ)"):
+                    image = render_thumbnail(data, self.size, quality)
+                    image.load()
+            thumbnail_cache.put(key, image)
+            return PreviewResult(generation, image, None)
+        except Exception as e:
+            logger.warning(f"Preview failed: {e}")
+            return PreviewResult(generation, None, str(e))
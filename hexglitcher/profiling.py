@@ -0,0 +1,194 @@
+"""
+Hot-path instrumentation.
+
+StageTimer collects wall-clock timings of named pipeline stages (load,
+glitch op, preview decode, shrink, PhotoImage conversion, hex render, save)
+with time.perf_counter_ns and keeps the most recent samples of each, so a
+stats panel can show rolling averages without the numbers being dominated
+by one slow first run. Timing a stage costs two clock reads and a lock, so
+it stays on permanently:
+
+    with stage_timer.time("decode"):
+        image.load()
+
+stage_timer is the process-wide instance, shared by the preview worker and
+the GUI; it is thread-safe.
+
+ProfileCapture runs operations under cProfile while enabled and keeps the
+statistics of the last few, which dump() merges into one .pstats file for
+pstats or snakeviz. cProfile only sees the thread that runs the operation,
+so capture the operation where it runs, not where it is scheduled.
+"""
+
+import cProfile
+import logging
+import pstats
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Samples per stage the rolling statistics cover
+DEFAULT_WINDOW = 50
+# Operations a ProfileCapture keeps
+DEFAULT_KEEP = 10
+
+
+class StageStats(NamedTuple):
+    """Rolling timing statistics of one stage, in milliseconds."""
+    stage: str
+    count: int  # Samples ever recorded, not just those in the window
+    last_ms: float
+    mean_ms: float
+    max_ms: float
+
+
+class StageTimer:
+    """Thread-safe rolling timings of named stages."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW) -> None:
+        """
+        Create a timer with no samples.
+
+        Args:
+            window: Most recent samples per stage used for the statistics
+        """
+        self.window = window
+        self._samples: "OrderedDict[str, Deque[int]]" = OrderedDict()
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, nanoseconds: int) -> None:
+        """
+        Add one sample.
+
+        Args:
+            stage: Stage name; stages are listed in the order first recorded
+            nanoseconds: Duration of the stage
+        """
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(nanoseconds)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """
+        Time the body of a with block as one sample of stage.
+
+        The sample is recorded even if the body raises.
+
+        Args:
+            stage: Stage name
+        """
+        began = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter_ns() - began)
+
+    def stats(self) -> List[StageStats]:
+        """Statistics of every stage, in the order the stages were first recorded."""
+        with self._lock:
+            rows = []
+            for stage, samples in self._samples.items():
+                rows.append(StageStats(stage, self._counts[stage], samples[-1] / 1e6,
+                                       sum(samples) / len(samples) / 1e6, max(samples) / 1e6))
+            return rows
+
+    def reset(self) -> None:
+        """Forget every sample."""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+def format_stats(rows: List[StageStats]) -> str:
+    """Render stage statistics as an aligned text table."""
+    lines = [f"{'stage':<16} {'n':>5} {'last':>9} {'avg':>9} {'max':>9}"]
+    for row in rows:
+        lines.append(f"{row.stage:<16} {row.count:>5} {row.last_ms:7.1f}ms {row.mean_ms:7.1f}ms {row.max_ms:7.1f}ms")
+    return "\n".join(lines)
+
+
+class ProfileCapture:
+    """cProfile statistics of the last few operations, captured while enabled."""
+
+    def __init__(self, keep: int = DEFAULT_KEEP) -> None:
+        """
+        Create a disabled capture.
+
+        Args:
+            keep: Number of most recent operations whose statistics are kept
+        """
+        self.enabled = False
+        self._captures: "Deque[Tuple[str, pstats.Stats]]" = deque(maxlen=keep)
+        self._active = False
+
+    def __len__(self) -> int:
+        return len(self._captures)
+
+    @property
+    def labels(self) -> List[str]:
+        """Labels of the kept operations, oldest first."""
+        return [label for label, _ in self._captures]
+
+    def run(self, label: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Call func(*args), under cProfile if capturing is enabled.
+
+        Nested calls are not profiled separately: only one profiler can be
+        active at a time, so the outermost operation's profile includes them.
+
+        Args:
+            label: Name of the operation, kept with its statistics
+            func: The operation
+            *args: Its arguments
+
+        Returns:
+            Whatever func returns
+        """
+        if not self.enabled or self._active:
+            return func(*args)
+        profiler = cProfile.Profile()
+        self._active = True
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            self._active = False
+            self._captures.append((label, pstats.Stats(profiler)))
+
+    def dump(self, path: str) -> int:
+        """
+        Write the merged statistics of the kept operations as a .pstats file.
+
+        Args:
+            path: Destination file
+
+        Returns:
+            Number of operations merged
+
+        Raises:
+            ValueError: If nothing has been captured
+            OSError: If the file cannot be written
+        """
+        if not self._captures:
+            raise ValueError("No operations have been profiled yet")
+        merged = pstats.Stats()
+        merged.add(*(stats for _, stats in self._captures))
+        merged.dump_stats(path)
+        logger.info(f"Saved profile of {len(self._captures)} operations to {path}")
+        return len(self._captures)
+
+    def clear(self) -> None:
+        """Drop the kept statistics."""
+        self._captures.clear()
+
+
+stage_timer = StageTimer()
+
@@ -0,0 +1,205 @@
+"""
+Reproducible glitch recipes.
+
+Every operation the GUI performs is described by a small JSON-friendly
+dict (its "op"): the operation name, its parameters, the header/structure
+protection in force and the explicit seed its private random generator was
+built from. A recipe is the ordered list of those ops from the original
+file to the current result, saved as JSON:
+
+    {"format": "hexglitcher-recipe", "version": 1, "source": "photo.jpg",
+     "steps": [{"op": "random", "intensity": 1000, "mode": "Random",
+                "header_size": 500, "protect_structure": true,
+                "backend": "numpy", "seed": 1234}, ...]}
+
+apply_step() is the single implementation of each op, used both by the GUI
+and by replay(), so replaying a recipe on the same source reproduces the
+result byte for byte. Structure protection applies the same rule in both
+(see formats.RegionTracker): the map of the last indexed state is kept
+until a step changes the length or a protected byte, so the regions do not
+depend on when the GUI or replay() happened to look them up. Replaying a
+recipe on another source (e.g. a higher resolution export of the same
+picture) applies the same operations with the same seeds. Seeded results
+depend on the random kernel, so the backend that produced them is recorded
+too.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from . import engine
+from .buffer import CowBuffer
+from .explore import glitch_variant
+from .formats import RegionTracker
+from .patterns import compile_pattern
+from .pixel import apply_pixel_effect
+from .png import DEFAULT_LEVEL, glitch_png
+
+logger = logging.getLogger(__name__)
+
+RECIPE_FORMAT = "hexglitcher-recipe"
+RECIPE_VERSION = 1
+RECIPE_OPS = ("find_replace", "random", "png", "variant", "write", "pixel", "reset")
+
+Op = Dict[str, Any]
+
+
+class Recipe(NamedTuple):
+    """An ordered list of ops plus the name of the file they were made on."""
+    steps: List[Op]
+    source: Optional[str] = None
+
+
+def find_replace_spans(data: CowBuffer, op: Op, tracker: RegionTracker) -> Tuple[List[int], List[int], bytes]:
+    """
+    Select the matches a find_replace op rewrites.
+
+    Args:
+        data: The buffer the op applies to
+        op: A find_replace op
+        tracker: Region tracker following data
+
+    Returns:
+        Tuple of (start offsets, end offsets, replacement bytes)
+
+    Raises:
+        ValueError: If the pattern or parameters are invalid
+    """
+    pattern = compile_pattern(op["find"], op.get("pattern", "hex"))
+    replace = engine.parse_hex(op["replace"], "Replace")
+    header_size, regions = tracker.protection(data, op["header_size"], op.get("protect_structure", False))
+    window = tuple(op["window"]) if op.get("window") is not None else None
+
+    starts, ends = engine.find_spans(data, pattern, header_size, window, regions)
+    starts, ends = engine.select_spans(starts, ends, op.get("probability", 1.0), op.get("max_count"),
+                                       op.get("seed"))
+    return starts, ends, replace
+
+
+def apply_step(data: CowBuffer, op: Op, original: CowBuffer, tracker: RegionTracker) -> CowBuffer:
+    """
+    Apply one recipe op to data.
+
+    Args:
+        data: The current buffer
+        op: The operation description
+        original: The unmodified source, for "reset"
+        tracker: Region tracker following data across steps
+
+    Returns:
+        The new buffer
+
+    Raises:
+        ValueError: If the op is unknown or its parameters are invalid
+    """
+    kind = op.get("op")
+    if kind == "find_replace":
+        starts, ends, replace = find_replace_spans(data, op, tracker)
+        return engine.replace_spans(data, starts, ends, replace)
+
+    if kind == "random":
+        header_size, regions = tracker.protection(data, op["header_size"], op.get("protect_structure", False))
+        return engine.random_glitch(data, op["intensity"], op["mode"], header_size, seed=op["seed"],
+                                    backend=op.get("backend", "auto"), regions=regions)
+
+    if kind == "png":
+        return glitch_png(data, op["intensity"], op["mode"], op["seed"], op.get("level", DEFAULT_LEVEL),
+                          op.get("backend", "auto"))
+
+    if kind == "variant":
+        header_size, regions = tracker.protection(data, op["header_size"], op.get("protect_structure", False))
+        params = dict(op, header_size=header_size, regions=regions)
+        return glitch_variant(data, params, op["seed"])
+
+    if kind == "write":
+        values = engine.parse_hex(op["data"], "Data")
+        offset = op["offset"]
+        if not 0 <= offset <= len(data) - len(values):
+            raise ValueError(f"Write of {len(values)} bytes at offset {offset} is outside the file")
+        result = data.copy()
+        result.write(offset, values)
+        return result
+
+    if kind == "pixel":
+        return apply_pixel_effect(data, op)
+
+    if kind == "reset":
+        return original.copy()
+
+    raise ValueError(f"Unknown recipe operation: {kind}")
+
+
+def replay(data: CowBuffer, recipe: Recipe) -> CowBuffer:
+    """
+    Apply every step of a recipe, starting from data.
+
+    Args:
+        data: The source buffer
+        recipe: The recipe to replay
+
+    Returns:
+        The final buffer
+
+    Raises:
+        ValueError: If a step is invalid
+    """
+    tracker = RegionTracker()
+    result = data
+    for i, op in enumerate(recipe.steps, 1):
+        try:
+            result = apply_step(result, op, data, tracker)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Recipe step {i} ({op.get('op')}) is malformed: {e}")
+        logger.info(f"Replayed step {i}/{len(recipe.steps)}: {op.get('op')}")
+    return result
+
+
+def save_recipe(path: str, recipe: Recipe) -> None:
+    """
+    Write a recipe as JSON.
+
+    Args:
+        path: Destination file
+        recipe: The recipe to save
+    """
+    document = {"format": RECIPE_FORMAT, "version": RECIPE_VERSION, "source": recipe.source,
+                "steps": recipe.steps}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    logger.info(f"Saved recipe with {len(recipe.steps)} steps to {path}")
+
+
+def load_recipe(path: str) -> Recipe:
+    """
+    Read and validate a recipe file.
+
+    Args:
+        path: Recipe file to read
+
+    Returns:
+        The parsed Recipe
+
+    Raises:
+        ValueError: If the file is not valid JSON, not a recipe, from a
+            newer version, or contains unknown operations
+        OSError: If the file cannot be read
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            document = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Recipe is not valid JSON: {e}")
+
+    if not isinstance(document, dict) or document.get("format") != RECIPE_FORMAT:
+        raise ValueError("Not a HexGlitcher recipe")
+    if document.get("version", 0) > RECIPE_VERSION:
+        raise ValueError(f"Recipe version {document['version']} is newer than supported ({RECIPE_VERSION})")
+
+    steps = document.get("steps")
+    if not isinstance(steps, list) or not all(isinstance(op, dict) for op in steps):
+        raise ValueError("Recipe steps must be a list of operations")
+    for i, op in enumerate(steps, 1):
+        if op.get("op") not in RECIPE_OPS:
+            raise ValueError(f"Recipe step {i} has unknown operation: {op.get('op')}")
+    return Recipe(steps, document.get("source"))
@@ -0,0 +1,280 @@
+"""
+Streaming glitch executor for files larger than memory.
+
+Print-resolution scans can be several gigabytes, far beyond what the
+whole-file operations in engine.py should hold in RAM. stream_glitch()
+reads the source in fixed-size chunks, applies find/replace and random
+corruption to each one and writes the result straight to the output file,
+so memory use is bounded by the chunk size no matter how large the input is.
+
+Find/replace patterns may straddle a chunk boundary. The bytes at the end
+of each chunk that could still begin a match are carried into the next
+chunk, and only matches starting before that tail are committed, so the
+matches found are the ones a whole-file scan would find as long as no
+match is longer than the carried tail allows. Hex and wildcard patterns
+have a fixed match length; for a regex the caller states the longest match
+it needs (max_match), MAX_OVERLAP bytes by default.
+
+All offsets (header size, range window, structure regions) refer to the
+input file. Seeds are drawn per chunk from the run's seed, so a seed
+reproduces a result for the same chunk size.
+"""
+
+import logging
+import os
+import random
+import re
+import sys
+from bisect import bisect_right
+from typing import Any, Dict, List, NamedTuple, Optional, Pattern, Tuple, Union
+
+from . import engine
+from .buffer import mapped_file
+from .formats import Region, detect_format, index_regions
+from .png import DEFAULT_LEVEL, iter_glitched_png
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 8 * 1024 * 1024
+MAX_OVERLAP = 64 * 1024
+
+
+class StreamResult(NamedTuple):
+    """Totals of one streamed run."""
+    bytes_read: int
+    bytes_written: int
+    replaced: int
+    corrupted: int
+
+
+def match_overlap(find: Union[bytes, Pattern[bytes]], max_match: Optional[int] = None) -> int:
+    """
+    Number of bytes to carry between chunks so no match is cut in two.
+
+    Args:
+        find: Literal bytes or a compiled bytes pattern
+        max_match: Longest match of a compiled pattern, e.g. from
+            patterns.match_length; MAX_OVERLAP if omitted
+
+    Returns:
+        The longest match length minus one
+    """
+    if isinstance(find, bytes):
+        longest = len(find)
+    elif max_match is not None:
+        longest = max_match
+    else:
+        logger.warning(f"No maximum match length given; matches longer than {MAX_OVERLAP} bytes "
+                       f"across chunk boundaries are missed")
+        longest = MAX_OVERLAP
+    return max(longest - 1, 0)
+
+
+def _clip(ranges: List[Region], start: int, end: int, shift: int = 0) -> List[Region]:
+    """Intersect sorted ranges with [start, end), moving the result by shift."""
+    clipped = []
+    for lo, hi in ranges[max(bisect_right(ranges, (start,)) - 1, 0):]:
+        if lo >= end:
+            break
+        lo, hi = max(lo, start), min(hi, end)
+        if lo < hi:
+            clipped.append((lo + shift, hi + shift))
+    return clipped
+
+
+class _ChunkGlitcher:
+    """Applies find/replace and random corruption to consecutive chunks of one file."""
+
+    def __init__(self, params: Dict[str, Any], targets: List[Region], rng: random.Random) -> None:
+        self.params = params
+        self.targets = targets
+        self.rng = rng
+        self.window = params.get("window") or (0, sys.maxsize)
+        self.remaining = params.get("max_count")
+        self.replaced = 0
+        self.corrupted = 0
+
+    def find(self, buf: bytearray, buf_start: int, cut: int) -> Tuple[List[int], List[int], int]:
+        """
+        Select the matches starting before cut, the end of the committed part of buf.
+
+        Returns:
+            (starts, ends, commit): selected spans relative to buf, and how
+            many bytes of buf are now final (cut, or the end of a match
+            that runs past it)
+        """
+        starts, ends = [], []
+        commit = cut
+        if not self.targets:
+            return starts, ends, commit
+
+        lo = min(max(self.targets[0][0], self.window[0]) - buf_start, len(buf))
+        lo = max(lo, 0)
+        hi = max(min(len(buf), self.window[1] - buf_start), lo)
+        firsts = [start for start, _ in self.targets]
+        for match in self.params["find"].finditer(memoryview(buf)[lo:hi]):
+            match_start, match_end = lo + match.start(), lo + match.end()
+            if match_start >= cut:
+                break
+            # A whole-file scan would resume after this match, so it is final
+            commit = max(commit, match_end)
+            # Drop matches that leave their target region, as find_spans does
+            j = bisect_right(firsts, buf_start + match_start) - 1
+            if j >= 0 and buf_start + match_end <= self.targets[j][1]:
+                starts.append(match_start)
+                ends.append(match_end)
+
+        selected = engine.select_spans(starts, ends, self.params.get("probability", 1.0), self.remaining,
+                                       self.rng.getrandbits(64))
+        if self.remaining is not None:
+            self.remaining -= len(selected[0])
+        self.replaced += len(selected[0])
+        return list(selected[0]), list(selected[1]), commit
+
+    def glitch(self, buf: bytearray, buf_start: int, cut: int) -> Tuple[bytearray, int]:
+        """
+        Produce the output for the committed part of buf.
+
+        Returns:
+            (piece, commit): the glitched output bytes and the number of
+            bytes of buf they consumed
+        """
+        starts: List[int] = []
+        ends: List[int] = []
+        commit = cut
+        if self.params.get("find") is not None:
+            starts, ends, commit = self.find(buf, buf_start, cut)
+
+        # Rebuild the piece, following where each target byte lands in it;
+        # replacements always sit inside the targets
+        replace = self.params.get("replace", b"")
+        piece = bytearray()
+        ranges: List[Region] = []
+        prev = 0
+        for start, end in zip(starts, ends):
+            ranges += _clip(self.targets, buf_start + prev, buf_start + start, len(piece) - buf_start - prev)
+            piece += buf[prev:start]
+            if replace:
+                ranges.append((len(piece), len(piece) + len(replace)))
+            piece += replace
+            prev = end
+        ranges += _clip(self.targets, buf_start + prev, buf_start + commit, len(piece) - buf_start - prev)
+        piece += buf[prev:commit]
+
+        if self.params.get("intensity") and ranges:
+            offsets, values = engine.random_edits(piece, self.params["intensity"], self.params["mode"], 0,
+                                                  seed=self.rng.getrandbits(64),
+                                                  backend=self.params.get("backend", "auto"), regions=ranges)
+            engine.apply_edits(piece, offsets, values)
+            self.corrupted += len(offsets)
+        return piece, commit
+
+
+def _file_targets(path: str, params: Dict[str, Any], size: int) -> List[Region]:
+    """Glitchable ranges of the input file, by structure or header size."""
+    if params.get("protect", "header") == "structure":
+        with mapped_file(path) as data:
+            regions = index_regions(data)
+        if regions is not None:
+            return regions.targets
+    header_size = params["header_size"]
+    return [(header_size, size)] if header_size < size else []
+
+
+def stream_glitch(source: str, output: str, params: Dict[str, Any], seed: Optional[int] = None,
+                  chunk_size: int = CHUNK_SIZE) -> StreamResult:
+    """
+    Glitch a file of any size into output with bounded memory.
+
+    Uses the same parameters as batch.glitch_data, plus an optional
+    max_match: the longest match of a compiled find pattern, see
+    match_overlap. PNG files with png_pixels set are re-encoded by the
+    streaming PNG glitcher instead, which does not support find/replace.
+
+    Args:
+        source: Input file path
+        output: Output file path; written through a temporary file
+        params: Operation parameters, see batch.glitch_data
+        seed: Seed of the run; None picks a random one
+        chunk_size: Bytes read per chunk
+
+    Returns:
+        A StreamResult with byte and edit totals
+
+    Raises:
+        ValueError: If the source type, parameters or destination are invalid
+        OSError: If a file cannot be read or written
+    """
+    _, ext = os.path.splitext(source.lower())
+    if ext not in engine.ALLOWED_EXTENSIONS:
+        raise ValueError(f"Invalid file type. Supported: {', '.join(sorted(engine.ALLOWED_EXTENSIONS))}")
+    size = os.path.getsize(source)
+    abs_output = engine.check_output_path(output)
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be greater than 0")
+    if params.get("intensity") and params.get("mode") not in engine.GLITCH_MODES:
+        raise ValueError(f"Unknown glitch mode: {params.get('mode')}")
+    if params.get("header_size", 0) < 0:
+        raise ValueError("Header protection must be non-negative")
+    if params.get("max_match") is not None and params["max_match"] <= 0:
+        raise ValueError("Maximum match length must be greater than 0")
+
+    with open(source, "rb") as f:
+        png_pixels = params.get("png_pixels") and detect_format(f.read(12)) == "PNG"
+    if png_pixels and params.get("find") is not None:
+        raise ValueError("Find/replace cannot be combined with PNG pixel glitching on streamed files")
+
+    find = params.get("find")
+    overlap = match_overlap(find, params.get("max_match")) if find is not None else 0
+    if isinstance(find, bytes):
+        params = dict(params, find=re.compile(re.escape(find), re.DOTALL))
+    # The carried tail must leave room for progress in every chunk
+    chunk_size = max(chunk_size, overlap + 1)
+
+    glitcher = _ChunkGlitcher(params, _file_targets(source, params, size), random.Random(seed))
+    tmp_path = f"{abs_output}.tmp"
+    written = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            if png_pixels:
+                with mapped_file(source) as data:
+                    for piece in iter_glitched_png(data, params["intensity"], params["mode"], seed,
+                                                   params.get("png_level", DEFAULT_LEVEL),
+                                                   params.get("backend", "auto")):
+                        out.write(piece)
+                        written += len(piece)
+            else:
+                written = _stream_chunks(source, out, glitcher, chunk_size, overlap)
+        os.replace(tmp_path, abs_output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    logger.info(f"Streamed {size} bytes to {abs_output} ({written} bytes, {glitcher.replaced} "
+                f"replacements, {glitcher.corrupted} corrupted bytes)")
+    return StreamResult(size, written, glitcher.replaced, glitcher.corrupted)
+
+
+def _stream_chunks(source: str, out: Any, glitcher: _ChunkGlitcher, chunk_size: int, overlap: int) -> int:
+    """Read, glitch and write source chunk by chunk, returning the bytes written."""
+    buf = bytearray()
+    buf_start = 0  # Input offset of buf[0]
+    written = 0
+    with open(source, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buf += chunk
+            final = len(chunk) < chunk_size
+            if not buf:
+                break
+            # Keep back the tail that could still start a match
+            cut = len(buf) if final else len(buf) - overlap
+            piece, commit = glitcher.glitch(buf, buf_start, cut)
+            out.write(piece)
+            written += len(piece)
+            del buf[:commit]
+            buf_start += commit
+            if final:
+                break
+    return written
@@ -0,0 +1,318 @@
+"""
+Cheap decode-validity prediction and retry-until-decodable.
+
+Many glitches break a file beyond decoding, and the full decode that finds
+out is the most expensive step of a preview or a batch run. precheck()
+looks for the failures that can be detected without decoding pixels:
+
+- any format: Pillow cannot identify the file from its header
+- JPEG: a damaged marker structure before the scan, a frame or scan
+  header that does not add up, or Huffman tables that are out of range
+- PNG: a damaged IHDR, a zlib stream that does not inflate, too little
+  scanline data, or an unknown filter type byte
+- BMP: a pixel array that the header says is larger than the file
+- WebP: a VP8 or VP8L bitstream whose signature was destroyed
+
+It is conservative: None means "may decode", not "will decode", because
+errors inside compressed pixel data (JPEG entropy data, GIF LZW codes,
+WebP bitstreams) only show up in a real decode. A file it rejects is
+certain to fail, so callers can skip the decode outright.
+
+decode_error() follows a passing precheck with a reduced-size decode, and
+retry_until_decodable() repeats a seeded glitch with new seeds until the
+result passes it, within a time budget.
+"""
+
+import io
+import logging
+import random
+import struct
+import time
+import zlib
+from typing import Callable, NamedTuple, Optional, Tuple, Union
+
+from PIL import Image, UnidentifiedImageError
+
+from .buffer import BytesLike, CowBuffer
+from .cache import content_key, thumbnail_cache
+from .formats import detect_format
+from .png import INFLATE_PIECE, FilterBytes, iter_chunks, scanline_layout
+
+logger = logging.getLogger(__name__)
+
+RETRY_BUDGET = 2.0
+CHECK_SIZE = (256, 256)
+
+Buffer = Union[BytesLike, CowBuffer]
+
+# JPEG markers that carry no length field
+_JPEG_STANDALONE = {0x01} | set(range(0xD0, 0xD8))
+# Start-of-frame markers; C4 (DHT), C8 (reserved) and CC (DAC) are not frames
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Sequential Huffman frames, whose scans always use a DC table
+_JPEG_SEQUENTIAL = {0xC0, 0xC1}
+
+
+class RetryResult(NamedTuple):
+    """Outcome of retry_until_decodable."""
+    data: Optional[Buffer]
+    seed: Optional[int]
+    attempts: int
+
+
+def _unpack(fmt: str, data: Buffer, offset: int) -> Tuple:
+    """struct.unpack_from through a slice, so a CowBuffer is read in a small window."""
+    size = struct.calcsize(fmt)
+    window = data[offset:offset + size]
+    if len(window) < size:
+        raise struct.error(f"unpack requires {size} bytes at offset {offset}")
+    return struct.unpack(fmt, window)
+
+
+def _check_jpeg(data: Buffer) -> Optional[str]:
+    """Walk the JPEG markers up to the first scan and sanity-check its headers."""
+    n = len(data)
+    pos = 2
+    frame = None
+    components = set()
+    dc_tables = set()
+    while True:
+        if pos + 4 > n:
+            return "JPEG ends before the first scan"
+        if data[pos] != 0xFF:
+            return f"JPEG marker expected at offset {pos}"
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in _JPEG_STANDALONE:
+            pos += 2
+            continue
+        if marker in (0xD8, 0xD9):
+            return "JPEG image ends before the first scan"
+
+        length = _unpack(">H", data, pos + 2)[0]
+        segment = bytes(data[pos + 4:pos + 2 + length])
+        if length < 2 or pos + 2 + length > n:
+            return f"JPEG segment {marker:02X} has an invalid length"
+
+        if marker in _JPEG_SOF:
+            if len(segment) < 6:
+                return "JPEG frame header is truncated"
+            frame = marker
+            _, width, count = struct.unpack_from(">HHB", segment, 1)
+            if width == 0 or count == 0 or len(segment) != 6 + 3 * count:
+                return "JPEG frame header is inconsistent"
+            for i in range(count):
+                factors = segment[7 + 3 * i]
+                if not 1 <= factors >> 4 <= 4 or not 1 <= factors & 0x0F <= 4:
+                    return "JPEG sampling factors are out of range"
+                components.add(segment[6 + 3 * i])
+        elif marker == 0xC4:
+            offset = 0
+            while offset < len(segment):
+                table = segment[offset]
+                counts = segment[offset + 1:offset + 17]
+                total = sum(counts)
+                if table >> 4 > 1 or table & 0x0F > 3 or len(counts) < 16 or total > 256:
+                    return "JPEG Huffman table is invalid"
+                if not table >> 4:
+                    dc_tables.add(table & 0x0F)
+                offset += 17 + total
+            if offset != len(segment):
+                return "JPEG Huffman table length does not match"
+        elif marker == 0xDA:
+            if frame is None:
+                return "JPEG scan before frame header"
+            count = segment[0] if segment else 0
+            if count == 0 or len(segment) != 4 + 2 * count:
+                return "JPEG scan header is inconsistent"
+            for i in range(count):
+                if segment[1 + 2 * i] not in components:
+                    return "JPEG scan refers to an unknown component"
+            # Without any DHT the decoder falls back to the standard tables
+            if frame in _JPEG_SEQUENTIAL and dc_tables:
+                if any(segment[2 + 2 * i] >> 4 not in dc_tables for i in range(count)):
+                    return "JPEG scan refers to an undefined Huffman table"
+            return None
+        pos += 2 + length
+
+
+def _check_png(data: Buffer) -> Optional[str]:
+    """Inflate the PNG image stream and check its size and filter bytes."""
+    filters: Optional[FilterBytes] = None
+    # Raw deflate after a separately checked zlib header: decoders ignore
+    # the trailing Adler-32 checksum, so it must not fail the check either
+    inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+    header_checked = False
+    expected = total = 0
+    for chunk_type, offset, length in iter_chunks(data):
+        if filters is None:
+            if chunk_type != b"IHDR" or length != 13:
+                return "PNG does not start with a valid IHDR"
+            ihdr = bytes(data[offset:offset + 13])
+            if zlib.crc32(ihdr, zlib.crc32(b"IHDR")) != _unpack(">I", data, offset + 13)[0]:
+                return "PNG IHDR checksum mismatch"
+            width, height = struct.unpack_from(">II", ihdr)
+            if width == 0 or height == 0:
+                return "PNG has zero size"
+            runs = scanline_layout(ihdr)
+            expected = sum(count * size for count, size in runs)
+            filters = FilterBytes(runs)
+            continue
+        if chunk_type != b"IDAT":
+            continue
+
+        compressed = bytes(data[offset:offset + length])
+        if not header_checked:
+            if len(compressed) < 2:
+                return "PNG image data is truncated"
+            cmf, flg = compressed[0], compressed[1]
+            if cmf & 0x0F != 8 or (cmf << 8 | flg) % 31 or flg & 0x20:
+                return "PNG zlib header is damaged"
+            compressed = compressed[2:]
+            header_checked = True
+        while compressed and not inflater.eof:
+            try:
+                raw = inflater.decompress(compressed, INFLATE_PIECE)
+            except zlib.error as e:
+                return f"PNG image data does not inflate: {e}"
+            compressed = inflater.unconsumed_tail
+            # Every row starts with a filter type byte from 0 to 4
+            for first, step, count in filters.positions(len(raw)):
+                if max(raw[first:first + step * (count - 1) + 1:step]) > 4:
+                    return "PNG row has an unknown filter type"
+            total += len(raw)
+
+    if filters is None:
+        return "PNG has no IHDR"
+    if total < expected:
+        return f"PNG image data is truncated ({total} of {expected} bytes)"
+    return None
+
+
+def _check_bmp(data: Buffer) -> Optional[str]:
+    """Compare the pixel array size stated by the BMP header with the file size."""
+    if len(data) < 30:
+        return "BMP header is truncated"
+    offset = _unpack("<I", data, 10)[0]
+    header_size = _unpack("<I", data, 14)[0]
+    if header_size < 40:
+        return None  # OS/2 core header, not checked
+    width, height, _, bits, compression = _unpack("<iiHHI", data, 18)
+    if compression not in (0, 3, 6):
+        return None  # RLE and embedded formats are not sized by the header
+    if bits not in (1, 2, 4, 8, 16, 24, 32) or width <= 0 or height == 0:
+        return "BMP header describes an invalid image"
+    stride = (width * bits + 31) // 32 * 4
+    if offset + stride * abs(height) > len(data):
+        return "BMP pixel array is larger than the file"
+    return None
+
+
+def _check_webp(data: Buffer) -> Optional[str]:
+    """Check the signature at the start of a single-image WebP bitstream."""
+    fourcc = bytes(data[12:16])
+    if fourcc == b"VP8 " and bytes(data[23:26]) != b"\x9d\x01\x2a":
+        return "WebP VP8 start code is damaged"
+    if fourcc == b"VP8L" and data[20] != 0x2F:
+        return "WebP VP8L signature is damaged"
+    return None
+
+
+_CHECKS = {"JPEG": _check_jpeg, "PNG": _check_png, "BMP": _check_bmp, "WEBP": _check_webp}
+
+
+def precheck(data: Buffer) -> Optional[str]:
+    """
+    Predict whether data is certain to fail decoding, without decoding pixels.
+
+    Args:
+        data: Encoded image file contents
+
+    Returns:
+        The reason the file cannot decode, or None if it may decode
+    """
+    stream = data.reader() if isinstance(data, CowBuffer) else io.BytesIO(data)
+    try:
+        Image.open(stream)  # Parses the header only
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError, struct.error) as e:
+        return f"Unrecognised image header: {e}"
+
+    check = _CHECKS.get(detect_format(data[:16]))
+    if check is None:
+        return None
+    # The checks read headers and segments through slices and indexing, so
+    # an edited CowBuffer is never materialised
+    try:
+        return check(data)
+    except (struct.error, IndexError, ValueError) as e:
+        return f"Damaged structure: {e}"
+
+
+def decode_error(data: Buffer, size: Tuple[int, int] = CHECK_SIZE) -> Optional[str]:
+    """
+    Check that data decodes: the precheck first, then a reduced-size decode.
+
+    JPEGs are decoded at the smallest DCT scale covering size, which still
+    parses every entropy-coded block. Buffers that decoded before are found
+    in cache.thumbnail_cache and not decoded again.
+
+    Args:
+        data: Encoded image file contents
+        size: (width, height) to decode at, at least
+
+    Returns:
+        None if it decodes, otherwise the reason it does not
+    """
+    key = (content_key(data), size, "check")
+    if thumbnail_cache.get(key) is not None:
+        return None
+    reason = precheck(data)
+    if reason is not None:
+        return reason
+    stream = data.reader() if isinstance(data, CowBuffer) else io.BytesIO(data)
+    try:
+        image = Image.open(stream)
+        image.draft(None, size)
+        image.load()
+    except Exception as e:
+        return str(e) or type(e).__name__
+    # Formats without reduced-scale decoding come back full size
+    image.thumbnail(size, Image.Resampling.NEAREST)
+    thumbnail_cache.put(key, image)
+    return None
+
+
+def retry_until_decodable(glitch: Callable[[int], Buffer], seed: Optional[int] = None,
+                          budget: float = RETRY_BUDGET, max_attempts: Optional[int] = None) -> RetryResult:
+    """
+    Run a seeded glitch with new seeds until its result decodes.
+
+    At least one attempt is made. Attempts the precheck rejects cost no
+    decode at all.
+
+    Args:
+        glitch: Produces a glitched buffer from a seed
+        seed: Seed for the sequence of attempt seeds; None for a random run
+        budget: Seconds to keep trying
+        max_attempts: Optional cap on the number of attempts
+
+    Returns:
+        A RetryResult; data and seed are None if no attempt decoded
+    """
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + budget
+    attempts = 0
+    while True:
+        attempt_seed = rng.getrandbits(63)
+        attempts += 1
+        result = glitch(attempt_seed)
+        reason = decode_error(result)
+        if reason is None:
+            logger.info(f"Decodable result after {attempts} attempts")
+            return RetryResult(result, attempt_seed, attempts)
+        logger.debug(f"Attempt {attempts} (seed {attempt_seed}) does not decode: {reason}")
+        if time.perf_counter() >= deadline or (max_attempts is not None and attempts >= max_attempts):
+            logger.info(f"No decodable result in {attempts} attempts")
+            return RetryResult(None, None, attempts)
@@ -0,0 +1,124 @@
+"""
+Latest-request-wins background workers.
+
+The GUI hands slow work (preview decodes, live re-runs of an operation) to
+a background thread and only ever wants the result of its newest request.
+LatestWorker keeps a single pending slot: submitting while a request waits
+replaces it, so at most one request runs and one is queued however fast
+requests arrive. Every request gets an increasing generation number;
+results whose generation is no longer the latest, because a newer request
+or cancel() arrived meanwhile, are dropped instead of being delivered.
+
+Subclasses implement process() and build the request in their own
+submit(). Results are polled from the Tk thread, which must create any
+PhotoImage itself.
+"""
+
+import queue
+import threading
+from typing import Any, Optional
+
+
+class LatestWorker:
+    """Background thread that processes the most recently submitted request."""
+
+    def __init__(self, name: str) -> None:
+        """
+        Start the worker thread.
+
+        Args:
+            name: Thread name, shown in debuggers and profiles
+        """
+        self._cond = threading.Condition()
+        self._pending: Optional[Any] = None
+        self._generation = 0
+        self._running = 0  # Generation of the request in progress, 0 when idle
+        self._stopped = False
+        self._results: "queue.Queue[Any]" = queue.Queue()
+        self.coalesced = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def process(self, generation: int, request: Any) -> Any:
+        """
+        Handle one request on the worker thread.
+
+        Args:
+            generation: The request's generation number
+            request: What _submit() was given
+
+        Returns:
+            The result to deliver; it must have a generation attribute
+        """
+        raise NotImplementedError
+
+    def _submit(self, request: Any) -> int:
+        """Queue request, replacing any request that has not started yet."""
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._generation += 1
+            self._pending = (self._generation, request)
+            self._cond.notify()
+            return self._generation
+
+    def cancel(self) -> None:
+        """Discard the pending request and any in-flight result."""
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+
+    @property
+    def busy(self) -> bool:
+        """True while a request is queued or the latest request has no result yet."""
+        with self._cond:
+            return self._pending is not None or self._running == self._generation
+
+    def is_current(self, generation: int) -> bool:
+        """Return True if generation is still the latest request."""
+        with self._cond:
+            return generation == self._generation
+
+    def poll(self) -> Optional[Any]:
+        """
+        Fetch the result of the latest request, if it has finished. Call from the UI thread.
+
+        Returns:
+            The result, or None if nothing current is ready
+        """
+        latest = None
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if self.is_current(result.generation):
+                latest = result
+        return latest
+
+    def stop(self) -> None:
+        """Ask the worker thread to exit after its current request."""
+        with self._cond:
+            self._stopped = True
+            self._pending = None
+            self._cond.notify()
+
+    def _run(self) -> None:
+        """Worker loop: wait for a request, process it, publish if still current."""
+        while True:
+            with self._cond:
+                while self._pending is None and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                generation, request = self._pending
+                self._pending = None
+                self._running = generation
+
+            result = self.process(generation, request)
+
+            with self._cond:
+                self._running = 0
+                # A newer request arrived meanwhile: drop this stale result
+                if generation == self._generation:
+                    self._results.put(result)
@@ -1,11 +1,26 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
-import io
-import random
+import math
 import os
+import sys
 import logging
-from typing import Optional, Tuple
+import multiprocessing
+from array import array
+from typing import Callable, List, Optional, Tuple
+
+from hexglitcher import engine, hexview, png, recipe
+from hexglitcher.buffer import CowBuffer
+from hexglitcher.cache import thumbnail_cache
+from hexglitcher.explore import Exploration, variant_source
+from hexglitcher.formats import Region, RegionMap, RegionTracker, detect_format
+from hexglitcher.history import History, ReplaceStep, Step
+from hexglitcher.live import LiveRunner
+from hexglitcher.patterns import PATTERN_KINDS
+from hexglitcher.pixel import PIXEL_EFFECTS
+from hexglitcher.preview import PreviewWorker
+from hexglitcher.profiling import ProfileCapture, format_stats, stage_timer
+from hexglitcher.validity import RETRY_BUDGET, retry_until_decodable
 
 # Configure logging
 logging.basicConfig(
@@ -14,6 +29,168 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+class HexView(ttk.Frame):
+    """
+    Virtualised hex view and byte editor over a whole buffer.
+    Only the visible rows are formatted, so scrolling and refreshing cost
+    the same for any file size. Bytes that differ from the reference buffer
+    are highlighted. Click a byte and type two hex digits to overwrite it.
+    """
+
+    def __init__(self, parent: tk.Widget, rows: int,
+                 on_edit: Optional[Callable[[int, int], None]] = None) -> None:
+        """
+        Build the view.
+
+        Args:
+            parent: The parent widget
+            rows: Number of visible rows
+            on_edit: Called with (offset, value) when the user types a byte
+        """
+        super().__init__(parent)
+        self.rows = rows
+        self.on_edit = on_edit
+        self.data: Optional[CowBuffer] = None
+        self.reference: Optional[CowBuffer] = None
+        self.top_row = 0
+        self.cursor: Optional[int] = None
+        self.pending_nibble: Optional[int] = None
+
+        self.text = tk.Text(self, height=rows, bg="#1e1e1e", fg="#00ff00", font=("Consolas", 10),
+                            wrap=tk.NONE, cursor="arrow", insertwidth=0)
+        self.text.tag_config("modified", foreground="#ff5050")
+        self.text.tag_config("cursor", background="#505050")
+        self.text.config(state=tk.DISABLED)
+        # Scrolling is virtual: the scrollbar maps onto rows of the whole file
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.text.bind("<MouseWheel>", lambda event: self.scroll_rows(-3 if event.delta > 0 else 3))
+        self.text.bind("<Button-4>", lambda event: self.scroll_rows(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_rows(3))
+        self.text.bind("<Button-1>", self.on_click)
+        self.text.bind("<Key>", self.on_key)
+
+    def set_data(self, data: Optional[CowBuffer], reference: Optional[CowBuffer] = None) -> None:
+        """
+        Show a buffer, keeping the scroll position where possible.
+
+        Args:
+            data: Buffer to show
+            reference: Buffer to highlight differences against
+        """
+        self.data = data
+        self.reference = reference
+        self.pending_nibble = None
+        if data is None or (self.cursor is not None and self.cursor >= len(data)):
+            self.cursor = None
+        self.render()
+
+    def total_rows(self) -> int:
+        """Rows needed for the whole buffer."""
+        return hexview.row_count(len(self.data)) if self.data else 0
+
+    def scroll_to_row(self, row: int) -> None:
+        """Make row the first visible row, clamped to the buffer."""
+        self.top_row = max(0, min(row, self.total_rows() - self.rows))
+        self.render()
+
+    def scroll_rows(self, delta: int) -> str:
+        """Scroll by delta rows; returns "break" to stop the default Text scrolling."""
+        self.scroll_to_row(self.top_row + delta)
+        return "break"
+
+    def show_offset(self, offset: int) -> None:
+        """Scroll offset into view and put the edit cursor on it."""
+        if not self.data or not 0 <= offset < len(self.data):
+            return
+        self.cursor = offset
+        self.pending_nibble = None
+        row = offset // hexview.BYTES_PER_ROW
+        if not self.top_row <= row < self.top_row + self.rows:
+            self.top_row = max(0, min(row - self.rows // 2, self.total_rows() - self.rows))
+        self.render()
+
+    def on_scrollbar(self, action: str, amount: str, unit: Optional[str] = None) -> None:
+        """Scrollbar command: "moveto fraction" or "scroll n units|pages"."""
+        if action == tk.MOVETO:
+            self.scroll_to_row(int(float(amount) * self.total_rows()))
+        elif action == tk.SCROLL:
+            step = self.rows if unit == tk.PAGES else 1
+            self.scroll_to_row(self.top_row + int(amount) * step)
+
+    def render(self) -> None:
+        """Format and show the visible rows only."""
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        if not self.data:
+            self.text.config(state=tk.DISABLED)
+            self.scrollbar.set(0.0, 1.0)
+            return
+
+        with stage_timer.time("hex render"):
+            width = hexview.offset_width(len(self.data))
+            rows = hexview.format_rows(self.data, self.top_row, self.rows, self.reference)
+            self.text.insert("1.0", "\n".join(row.text for row in rows))
+            for line, row in enumerate(rows, 1):
+                for index in row.modified:
+                    self.tag_byte("modified", line, width, index)
+            if self.cursor is not None:
+                line = self.cursor // hexview.BYTES_PER_ROW - self.top_row + 1
+                if 1 <= line <= len(rows):
+                    self.tag_byte("cursor", line, width, self.cursor % hexview.BYTES_PER_ROW)
+        self.text.config(state=tk.DISABLED)
+
+        total = max(self.total_rows(), 1)
+        self.scrollbar.set(self.top_row / total, min(1.0, (self.top_row + self.rows) / total))
+
+    def tag_byte(self, tag: str, line: int, width: int, index: int) -> None:
+        """Apply tag to the hex digits and the ASCII character of one byte."""
+        column = hexview.hex_column(width, index)
+        self.text.tag_add(tag, f"{line}.{column}", f"{line}.{column + 2}")
+        column = hexview.ascii_column(width, index)
+        self.text.tag_add(tag, f"{line}.{column}", f"{line}.{column + 1}")
+
+    def on_click(self, event: tk.Event) -> str:
+        """Select the clicked byte as the edit cursor."""
+        self.text.focus_set()
+        if not self.data:
+            return "break"
+        line, column = map(int, self.text.index(f"@{event.x},{event.y}").split("."))
+        index = hexview.byte_index(hexview.offset_width(len(self.data)), column)
+        if index is not None:
+            offset = (self.top_row + line - 1) * hexview.BYTES_PER_ROW + index
+            if offset < len(self.data):
+                self.show_offset(offset)
+        return "break"
+
+    def on_key(self, event: tk.Event) -> Optional[str]:
+        """Type hex digits over the cursor byte; arrows and page keys move around."""
+        if not self.data:
+            return None
+        moves = {"Left": -1, "Right": 1, "Up": -hexview.BYTES_PER_ROW, "Down": hexview.BYTES_PER_ROW}
+        if event.keysym in moves and self.cursor is not None:
+            self.show_offset(max(0, min(self.cursor + moves[event.keysym], len(self.data) - 1)))
+            return "break"
+        if event.keysym in ("Prior", "Next"):
+            self.scroll_rows(-self.rows if event.keysym == "Prior" else self.rows)
+            return "break"
+        if self.cursor is None or not event.char or event.char not in engine.HEX_DIGITS:
+            return None
+        nibble = int(event.char, 16)
+        if self.pending_nibble is None:
+            self.pending_nibble = nibble
+            return "break"
+        offset, value = self.cursor, self.pending_nibble << 4 | nibble
+        self.pending_nibble = None
+        if self.on_edit is not None:
+            self.on_edit(offset, value)
+        # Continue typing into the next byte, like a hex editor
+        self.show_offset(min(offset + 1, len(self.data) - 1))
+        return "break"
+
+
 class GlitchApp:
     """
     HexGlitcher - A raw hex-level image glitching application.
@@ -21,13 +198,23 @@ class GlitchApp:
     """
 
     # Configuration constants
-    DEFAULT_HEADER_SIZE = 500
-    DEFAULT_INTENSITY = 1000
-    HEX_PREVIEW_BYTES = 512
+    DEFAULT_HEADER_SIZE = engine.DEFAULT_HEADER_SIZE
+    DEFAULT_INTENSITY = engine.DEFAULT_INTENSITY
+    HEX_ROWS = 12
     PREVIEW_SIZE = (600, 400)
-    MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
-    ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
-    SYSTEM_DIRS = ['/etc', '/bin', '/sbin', '/usr/bin', '/usr/sbin', '/boot', '/sys', '/proc']
+    PREVIEW_POLL_MS = 30
+    PNG_LEVELS = ("0", "1", "3", "6", "9")
+    EXPLORE_VARIANTS = 12
+    EXPLORE_COLUMNS = 4
+    EXPLORE_THUMB_SIZE = (200, 150)
+    EXPLORE_POLL_MS = 50
+    LIVE_FRAME_MS = 33
+    STATS_REFRESH_MS = 1000
+    INTENSITY_SLIDER_MAX = 100000
+    HEADER_SLIDER_MAX = 4096
+    MAX_FILE_SIZE = engine.MAX_MAPPED_FILE_SIZE
+    ALLOWED_EXTENSIONS = engine.ALLOWED_EXTENSIONS
+    SYSTEM_DIRS = engine.SYSTEM_DIRS
 
     def __init__(self, root: tk.Tk) -> None:
         """
@@ -42,16 +229,55 @@ class GlitchApp:
         self.root.configure(bg="#2b2b2b")
 
         # Data Storage
-        self.original_data: Optional[bytearray] = None
-        self.glitched_data: Optional[bytearray] = None
+        self.original_data: Optional[CowBuffer] = None
+        self.glitched_data: Optional[CowBuffer] = None
         self.image_preview: Optional[Image.Image] = None
         self.tk_image: Optional[ImageTk.PhotoImage] = None
         self.file_path: Optional[str] = None
         self.file_ext: Optional[str] = None
 
+        # Operations stack on glitched_data; each step is stored as a diff
+        self.history = History()
+
+        # Structure index of glitched_data, re-indexed when its structure may have changed
+        self.region_tracker = RegionTracker()
+
+        # Variant explorer window and its running process pool, if open
+        self.explorer: Optional[tk.Toplevel] = None
+        self.exploration: Optional[Exploration] = None
+        self.explore_base: Optional[CowBuffer] = None
+        self.explore_params: dict = {}
+        self.explore_tiles: List[ttk.Button] = []
+        self.explore_images: List[Optional[ImageTk.PhotoImage]] = []
+
+        # Live slider re-runs: one engine run in flight, the newest queued.
+        # A slider drag owns one history step (live_step) and replaces it.
+        self.live_runner = LiveRunner()
+        self.live_tracker = RegionTracker()
+        self.live_timer: Optional[str] = None
+        self.live_pending: Optional[Tuple[int, str, dict, CowBuffer]] = None
+        self.live_base: Optional[CowBuffer] = None
+        self.live_seed: Optional[int] = None
+        self.live_step: Optional[Step] = None
+
+        # Retry-until-decodable runs off the Tk thread too, committed by poll_retry
+        self.retry_runner = LiveRunner()
+        self.retry_pending: Optional[Tuple[int, str, dict, CowBuffer]] = None
+
+        # Stage timings are always collected; cProfile only while toggled on
+        self.profile_capture = ProfileCapture()
+        self.stats_visible = False
+        self.stats_timer: Optional[str] = None
+
+        # Preview decoding runs off the Tk thread; results are polled back in
+        self.preview_worker = PreviewWorker(self.PREVIEW_SIZE)
+        self.root.after(self.PREVIEW_POLL_MS, self.poll_preview)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Setup UI components
         self.setup_styles()
         self.build_ui()
+        self.bind_shortcuts()
 
         logging.info("GlitchApp initialized")
 
@@ -65,6 +291,14 @@ class GlitchApp:
         style.configure("TFrame", background="#2b2b2b")
         style.configure("TLabelframe", background="#2b2b2b", foreground="white")
         style.configure("TLabelframe.Label", background="#2b2b2b", foreground="white")
+        style.configure("TCheckbutton", background="#2b2b2b", foreground="white")
+        style.map("TCheckbutton", background=[('active', '#2b2b2b')])
+
+    def bind_shortcuts(self) -> None:
+        """Bind keyboard shortcuts for history navigation."""
+        self.root.bind_all("<Control-z>", lambda event: self.undo())
+        self.root.bind_all("<Control-y>", lambda event: self.redo())
+        self.root.bind_all("<Control-Shift-Z>", lambda event: self.redo())
 
     def build_ui(self) -> None:
         """Construct the main user interface layout."""
@@ -98,6 +332,12 @@ class GlitchApp:
         # Random Glitch
         self.build_random_glitch_frame(left_panel)
 
+        # Pixel Effects
+        self.build_pixel_frame(left_panel)
+
+        # Undo / Redo / Reset
+        self.build_history_frame(left_panel)
+
         # Save Button
         save_btn = ttk.Button(left_panel, text="Save Result", command=self.save_image)
         save_btn.pack(fill=tk.X, pady=20)
@@ -116,8 +356,17 @@ class GlitchApp:
         self.header_size = tk.IntVar(value=self.DEFAULT_HEADER_SIZE)
         header_entry = ttk.Entry(header_frame, textvariable=self.header_size)
         header_entry.pack(fill=tk.X, padx=5, pady=5)
+        self.header_slider = ttk.Scale(header_frame, from_=0, to=self.HEADER_SLIDER_MAX,
+                                       value=self.DEFAULT_HEADER_SIZE, command=self.on_header_slider)
+        self.header_slider.pack(fill=tk.X, padx=5)
         ttk.Label(header_frame, text="(Crucial to keep file valid)").pack(anchor="w", padx=5, pady=(0,5))
 
+        self.protect_structure = tk.BooleanVar(value=True)
+        ttk.Checkbutton(header_frame, text="Auto-detect file structure", variable=self.protect_structure,
+                        command=self.update_structure_status).pack(anchor="w", padx=5)
+        self.structure_status = ttk.Label(header_frame, text="")
+        self.structure_status.pack(anchor="w", padx=5, pady=(0, 5))
+
     def build_find_replace_frame(self, parent: ttk.Frame) -> None:
         """
         Build the find & replace hex control frame.
@@ -128,14 +377,36 @@ class GlitchApp:
         fr_frame = ttk.LabelFrame(parent, text="Find & Replace (Hex)")
         fr_frame.pack(fill=tk.X, pady=5)
 
-        ttk.Label(fr_frame, text="Find (e.g., FF):").pack(anchor="w", padx=5)
+        ttk.Label(fr_frame, text="Find (e.g., FF, FF ?? D8 or \\xff.\\xd8):").pack(anchor="w", padx=5)
         self.find_hex = tk.StringVar()
         ttk.Entry(fr_frame, textvariable=self.find_hex).pack(fill=tk.X, padx=5)
 
+        ttk.Label(fr_frame, text="Find Syntax:").pack(anchor="w", padx=5)
+        self.pattern_kind = tk.StringVar(value="hex")
+        ttk.OptionMenu(fr_frame, self.pattern_kind, "hex", *PATTERN_KINDS).pack(fill=tk.X, padx=5)
+
         ttk.Label(fr_frame, text="Replace (e.g., 00):").pack(anchor="w", padx=5)
         self.replace_hex = tk.StringVar()
         ttk.Entry(fr_frame, textvariable=self.replace_hex).pack(fill=tk.X, padx=5)
 
+        limits = ttk.Frame(fr_frame)
+        limits.pack(fill=tk.X, padx=5, pady=(5, 0))
+        ttk.Label(limits, text="Replace %:").pack(side=tk.LEFT)
+        self.replace_percent = tk.DoubleVar(value=100.0)
+        ttk.Entry(limits, textvariable=self.replace_percent, width=6).pack(side=tk.LEFT, padx=(2, 10))
+        ttk.Label(limits, text="Max:").pack(side=tk.LEFT)
+        self.max_matches = tk.StringVar()
+        ttk.Entry(limits, textvariable=self.max_matches, width=8).pack(side=tk.LEFT, padx=2)
+
+        ttk.Label(fr_frame, text="Offset range (blank = whole body, 0x allowed):").pack(anchor="w", padx=5)
+        offsets = ttk.Frame(fr_frame)
+        offsets.pack(fill=tk.X, padx=5)
+        self.range_start = tk.StringVar()
+        self.range_end = tk.StringVar()
+        ttk.Entry(offsets, textvariable=self.range_start, width=12).pack(side=tk.LEFT, expand=True, fill=tk.X)
+        ttk.Label(offsets, text=" to ").pack(side=tk.LEFT)
+        ttk.Entry(offsets, textvariable=self.range_end, width=12).pack(side=tk.LEFT, expand=True, fill=tk.X)
+
         fr_btn = ttk.Button(fr_frame, text="Apply Find/Replace", command=self.apply_find_replace)
         fr_btn.pack(fill=tk.X, padx=5, pady=5)
 
@@ -152,15 +423,104 @@ class GlitchApp:
         ttk.Label(rand_frame, text="Intensity (1/x bytes changed):").pack(anchor="w", padx=5)
         self.intensity = tk.IntVar(value=self.DEFAULT_INTENSITY)
         ttk.Entry(rand_frame, textvariable=self.intensity).pack(fill=tk.X, padx=5)
+        # Logarithmic: equal slider travel for 1/10 to 1/100 and 1/10000 to 1/100000
+        self.intensity_slider = ttk.Scale(rand_frame, from_=0.0, to=math.log10(self.INTENSITY_SLIDER_MAX),
+                                          value=math.log10(self.DEFAULT_INTENSITY),
+                                          command=self.on_intensity_slider)
+        self.intensity_slider.pack(fill=tk.X, padx=5)
 
         ttk.Label(rand_frame, text="Byte Operation:").pack(anchor="w", padx=5)
         self.glitch_mode = tk.StringVar(value="Random")
-        modes = ["Random", "Increment", "Decrement", "Zero", "Bitwise XOR"]
-        ttk.OptionMenu(rand_frame, self.glitch_mode, "Random", *modes).pack(fill=tk.X, padx=5, pady=5)
+        ttk.OptionMenu(rand_frame, self.glitch_mode, "Random", *engine.GLITCH_MODES).pack(fill=tk.X, padx=5, pady=5)
+
+        png_row = ttk.Frame(rand_frame)
+        png_row.pack(fill=tk.X, padx=5)
+        self.png_pixels = tk.BooleanVar(value=True)
+        ttk.Checkbutton(png_row, text="PNG: glitch pixels, level", variable=self.png_pixels,
+                        command=self.update_structure_status).pack(side=tk.LEFT)
+        self.png_level = tk.StringVar(value=str(png.DEFAULT_LEVEL))
+        ttk.OptionMenu(png_row, self.png_level, self.png_level.get(), *self.PNG_LEVELS).pack(side=tk.LEFT, padx=5)
+
+        self.live_enabled = tk.BooleanVar(value=False)
+        ttk.Checkbutton(rand_frame, text="Live: re-glitch while dragging sliders",
+                        variable=self.live_enabled).pack(anchor="w", padx=5)
+        self.live_status = ttk.Label(rand_frame, text="")
+        self.live_status.pack(anchor="w", padx=5)
+
+        self.retry_decodable = tk.BooleanVar(value=False)
+        ttk.Checkbutton(rand_frame, text=f"Retry until it decodes (max {RETRY_BUDGET:g}s)",
+                        variable=self.retry_decodable).pack(anchor="w", padx=5)
 
         rand_btn = ttk.Button(rand_frame, text="Glitch It!", command=self.apply_random_glitch)
         rand_btn.pack(fill=tk.X, padx=5, pady=5)
 
+        explore_btn = ttk.Button(rand_frame, text=f"Explore {self.EXPLORE_VARIANTS} Variants...",
+                                 command=self.open_explorer)
+        explore_btn.pack(fill=tk.X, padx=5, pady=(0, 5))
+
+    def build_pixel_frame(self, parent: ttk.Frame) -> None:
+        """
+        Build the pixel effects control frame.
+
+        Args:
+            parent: The parent frame to attach to
+        """
+        pixel_frame = ttk.LabelFrame(parent, text="Pixel Effects (decoded image)")
+        pixel_frame.pack(fill=tk.X, pady=5)
+
+        self.pixel_effect = tk.StringVar(value=PIXEL_EFFECTS[0])
+        ttk.OptionMenu(pixel_frame, self.pixel_effect, PIXEL_EFFECTS[0], *PIXEL_EFFECTS).pack(
+            fill=tk.X, padx=5, pady=5)
+
+        threshold_row = ttk.Frame(pixel_frame)
+        threshold_row.pack(fill=tk.X, padx=5)
+        ttk.Label(threshold_row, text="Sort luma:").pack(side=tk.LEFT)
+        self.sort_low = tk.IntVar(value=64)
+        ttk.Entry(threshold_row, textvariable=self.sort_low, width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Label(threshold_row, text="to").pack(side=tk.LEFT)
+        self.sort_high = tk.IntVar(value=192)
+        ttk.Entry(threshold_row, textvariable=self.sort_high, width=5).pack(side=tk.LEFT, padx=5)
+        self.sort_vertical = tk.BooleanVar(value=False)
+        ttk.Checkbutton(threshold_row, text="Vertical", variable=self.sort_vertical).pack(side=tk.LEFT)
+
+        amount_row = ttk.Frame(pixel_frame)
+        amount_row.pack(fill=tk.X, padx=5)
+        ttk.Label(amount_row, text="Shift px:").pack(side=tk.LEFT)
+        self.pixel_shift = tk.IntVar(value=16)
+        ttk.Entry(amount_row, textvariable=self.pixel_shift, width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Label(amount_row, text="Slices:").pack(side=tk.LEFT)
+        self.slice_count = tk.IntVar(value=12)
+        ttk.Entry(amount_row, textvariable=self.slice_count, width=6).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(pixel_frame, text="Apply Pixel Effect", command=self.apply_pixel_effect).pack(
+            fill=tk.X, padx=5, pady=5)
+
+    def build_history_frame(self, parent: ttk.Frame) -> None:
+        """
+        Build the undo/redo control frame.
+
+        Args:
+            parent: The parent frame to attach to
+        """
+        history_frame = ttk.LabelFrame(parent, text="History (Ctrl+Z / Ctrl+Y)")
+        history_frame.pack(fill=tk.X, pady=5)
+
+        buttons = ttk.Frame(history_frame)
+        buttons.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(buttons, text="Undo", command=self.undo).pack(side=tk.LEFT, expand=True, fill=tk.X)
+        ttk.Button(buttons, text="Redo", command=self.redo).pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
+        ttk.Button(buttons, text="Reset", command=self.reset_to_original).pack(side=tk.LEFT, expand=True, fill=tk.X)
+
+        recipe_buttons = ttk.Frame(history_frame)
+        recipe_buttons.pack(fill=tk.X, padx=5)
+        ttk.Button(recipe_buttons, text="Export Recipe...", command=self.export_recipe).pack(
+            side=tk.LEFT, expand=True, fill=tk.X)
+        ttk.Button(recipe_buttons, text="Apply Recipe...", command=self.apply_recipe).pack(
+            side=tk.LEFT, expand=True, fill=tk.X, padx=(5, 0))
+
+        self.history_status = ttk.Label(history_frame, text="No steps")
+        self.history_status.pack(anchor="w", padx=5, pady=5)
+
     def build_right_panel(self, parent: ttk.Frame) -> None:
         """
         Build the right panel with preview and hex display.
@@ -173,20 +533,130 @@ class GlitchApp:
 
         # Image Preview Area
         self.preview_label = ttk.Label(right_panel, text="No Image Loaded", anchor="center", background="#1e1e1e")
-        self.preview_label.pack(side=tk.TOP, fill=tk.BOTH, expand=True, pady=(0, 10))
+        self.preview_label.pack(side=tk.TOP, fill=tk.BOTH, expand=True, pady=(0, 5))
+
+        # Fast previews while iterating, LANCZOS only when asked for
+        self.hq_preview = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            right_panel, text="High-quality preview (slower)",
+            variable=self.hq_preview, command=self.update_preview
+        ).pack(side=tk.TOP, anchor="w", pady=(0, 5))
 
-        # Hex Preview Area
-        hex_frame = ttk.LabelFrame(right_panel, text=f"Hex Preview (First {self.HEX_PREVIEW_BYTES} Bytes)")
+        # Hex View Area: the whole file, modified bytes in red
+        hex_frame = ttk.LabelFrame(right_panel, text="Hex View (click a byte and type hex to edit)")
         hex_frame.pack(side=tk.BOTTOM, fill=tk.X)
 
-        self.hex_text = tk.Text(hex_frame, height=8, bg="#1e1e1e", fg="#00ff00", font=("Consolas", 10))
-        self.hex_text.pack(fill=tk.BOTH, padx=5, pady=5)
-        self.hex_text.config(state=tk.DISABLED)
+        nav = ttk.Frame(hex_frame)
+        nav.pack(fill=tk.X, padx=5, pady=(5, 0))
+        ttk.Label(nav, text="Go to offset:").pack(side=tk.LEFT)
+        self.goto_offset = tk.StringVar()
+        goto_entry = ttk.Entry(nav, textvariable=self.goto_offset, width=14)
+        goto_entry.pack(side=tk.LEFT, padx=5)
+        goto_entry.bind("<Return>", lambda event: self.go_to_offset())
+        ttk.Button(nav, text="Go", command=self.go_to_offset).pack(side=tk.LEFT)
+        ttk.Button(nav, text="Next Change", command=self.next_change).pack(side=tk.LEFT, padx=5)
+
+        self.hex_view = HexView(hex_frame, self.HEX_ROWS, on_edit=self.edit_byte)
+        self.hex_view.pack(fill=tk.BOTH, padx=5, pady=5)
+
+        self.build_stats_frame(right_panel)
+
+    def build_stats_frame(self, parent: ttk.Frame) -> None:
+        """
+        Build the collapsible performance stats panel above the hex view.
+
+        Args:
+            parent: The parent frame to attach to
+        """
+        stats_frame = ttk.Frame(parent)
+        stats_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(0, 5))
+
+        header = ttk.Frame(stats_frame)
+        header.pack(fill=tk.X)
+        self.stats_toggle = ttk.Button(header, text="Show Performance Stats", command=self.toggle_stats)
+        self.stats_toggle.pack(side=tk.LEFT)
+
+        self.stats_body = ttk.Frame(stats_frame)
+        self.stats_text = tk.Label(self.stats_body, font=("Courier", 9), justify=tk.LEFT, anchor="w",
+                                   bg="#1e1e1e", fg="#d4d4d4")
+        self.stats_text.pack(fill=tk.X, pady=(5, 0))
+
+        profile_row = ttk.Frame(self.stats_body)
+        profile_row.pack(fill=tk.X, pady=(5, 0))
+        self.profile_enabled = tk.BooleanVar(value=False)
+        ttk.Checkbutton(profile_row, text="cProfile operations", variable=self.profile_enabled,
+                        command=self.toggle_profiling).pack(side=tk.LEFT)
+        ttk.Button(profile_row, text="Save Profile...", command=self.save_profile).pack(side=tk.LEFT, padx=5)
+        ttk.Button(profile_row, text="Reset", command=self.reset_stats).pack(side=tk.LEFT)
+
+    def toggle_stats(self) -> None:
+        """Show or hide the stats panel; it refreshes itself while shown."""
+        self.stats_visible = not self.stats_visible
+        if self.stats_visible:
+            self.stats_body.pack(fill=tk.X)
+            self.stats_toggle.config(text="Hide Performance Stats")
+            self.refresh_stats()
+        else:
+            if self.stats_timer is not None:
+                self.root.after_cancel(self.stats_timer)
+                self.stats_timer = None
+            self.stats_body.pack_forget()
+            self.stats_toggle.config(text="Show Performance Stats")
+
+    def refresh_stats(self) -> None:
+        """Redraw the rolling stage timings and cache counters while the panel is shown."""
+        if self.stats_timer is not None:
+            self.root.after_cancel(self.stats_timer)
+            self.stats_timer = None
+        if not self.stats_visible:
+            return
+        stages = stage_timer.stats()
+        cache = thumbnail_cache.stats()
+        decoder = self.preview_worker.decoder
+        lines = [
+            format_stats(stages) if stages else "No timings yet",
+            f"Preview cache: {cache.hit_rate:.0%} hits, {cache.entries} images, "
+            f"{cache.nbytes / (1024 * 1024):.1f}/{cache.budget / (1024 * 1024):.0f} MB",
+            f"JPEG decodes: {decoder.partial_decodes} partial, {decoder.full_decodes} full; "
+            f"live runs: {self.live_runner.runs}, {self.live_runner.coalesced} coalesced",
+        ]
+        if self.profile_capture.enabled or len(self.profile_capture):
+            lines.append(f"Profiled operations: {len(self.profile_capture)} kept")
+        self.stats_text.config(text="\n".join(lines))
+        self.stats_timer = self.root.after(self.STATS_REFRESH_MS, self.refresh_stats)
+
+    def toggle_profiling(self) -> None:
+        """Start or stop capturing cProfile statistics of operations."""
+        self.profile_capture.enabled = self.profile_enabled.get()
+        logging.info(f"Operation profiling {'enabled' if self.profile_capture.enabled else 'disabled'}")
+
+    def save_profile(self) -> None:
+        """Write the profiles of the last captured operations to a .pstats file."""
+        if not len(self.profile_capture):
+            messagebox.showinfo("Info", "Enable cProfile and run some operations first")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".pstats",
+                                                 filetypes=[("Profile statistics", "*.pstats")])
+        if not file_path:
+            return
+        try:
+            count = self.profile_capture.dump(file_path)
+            messagebox.showinfo("Success", f"Profile of the last {count} operations saved to:\n"
+                                           f"{os.path.basename(file_path)}")
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to save profile: {e}")
+            messagebox.showerror("Error", f"Failed to save profile: {e}")
+
+    def reset_stats(self) -> None:
+        """Clear the stage timings and captured profiles."""
+        stage_timer.reset()
+        self.profile_capture.clear()
+        self.refresh_stats()
 
     def load_image(self) -> None:
         """
         Open a file dialog for user to select an image file.
-        Loads the file into memory as raw bytes for manipulation.
+        Memory-maps the file behind a copy-on-write buffer for manipulation.
         Updates preview and hex display upon successful load.
 
         Validates:
@@ -194,48 +664,39 @@ class GlitchApp:
             - File size is under MAX_FILE_SIZE
         """
         file_path = filedialog.askopenfilename(
-            filetypes=[("Images", "*.jpg *.jpeg *.png *.bmp *.gif *.webp")]
+            filetypes=[("Images", "*.jpg *.jpeg *.png *.bmp *.gif *.webp *.tif *.tiff")]
         )
 
         if not file_path:
             return
 
-        # Validate file extension
         _, ext = os.path.splitext(file_path.lower())
 
-        if ext not in self.ALLOWED_EXTENSIONS:
-            logging.warning(f"Invalid file type attempted: {ext}")
-            messagebox.showerror("Error", f"Invalid file type. Supported: {', '.join(self.ALLOWED_EXTENSIONS)}")
-            return
-
-        # Validate file size
         try:
-            file_size = os.path.getsize(file_path)
-            if file_size > self.MAX_FILE_SIZE:
-                logging.warning(f"File too large: {file_size} bytes")
-                messagebox.showerror("Error", f"File too large. Maximum size is {self.MAX_FILE_SIZE // (1024*1024)}MB.")
-                return
-            logging.info(f"Loading file: {file_path} ({file_size} bytes)")
-        except OSError as e:
-            logging.error(f"Cannot access file: {e}")
-            messagebox.showerror("Error", f"Cannot access file: {e}")
-            return
-
-        self.file_path = file_path
-        self.file_ext = ext
+            with stage_timer.time("load"):
+                data = engine.load_mapped(file_path, self.MAX_FILE_SIZE)
 
-        try:
-            with open(file_path, "rb") as f:
-                self.original_data = bytearray(f.read())
+            self.file_path = file_path
+            self.file_ext = ext
+            self.original_data = data
 
             # Clear old image reference before creating new one
-            if self.tk_image:
-                del self.tk_image
-
-            self.glitched_data = self.original_data[:]
+            self.tk_image = None
+
+            self.glitched_data = self.original_data.copy()
+            self.region_tracker.reset()
+            # A fresh tracker rather than reset(): a cancelled live run may still hold the old one
+            self.live_tracker = RegionTracker()
+            self.end_live_session()
+            self.cancel_retry()
+            self.history.clear()
+            self.update_history_status()
             self.refresh_ui()
             logging.info(f"Successfully loaded {len(self.original_data)} bytes")
 
+        except ValueError as e:
+            logging.warning(f"Rejected file {file_path}: {e}")
+            messagebox.showerror("Error", str(e))
         except PermissionError:
             logging.error(f"Permission denied: {file_path}")
             messagebox.showerror("Error", "Permission denied reading file")
@@ -248,67 +709,256 @@ class GlitchApp:
 
     def update_hex_view(self) -> None:
         """
-        Update the hex preview display with the first HEX_PREVIEW_BYTES bytes.
-        Shows hex representation of raw byte data.
+        Show the current data in the hex view, highlighting the bytes that
+        differ from the original. Only the visible rows are re-rendered.
         """
         if not self.glitched_data:
             return
+        self.hex_view.set_data(self.glitched_data, self.original_data)
 
-        # Show first HEX_PREVIEW_BYTES bytes
-        header_len = min(self.HEX_PREVIEW_BYTES, len(self.glitched_data))
-        raw_bytes = self.glitched_data[:header_len]
+    def go_to_offset(self) -> None:
+        """
+        Scroll the hex view to the offset typed in the Go to field.
 
-        hex_str = " ".join(f"{b:02X}" for b in raw_bytes)
+        Validates:
+            - The offset is a decimal or 0x-prefixed number inside the file
+        """
+        if not self.glitched_data:
+            return
+        try:
+            offset = engine.parse_offset(self.goto_offset.get(), "Offset")
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if offset is None:
+            return
+        if offset >= len(self.glitched_data):
+            messagebox.showerror("Error", f"Offset must be less than the file size ({len(self.glitched_data)})")
+            return
+        self.hex_view.show_offset(offset)
 
-        self.hex_text.config(state=tk.NORMAL)
-        self.hex_text.delete(1.0, tk.END)
-        self.hex_text.insert(tk.END, hex_str)
-        self.hex_text.config(state=tk.DISABLED)
+    def next_change(self) -> None:
+        """Jump the hex view to the next byte that differs from the original."""
+        if not self.glitched_data:
+            return
+        if len(self.glitched_data) != len(self.original_data):
+            messagebox.showinfo("Info", "The file length changed; offsets no longer line up with the original")
+            return
+        start = 0 if self.hex_view.cursor is None else self.hex_view.cursor + 1
+        offset = hexview.next_difference(self.glitched_data, self.original_data, start)
+        if offset is None and start:
+            offset = hexview.next_difference(self.glitched_data, self.original_data, 0)
+        if offset is None:
+            messagebox.showinfo("Info", "No bytes differ from the original")
+            return
+        self.hex_view.show_offset(offset)
+
+    def edit_byte(self, offset: int, value: int) -> None:
+        """
+        Overwrite one byte typed in the hex view, as an undoable, recordable step.
+
+        Args:
+            offset: Offset of the byte
+            value: Its new value
+        """
+        if not self.glitched_data or self.glitched_data[offset] == value:
+            return
+        self.apply_op(f"Edit 0x{offset:X} = {value:02X}", {"op": "write", "offset": offset, "data": f"{value:02x}"})
 
     def update_preview(self) -> None:
         """
-        Update the image preview display.
-        Attempts to render the glitched data as an image.
-        Shows warning message if file is too corrupted to display.
+        Request a re-render of the image preview.
+        Decoding happens on the preview worker thread; the newest request
+        wins and the result is picked up by poll_preview.
         """
         if not self.glitched_data:
             return
 
-        try:
-            # Try to create image from bytes
-            image_stream = io.BytesIO(self.glitched_data)
-            pil_image = Image.open(image_stream)
-
-            # Resize for display
-            pil_image.thumbnail(self.PREVIEW_SIZE, Image.Resampling.LANCZOS)
-
-            self.tk_image = ImageTk.PhotoImage(pil_image)
-            self.preview_label.config(text="", image=self.tk_image)
-            logging.debug("Preview updated successfully")
+        quality = "high" if self.hq_preview.get() else "fast"
+        self.preview_worker.submit(self.glitched_data, quality)
 
-        except Exception as e:
-            # If glitch broke the file format completely
-            logging.warning(f"Preview failed: {e}")
-            self.preview_label.config(
-                image="",
-                text="FILE BROKEN\n(Try increasing Header Protection or less intensity)"
-            )
+    def poll_preview(self) -> None:
+        """
+        Display the latest finished preview render, if any.
+        Shows warning message if file is too corrupted to display.
+        Reschedules itself on the Tk event loop.
+        """
+        self.poll_live()
+        self.poll_retry()
+        result = self.preview_worker.poll()
+        if result is not None:
+            if result.image is not None:
+                with stage_timer.time("PhotoImage"):
+                    self.tk_image = ImageTk.PhotoImage(result.image)
+                self.preview_label.config(text="", image=self.tk_image)
+                logging.debug("Preview updated successfully")
+            else:
+                # If glitch broke the file format completely
+                self.preview_label.config(
+                    image="",
+                    text=f"FILE BROKEN\n{result.error}\n(Try increasing Header Protection or less intensity)"
+                )
+
+        self.root.after(self.PREVIEW_POLL_MS, self.poll_preview)
+
+    def on_close(self) -> None:
+        """Stop background workers and close the main window."""
+        self.preview_worker.stop()
+        self.live_runner.stop()
+        self.retry_runner.stop()
+        if self.exploration is not None:
+            self.exploration.cancel()
+        self.root.destroy()
 
     def refresh_ui(self) -> None:
         """Refresh both preview and hex display. Call after any data modification."""
         self.update_preview()
         self.update_hex_view()
+        self.update_structure_status()
+
+    def commit_result(self, label: str, new_data: CowBuffer, op: Optional[dict] = None,
+                      step: Optional[Step] = None) -> None:
+        """
+        Make new_data the current state and record the change as a history step.
+
+        Args:
+            label: Human-readable name of the operation
+            new_data: Buffer produced by the operation
+            op: Optional machine-readable description of the operation
+            step: Prebuilt history step; diffed from the buffers if omitted
+        """
+        if step is not None:
+            self.history.push_step(step)
+        else:
+            self.history.push(label, self.glitched_data, new_data, op)
+        self.glitched_data = new_data
+        self.update_history_status()
+        self.refresh_ui()
+
+    def update_history_status(self) -> None:
+        """Show the number of undo/redo steps and their memory use."""
+        self.history_status.config(
+            text=f"{self.history.undo_count} undo / {self.history.redo_count} redo "
+                 f"({self.history.nbytes / 1024:.1f} KB)"
+        )
+
+    def undo(self) -> None:
+        """Revert the most recent operation."""
+        if not self.glitched_data:
+            return
+        previous = self.history.undo(self.glitched_data)
+        if previous is None:
+            return
+        self.glitched_data = previous
+        self.update_history_status()
+        self.refresh_ui()
+
+    def redo(self) -> None:
+        """Reapply the most recently undone operation."""
+        if not self.glitched_data:
+            return
+        following = self.history.redo(self.glitched_data)
+        if following is None:
+            return
+        self.glitched_data = following
+        self.update_history_status()
+        self.refresh_ui()
+
+    def reset_to_original(self) -> None:
+        """Discard all stacked glitches as a single undoable step."""
+        if not self.original_data or self.glitched_data is None:
+            return
+        self.commit_result("Reset", self.original_data.copy(), {"op": "reset"})
+
+    def export_recipe(self) -> None:
+        """
+        Save the operations from the original file to the current result,
+        with their seeds, as a JSON recipe that reproduces it.
+
+        Validates:
+            - An image is loaded and at least one step was made
+            - Every step in the history is reproducible
+        """
+        if not self.original_data:
+            messagebox.showinfo("Info", "Please load an image first")
+            return
+
+        try:
+            steps = self.history.ops()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if not steps:
+            messagebox.showinfo("Info", "No operations to export yet")
+            return
+
+        name = os.path.splitext(os.path.basename(self.file_path))[0]
+        path = filedialog.asksaveasfilename(defaultextension=".json", initialfile=f"{name}.recipe.json",
+                                            filetypes=[("Recipe", "*.json")])
+        if not path:
+            return
+        try:
+            recipe.save_recipe(path, recipe.Recipe(steps, os.path.basename(self.file_path)))
+        except OSError as e:
+            logging.error(f"Failed to save recipe: {e}")
+            messagebox.showerror("Error", f"Failed to save recipe: {e}")
+            return
+        messagebox.showinfo("Success", f"Recipe with {len(steps)} steps saved to:\n{path}")
+
+    def apply_recipe(self) -> None:
+        """
+        Apply every step of a recipe file on top of the current image. Each
+        step becomes its own history entry, so the result can be undone step
+        by step. Applied to the unmodified file the recipe was exported
+        from, it reproduces that result exactly.
+
+        Validates:
+            - An image is loaded
+            - The file is a valid recipe of known operations
+        """
+        if not self.original_data:
+            messagebox.showinfo("Info", "Please load an image first")
+            return
+
+        path = filedialog.askopenfilename(filetypes=[("Recipe", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            loaded = recipe.load_recipe(path)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to load recipe: {e}")
+            messagebox.showerror("Error", f"Failed to load recipe: {e}")
+            return
 
-    def get_safe_data(self) -> Tuple[bytearray, bytearray]:
+        applied = 0
+        for op in loaded.steps:
+            try:
+                # Timed and profiled per step, like apply_op
+                with stage_timer.time("glitch op"):
+                    new_data = self.profile_capture.run(f"Recipe: {op.get('op')}", recipe.apply_step,
+                                                        self.glitched_data, op, self.original_data,
+                                                        self.region_tracker)
+            except (KeyError, TypeError, ValueError) as e:
+                logging.error(f"Recipe step {applied + 1} failed: {e}")
+                messagebox.showerror("Error", f"Recipe step {applied + 1} ({op.get('op')}) failed: {e}")
+                break
+            self.history.push(f"Recipe: {op['op']}", self.glitched_data, new_data, op)
+            self.glitched_data = new_data
+            applied += 1
+
+        logging.info(f"Applied {applied} of {len(loaded.steps)} recipe steps from {path}")
+        self.update_history_status()
+        self.refresh_ui()
+
+    def get_header_size(self) -> int:
         """
-        Separate the file data into protected header and modifiable body.
+        Read and validate the protected header size from the UI.
 
         Returns:
-            Tuple of (header, body) as bytearrays
+            The number of leading bytes to protect
 
         Validates:
             - header_size is non-negative integer
-            - header_size doesn't exceed data length
         """
         try:
             safe_zone = self.header_size.get()
@@ -325,75 +975,186 @@ class GlitchApp:
             safe_zone = self.DEFAULT_HEADER_SIZE
             self.header_size.set(self.DEFAULT_HEADER_SIZE)
 
-        if safe_zone > len(self.original_data):
-            logging.warning(f"Header size {safe_zone} exceeds file size {len(self.original_data)}")
-            safe_zone = len(self.original_data)
+        return safe_zone
 
-        header = self.original_data[:safe_zone]
-        body = self.original_data[safe_zone:]
-        return header, body
+    def current_regions(self) -> Optional[RegionMap]:
+        """
+        Index the structure of the current data, reusing the last index
+        until an edit changes the length or a protected byte.
 
-    def apply_find_replace(self) -> None:
+        Returns:
+            The RegionMap, or None if the format is not recognised
         """
-        Apply find & replace operation on hex byte sequences.
-        Only modifies the body (non-protected) portion of the file.
+        return self.region_tracker.regions(self.glitched_data)
 
-        Validates:
-            - Both find and replace values are provided
-            - Values are valid hexadecimal
-            - Values have even number of characters (complete bytes)
+    def get_protection(self) -> Tuple[int, Optional[List[Region]]]:
         """
-        if not self.original_data:
-            messagebox.showinfo("Info", "Please load an image first")
-            return
+        Decide which bytes operations may modify.
+
+        Returns:
+            Tuple of (header_size, target regions or None). With structure
+            detection on and a recognised format, the regions replace the
+            fixed header; otherwise the header size from the UI applies.
+        """
+        return self.region_tracker.protection(self.glitched_data, self.get_header_size(),
+                                              self.protect_structure.get())
 
-        find_str = self.find_hex.get().strip()
-        replace_str = self.replace_hex.get().strip()
+    def apply_op(self, label: str, op: dict) -> None:
+        """
+        Run a recipe op on the current data and record it in the history.
 
-        # Validate hex strings are provided
-        if not find_str or not replace_str:
-            messagebox.showerror("Error", "Both Find and Replace values are required")
+        Args:
+            label: Human-readable name of the operation
+            op: The operation description, including its seed
+        """
+        try:
+            with stage_timer.time("glitch op"):
+                new_data = self.profile_capture.run(label, recipe.apply_step, self.glitched_data, op,
+                                                    self.original_data, self.region_tracker)
+        except ValueError as e:
+            logging.error(f"{label} failed: {e}")
+            messagebox.showerror("Error", str(e))
             return
+        self.commit_result(label, new_data, op)
 
-        # Remove spaces and validate hex characters
-        find_str = find_str.replace(" ", "")
-        replace_str = replace_str.replace(" ", "")
+    def png_pixel_mode(self) -> bool:
+        """True if random corruption re-encodes the PNG pixel stream instead of editing raw bytes."""
+        return bool(self.glitched_data) and self.png_pixels.get() and \
+            detect_format(self.glitched_data[:12]) == "PNG"
 
-        if not all(c in '0123456789ABCDEFabcdef' for c in find_str):
-            messagebox.showerror("Error", "Find value contains invalid hex characters")
-            return
+    def update_structure_status(self) -> None:
+        """
+        Describe the active protection below the header controls.
 
-        if not all(c in '0123456789ABCDEFabcdef' for c in replace_str):
-            messagebox.showerror("Error", "Replace value contains invalid hex characters")
+        The controls stay editable in PNG pixel mode, because find & replace
+        still uses them; random corruption re-encodes every chunk intact
+        instead, which the status points out.
+        """
+        if not self.glitched_data:
+            self.structure_status.config(text="")
             return
+        if not self.protect_structure.get():
+            text = "Using fixed header size"
+        else:
+            regions = self.current_regions()
+            if regions is None:
+                text = "Unknown structure: using fixed header size"
+            else:
+                percent = 100 * regions.target_bytes / len(self.glitched_data)
+                text = f"{regions.format}: {len(regions.targets)} data regions ({percent:.0f}% of file)"
+        if self.png_pixel_mode():
+            text += "\nGlitch It! re-encodes PNG pixels instead"
+        self.structure_status.config(text=text)
+
+    def get_replace_limits(self) -> Tuple[float, Optional[int], Optional[Tuple[int, int]]]:
+        """
+        Read and validate the find & replace selection limits from the UI.
+
+        Returns:
+            Tuple of (probability, max_count or None, (start, end) window or None)
+
+        Raises:
+            ValueError: If any limit is malformed or out of range
+        """
+        try:
+            percent = self.replace_percent.get()
+        except tk.TclError:
+            raise ValueError("Replace % must be a number")
+        if not 0 < percent <= 100:
+            raise ValueError("Replace % must be greater than 0 and at most 100")
 
-        if len(find_str) % 2 != 0 or len(replace_str) % 2 != 0:
-            messagebox.showerror("Error", "Hex values must have even number of characters (complete bytes)")
+        max_count = engine.parse_offset(self.max_matches.get(), "Max matches")
+
+        start = engine.parse_offset(self.range_start.get(), "Range start")
+        end = engine.parse_offset(self.range_end.get(), "Range end")
+        window = None
+        if start is not None or end is not None:
+            window = (start or 0, end if end is not None else len(self.glitched_data))
+            if window[1] < window[0]:
+                raise ValueError("Range end must not be before range start")
+        return percent / 100, max_count, window
+
+    def apply_find_replace(self) -> None:
+        """
+        Apply find & replace operation on hex, wildcard or regex patterns.
+        Stacks on top of the current glitched data and only modifies the
+        body (non-protected) portion of the file. The body is scanned once
+        and the reported count is the exact number of replacements.
+
+        Replace % and Max limit how many matches are rewritten, and the
+        offset range limits where they are searched for. Selected matches
+        that are as long as the replacement are patched in place.
+
+        Validates:
+            - Both find and replace values are provided
+            - Find is valid in the selected syntax and cannot match nothing
+            - Replace is valid hexadecimal with complete bytes
+            - Replace %, Max and the offset range are valid
+        """
+        if not self.original_data:
+            messagebox.showinfo("Info", "Please load an image first")
             return
 
+        kind = self.pattern_kind.get()
+        find_text = self.find_hex.get().strip()
+
+        def run(op: dict, replace_val: bytes) -> Tuple[List[int], CowBuffer]:
+            starts, ends, _ = recipe.find_replace_spans(self.glitched_data, op, self.region_tracker)
+            return starts, engine.replace_spans(self.glitched_data, starts, ends, replace_val)
+
         try:
-            find_val = bytes.fromhex(find_str)
-            replace_val = bytes.fromhex(replace_str)
+            replace_val = engine.parse_hex(self.replace_hex.get(), "Replace")
+            probability, max_count, window = self.get_replace_limits()
+            op = {"op": "find_replace", "find": find_text, "pattern": kind, "replace": replace_val.hex(),
+                  "header_size": self.get_header_size(), "protect_structure": self.protect_structure.get(),
+                  "probability": probability, "max_count": max_count, "window": window,
+                  "seed": engine.new_seed()}
+            label = f"Find/Replace {find_text}->{replace_val.hex()}"
+            # Timed and profiled like apply_op; the spans are kept for the undo record
+            with stage_timer.time("glitch op"):
+                starts, new_data = self.profile_capture.run(label, run, op, replace_val)
         except ValueError as e:
-            logging.error(f"Hex conversion error: {e}")
-            messagebox.showerror("Error", f"Invalid Hex: {e}")
+            logging.error(f"Find/Replace input error: {e}")
+            messagebox.showerror("Error", str(e))
             return
+        logging.info(f"Find/Replace: {find_text} ({kind})->{replace_val.hex()}, {len(starts)} replacements")
 
-        header, body = self.get_safe_data()
+        step = None
+        if kind == "hex":
+            # Every hex match is the same bytes, so match offsets plus both
+            # patterns are a far smaller undo record than a byte diff
+            find_val = engine.parse_hex(find_text, "Find")
+            step = ReplaceStep(label, starts, find_val, replace_val, op)
+        self.commit_result(label, new_data, op, step)
 
-        # Perform replace only on body
-        new_body = body.replace(find_val, replace_val)
+    def get_intensity(self) -> Optional[int]:
+        """
+        Read and validate the random corruption intensity from the UI.
 
-        replacements = (len(body) - len(new_body.replace(replace_val, find_val))) // len(find_val)
-        logging.info(f"Find/Replace: {find_str}->{replace_str}, {replacements} replacements")
+        Returns:
+            The intensity, or None after reporting an invalid value
 
-        self.glitched_data = header + new_body
-        self.refresh_ui()
+        Validates:
+            - intensity is positive integer
+        """
+        try:
+            intensity = self.intensity.get()
+        except tk.TclError:
+            logging.error("Invalid intensity: not an integer")
+            messagebox.showerror("Error", "Intensity must be a valid integer")
+            return None
+
+        if intensity <= 0:
+            messagebox.showerror("Error", "Intensity must be greater than 0")
+            return None
+        return intensity
 
     def apply_random_glitch(self) -> None:
         """
         Apply random byte corruption to the file body.
-        Uses optimized algorithm that pre-calculates indices to modify.
+        Stacks on top of the current glitched data; uses optimized
+        algorithm that pre-calculates indices to modify. With retrying on,
+        new seeds are tried until the result decodes.
 
         Validates:
             - intensity is positive integer
@@ -403,46 +1164,313 @@ class GlitchApp:
             messagebox.showinfo("Info", "Please load an image first")
             return
 
+        intensity = self.get_intensity()
+        if intensity is None:
+            return
+
+        label, op = self.random_op(intensity, self.get_header_size())
+        if self.retry_decodable.get():
+            self.apply_until_decodable(label, op)
+        else:
+            self.apply_op(label, dict(op, seed=engine.new_seed()))
+
+    def apply_pixel_effect(self) -> None:
+        """
+        Decode the current result, apply the selected pixel effect and re-encode it.
+
+        Validates:
+            - effect parameters are integers
+            - the current data decodes (reported by the engine)
+        """
+        if not self.original_data:
+            messagebox.showinfo("Info", "Please load an image first")
+            return
+
+        effect = self.pixel_effect.get()
         try:
-            intensity = self.intensity.get()
+            if effect == "sort":
+                op = {"op": "pixel", "effect": "sort", "low": self.sort_low.get(), "high": self.sort_high.get(),
+                      "vertical": self.sort_vertical.get()}
+            elif effect == "channel_shift":
+                shift = self.pixel_shift.get()
+                offsets = [[shift, 0], [0, 0], [-shift, 0]]
+                if self.sort_vertical.get():
+                    offsets = [[0, shift], [0, 0], [0, -shift]]
+                op = {"op": "pixel", "effect": "channel_shift", "offsets": offsets}
+            else:
+                op = {"op": "pixel", "effect": "slices", "count": self.slice_count.get(),
+                      "max_shift": self.pixel_shift.get(), "seed": engine.new_seed()}
         except tk.TclError:
-            logging.error("Invalid intensity: not an integer")
-            messagebox.showerror("Error", "Intensity must be a valid integer")
+            logging.error("Invalid pixel effect parameters: not an integer")
+            messagebox.showerror("Error", "Pixel effect parameters must be valid integers")
             return
 
-        if intensity <= 0:
-            messagebox.showerror("Error", "Intensity must be greater than 0")
-            return
+        self.apply_op(f"Pixel {effect.replace('_', ' ')}", op)
+
+    def random_op(self, intensity: int, header_size: int) -> Tuple[str, dict]:
+        """
+        Describe a random corruption with the current settings, without its seed.
 
-        header, body = self.get_safe_data()
-        body = bytearray(body)  # Make mutable
+        Args:
+            intensity: Corruption intensity (1/x bytes)
+            header_size: Protected header size; unused in PNG pixel mode
 
+        Returns:
+            Tuple of (history label, op)
+        """
         mode = self.glitch_mode.get()
+        backend = engine.resolve_backend("auto")
+        if self.png_pixel_mode():
+            # Glitch the decompressed scanlines and re-encode them, so chunk
+            # CRCs and the zlib stream stay valid; header protection does not
+            # apply, see update_structure_status
+            return f"PNG {mode} 1/{intensity}", {"op": "png", "intensity": intensity, "mode": mode,
+                                                 "level": int(self.png_level.get()), "backend": backend}
+        return f"Random {mode} 1/{intensity}", {"op": "random", "intensity": intensity, "mode": mode,
+                                                "header_size": header_size,
+                                                "protect_structure": self.protect_structure.get(),
+                                                "backend": backend}
+
+    def on_intensity_slider(self, value: str) -> None:
+        """Copy the intensity slider into the intensity field and schedule a live run."""
+        self.intensity.set(max(1, round(10 ** float(value))))
+        self.schedule_live()
+
+    def on_header_slider(self, value: str) -> None:
+        """Copy the protected bytes slider into the header field and schedule a live run."""
+        self.header_size.set(round(float(value)))
+        self.schedule_live()
+
+    def schedule_live(self) -> None:
+        """
+        Throttle slider events: the first change in a frame schedules one
+        live run at the end of the frame, later changes in it are folded in.
+        """
+        if not self.live_enabled.get() or not self.glitched_data or self.live_timer is not None:
+            return
+        self.live_timer = self.root.after(self.LIVE_FRAME_MS, self.run_live)
+
+    def run_live(self) -> None:
+        """
+        Re-run random corruption with the current slider values on the
+        live runner. A drag keeps its base buffer and seed, so only the
+        parameters change between runs and the result moves smoothly.
+        """
+        self.live_timer = None
+        if not self.glitched_data:
+            return
+        try:
+            intensity, header_size = self.intensity.get(), self.header_size.get()
+        except tk.TclError:
+            return  # A half-typed field; the next valid change re-runs
+        if intensity <= 0 or header_size < 0:
+            return
 
-        # Optimized: Pre-calculate indices to glitch instead of iterating all bytes
-        if len(body) > 0:
-            num_bytes_to_glitch = max(1, len(body) // intensity)
-            # Ensure we don't try to sample more indices than available
-            num_bytes_to_glitch = min(num_bytes_to_glitch, len(body))
-            indices = random.sample(range(len(body)), num_bytes_to_glitch)
-
-            logging.info(f"Glitching {num_bytes_to_glitch} bytes with mode: {mode}")
-
-            for i in indices:
-                if mode == "Random":
-                    body[i] = random.randint(0, 255)
-                elif mode == "Increment":
-                    body[i] = (body[i] + 1) % 256
-                elif mode == "Decrement":
-                    body[i] = (body[i] - 1) % 256
-                elif mode == "Zero":
-                    body[i] = 0
-                elif mode == "Bitwise XOR":
-                    body[i] = body[i] ^ 0xFF
-
-        self.glitched_data = header + body
+        if not self.live_session_current():
+            # Something else changed the data: start a new live step on top of it
+            self.live_base = self.glitched_data
+            self.live_seed = engine.new_seed()
+            self.live_step = None
+            # Continue from the main map, as a replayed recipe would
+            self.live_tracker = self.region_tracker.copy()
+        label, op = self.random_op(intensity, header_size)
+        op["seed"] = self.live_seed
+        base, original, tracker = self.live_base, self.original_data, self.live_tracker
+        generation = self.live_runner.submit(lambda: recipe.apply_step(base, op, original, tracker))
+        self.live_pending = (generation, label, op, base)
+
+    def poll_live(self) -> None:
+        """Commit the newest finished live run, replacing the live history step."""
+        result = self.live_runner.poll()
+        if result is None or self.live_pending is None or result.generation != self.live_pending[0]:
+            return
+        _, label, op, base = self.live_pending
+        self.live_pending = None
+        stage_timer.record("live run", int(result.seconds * 1e9))
+        if result.error is not None:
+            self.live_status.config(text=f"Live: {result.error}")
+            return
+        if base is not self.live_base or not self.live_session_current():
+            return  # Another operation, undo or load happened while this run was in flight
+
+        if self.live_step is not None:
+            self.live_step = self.history.replace_last(f"{label} (live)", base, result.value, op)
+        else:
+            self.live_step = self.history.push(f"{label} (live)", base, result.value, op)
+        self.glitched_data = result.value
+        self.live_status.config(text=f"Live: {result.seconds * 1000:.0f} ms per run, "
+                                     f"{self.live_runner.coalesced} coalesced")
+        self.update_history_status()
         self.refresh_ui()
 
+    def live_session_current(self) -> bool:
+        """True while the data is still what the live session last produced (or started from)."""
+        if self.live_base is None:
+            return False
+        if self.live_step is None:
+            return self.glitched_data is self.live_base
+        return self.history.last is self.live_step
+
+    def end_live_session(self) -> None:
+        """Drop any queued live run; the next slider change starts a new step."""
+        if self.live_timer is not None:
+            self.root.after_cancel(self.live_timer)
+            self.live_timer = None
+        self.live_runner.cancel()
+        self.live_pending = None
+        self.live_base = None
+        self.live_step = None
+
+    def apply_until_decodable(self, label: str, op: dict) -> None:
+        """
+        Try an op with new seeds until the result decodes, then record the
+        attempt that worked. Gives up after RETRY_BUDGET seconds. The
+        attempts run in the background so the window stays responsive; the
+        result is dropped if the data changes before it arrives.
+
+        Args:
+            label: Human-readable name of the operation
+            op: The operation description, without a seed
+        """
+        # The attempts run on the retry runner; poll_retry commits the result.
+        # The job gets its own copy of the tracker: RegionTracker is not thread-safe.
+        base, original, tracker = self.glitched_data, self.original_data, self.region_tracker.copy()
+
+        def attempt(seed: int) -> CowBuffer:
+            return recipe.apply_step(base, dict(op, seed=seed), original, tracker)
+
+        seed = engine.new_seed()
+        generation = self.retry_runner.submit(lambda: retry_until_decodable(attempt, seed, RETRY_BUDGET))
+        self.retry_pending = (generation, label, op, base)
+        self.root.config(cursor="watch")
+
+    def poll_retry(self) -> None:
+        """Commit the result of a finished retry-until-decodable run."""
+        result = self.retry_runner.poll()
+        if result is None or self.retry_pending is None or result.generation != self.retry_pending[0]:
+            return
+        _, label, op, base = self.retry_pending
+        self.retry_pending = None
+        self.root.config(cursor="")
+        if result.error is not None:
+            logging.error(f"{label} failed: {result.error}")
+            messagebox.showerror("Error", result.error)
+            return
+        if self.glitched_data is not base:
+            logging.info(f"{label}: data changed while retrying, result dropped")
+            return
+        retry = result.value
+        if retry.data is None:
+            messagebox.showinfo("Info", f"No decodable result in {retry.attempts} attempts.\n"
+                                        "Try less intensity or more header protection.")
+            return
+        self.commit_result(f"{label} (attempt {retry.attempts})", retry.data, dict(op, seed=retry.seed))
+
+    def cancel_retry(self) -> None:
+        """Drop a retry run in progress, e.g. when another file is loaded."""
+        if self.retry_pending is not None:
+            self.retry_runner.cancel()
+            self.retry_pending = None
+            self.root.config(cursor="")
+
+    def variant_params(self, intensity: int, mode: str) -> dict:
+        """Collect the current random corruption settings as a variant op, without its seed."""
+        return {"op": "variant", "intensity": intensity, "mode": mode, "header_size": self.get_header_size(),
+                "protect_structure": self.protect_structure.get(), "png_pixels": self.png_pixels.get(),
+                "png_level": int(self.png_level.get()), "backend": engine.resolve_backend("auto")}
+
+    def open_explorer(self) -> None:
+        """
+        Render a contact sheet of seeded variants of the current image on a
+        process pool, without blocking the UI. Clicking a variant applies it.
+        """
+        if not self.original_data:
+            messagebox.showinfo("Info", "Please load an image first")
+            return
+
+        intensity = self.get_intensity()
+        if intensity is None:
+            return
+
+        params = self.variant_params(intensity, self.glitch_mode.get())
+        header_size, regions = self.get_protection()
+        seeds = [engine.new_seed() for _ in range(self.EXPLORE_VARIANTS)]
+        if self.exploration is not None:
+            self.exploration.cancel()
+        self.exploration = Exploration(variant_source(self.glitched_data, self.file_path),
+                                       dict(params, header_size=header_size, regions=regions),
+                                       seeds, self.EXPLORE_THUMB_SIZE)
+        self.explore_base = self.glitched_data
+        self.explore_params = params
+
+        if self.explorer is None:
+            self.explorer = tk.Toplevel(self.root)
+            self.explorer.title("Explore Variants")
+            self.explorer.configure(bg="#2b2b2b")
+            self.explorer.protocol("WM_DELETE_WINDOW", self.close_explorer)
+            self.explore_tiles = []
+            ttk.Button(self.explorer, text="Re-roll", command=self.open_explorer).grid(
+                row=0, column=0, columnspan=self.EXPLORE_COLUMNS, sticky="ew", padx=5, pady=5)
+            for i in range(self.EXPLORE_VARIANTS):
+                tile = ttk.Button(self.explorer, compound=tk.TOP, command=lambda i=i: self.promote_variant(i))
+                tile.grid(row=1 + i // self.EXPLORE_COLUMNS, column=i % self.EXPLORE_COLUMNS, padx=3, pady=3)
+                self.explore_tiles.append(tile)
+
+        self.explore_images = [None] * self.EXPLORE_VARIANTS
+        for tile, seed in zip(self.explore_tiles, seeds):
+            tile.config(text=f"seed {seed}\nrendering...", image="", state=tk.DISABLED)
+        self.root.after(self.EXPLORE_POLL_MS, self.poll_explorer, self.exploration)
+
+    def poll_explorer(self, exploration: Exploration) -> None:
+        """
+        Show finished variants on the contact sheet; reschedules itself until all are in.
+
+        Args:
+            exploration: The exploration this poll chain belongs to; a re-roll
+                starts a new chain and ends the old one
+        """
+        if exploration is not self.exploration or self.explorer is None:
+            return
+
+        for index, result in exploration.poll():
+            tile = self.explore_tiles[index]
+            if result.image is None:
+                tile.config(text=f"seed {result.seed}\nFILE BROKEN")
+                continue
+            self.explore_images[index] = ImageTk.PhotoImage(result.image)
+            tile.config(text=f"seed {result.seed}", image=self.explore_images[index], state=tk.NORMAL)
+
+        if not exploration.done:
+            self.root.after(self.EXPLORE_POLL_MS, self.poll_explorer, exploration)
+
+    def promote_variant(self, index: int) -> None:
+        """
+        Apply the chosen variant to the current image, reproducing it from its seed.
+
+        Args:
+            index: Position of the variant on the contact sheet
+        """
+        if self.glitched_data is not self.explore_base:
+            messagebox.showinfo("Info", "The image changed since these variants were rendered; press Re-roll")
+            return
+
+        seed = self.exploration.seeds[index]
+        op = dict(self.explore_params, seed=seed)
+        self.close_explorer()
+        self.apply_op(f"Variant {op['mode']} 1/{op['intensity']} seed {seed}", op)
+
+    def close_explorer(self) -> None:
+        """Cancel any running exploration and close the contact sheet."""
+        if self.exploration is not None:
+            self.exploration.cancel()
+            self.exploration = None
+        if self.explorer is not None:
+            self.explorer.destroy()
+            self.explorer = None
+        self.explore_base = None
+        self.explore_tiles = []
+        self.explore_images = []
+
     def save_image(self) -> None:
         """
         Save the glitched image data to a file.
@@ -468,20 +1496,15 @@ class GlitchApp:
         if not file_path:
             return
 
-        # Validate the save path is not a system directory
-        abs_path = os.path.abspath(file_path)
-
-        if any(abs_path.startswith(d) for d in self.SYSTEM_DIRS):
-            logging.error(f"Attempted save to system directory: {abs_path}")
-            messagebox.showerror("Error", "Cannot save to system directories")
-            return
-
         try:
-            with open(file_path, "wb") as f:
-                f.write(self.glitched_data)
+            with stage_timer.time("save"):
+                engine.save_bytes(file_path, self.glitched_data)
             logging.info(f"Saved glitched image to: {file_path}")
             messagebox.showinfo("Success", f"Glitched image saved to:\n{os.path.basename(file_path)}")
 
+        except ValueError as e:
+            logging.error(f"Attempted save to system directory: {os.path.abspath(file_path)}")
+            messagebox.showerror("Error", str(e))
         except PermissionError:
             logging.error(f"Permission denied: {file_path}")
             messagebox.showerror("Error", "Permission denied writing to this location")
@@ -493,6 +1516,13 @@ class GlitchApp:
             messagebox.showerror("Error", f"Failed to save: {e}")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    # Any command-line arguments switch to the headless batch interface
+    if len(sys.argv) > 1:
+        from hexglitcher.cli import main as cli_main
+        sys.exit(cli_main())
+
     root = tk.Tk()
     app = GlitchApp(root)
     root.mainloop()
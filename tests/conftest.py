@@ -0,0 +1,37 @@
+"""Shared fixtures: small synthetic images in each supported format."""
+
+import io
+
+import pytest
+from PIL import Image
+
+from hexglitcher.buffer import CowBuffer
+
+
+def encode(fmt: str, size=(96, 64), **options) -> bytes:
+    """Encode a noisy gradient image, so compressed data is neither empty nor trivial."""
+    image = Image.merge("RGB", (
+        Image.linear_gradient("L").resize(size),
+        Image.effect_noise(size, 40),
+        Image.linear_gradient("L").rotate(90).resize(size),
+    ))
+    if fmt == "GIF":
+        image = image.quantize(64)
+    out = io.BytesIO()
+    image.save(out, fmt, **options)
+    return out.getvalue()
+
+
+@pytest.fixture
+def png_bytes() -> bytes:
+    return encode("PNG")
+
+
+@pytest.fixture
+def jpeg_bytes() -> bytes:
+    return encode("JPEG", quality=90)
+
+
+@pytest.fixture
+def png_buffer(png_bytes) -> CowBuffer:
+    return CowBuffer(png_bytes)
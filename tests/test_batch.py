@@ -0,0 +1,29 @@
+"""Batch output names and seeds."""
+
+import os
+
+import pytest
+
+from hexglitcher.batch import derive_seed, output_path, relative_names, run_batch
+
+
+def test_same_named_inputs_get_distinct_outputs_and_seeds(tmp_path):
+    files = [str(tmp_path / "in" / "a" / "x.jpg"), str(tmp_path / "in" / "b" / "x.jpg")]
+    names = relative_names(files)
+    assert names == [os.path.join("a", "x.jpg"), os.path.join("b", "x.jpg")]
+    outputs = {output_path(path, "out", 0, 1, name) for path, name in zip(files, names)}
+    assert len(outputs) == 2
+    assert derive_seed(1, "a/x.jpg", 0) != derive_seed(1, "b/x.jpg", 0)
+
+
+def test_single_directory_keeps_base_names(tmp_path):
+    files = [str(tmp_path / "x.jpg"), str(tmp_path / "y.png")]
+    assert relative_names(files) == ["x.jpg", "y.png"]
+    assert output_path(files[0], "out", 2, 3, "x.jpg") == os.path.join("out", "x_glitched_002.jpg")
+
+
+def test_duplicate_inputs_are_rejected_before_running(tmp_path, png_bytes):
+    source = tmp_path / "x.png"
+    source.write_bytes(png_bytes)
+    with pytest.raises(ValueError, match="both be written"):
+        next(run_batch([str(source), str(source)], str(tmp_path / "out"), {"header_size": 0}))
@@ -0,0 +1,61 @@
+"""The benchmark suite measures every op and its reports round-trip and compare."""
+
+import copy
+import json
+
+import pytest
+
+from hexglitcher import bench, engine
+from hexglitcher.bench import bench_suite, compare_reports, format_comparison, format_suite, load_report, peak_memory
+
+
+@pytest.fixture(scope="module")
+def report():
+    return bench_suite(formats=("JPEG", "PNG"), megapixels=(0.01,), intensities=(10,), repeat=1)
+
+
+def test_suite_measures_every_op(report):
+    rows = report["results"]
+    assert all("error" not in row and row["seconds"] >= 0 and row["peak_bytes"] >= 0 for row in rows)
+    ops = {"random_glitch", "decode_check", "find_replace", "preview_fast", "preview_high", "save"}
+    if engine.np is not None:
+        ops.add("pixel_sort")
+    for fmt in ("JPEG", "PNG"):
+        assert {row["op"] for row in rows if row["format"] == fmt} == ops
+    assert "JPEG" in format_suite(report)
+
+
+def test_failed_measurements_are_reported(monkeypatch):
+    def broken(data, intensities):
+        return [("broken", None, lambda: 1 / 0)]
+    monkeypatch.setattr(bench, "_suite_ops", broken)
+    [row] = bench_suite(formats=("BMP",), megapixels=(0.01,), repeat=1)["results"]
+    assert row["op"] == "broken" and "division" in row["error"]
+    assert "failed" in format_suite({"results": [row]})
+
+
+def test_peak_memory_sees_allocations():
+    assert peak_memory(lambda: bytearray(4 * 1024 * 1024)) >= 4 * 1024 * 1024
+
+
+def test_reports_round_trip_and_compare(report, tmp_path):
+    path = str(tmp_path / "report.json")
+    bench.save_report(path, report)
+    assert load_report(path) == json.loads(json.dumps(report))
+
+    slower = copy.deepcopy(report)
+    for row in slower["results"]:
+        row["seconds"] = row["seconds"] * 2 + 0.001
+    slower["results"].append(dict(slower["results"][0], op="new op"))
+    rows = compare_reports(report, slower)
+    assert len(rows) == len(report["results"])
+    assert all(row["current"] > row["baseline"] and row["ratio"] > 1 for row in rows)
+    assert "x" in format_comparison(rows)
+
+
+@pytest.mark.parametrize("contents", ["not json", json.dumps({"format": "something else"}), "[]"])
+def test_other_files_are_not_reports(tmp_path, contents):
+    path = tmp_path / "report.json"
+    path.write_text(contents)
+    with pytest.raises(ValueError):
+        load_report(str(path))
@@ -0,0 +1,63 @@
+"""ImageCache hits, evicts within its byte budget, and content keys follow contents."""
+
+from PIL import Image
+
+from hexglitcher.buffer import CowBuffer
+from hexglitcher.cache import ImageCache, content_key, image_nbytes
+
+
+def tile(width: int = 10, height: int = 10) -> Image.Image:
+    return Image.new("RGB", (width, height))
+
+
+def test_hits_and_misses_are_counted():
+    cache = ImageCache(budget=10_000)
+    image = tile()
+    assert cache.get("a") is None
+    cache.put("a", image)
+    assert cache.get("a") is image
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries, stats.nbytes) == (1, 1, 1, image_nbytes(image))
+    assert stats.hit_rate == 0.5
+
+
+def test_least_recently_used_is_evicted_first():
+    # Room for exactly three 300-byte images
+    cache = ImageCache(budget=900)
+    for key in "abc":
+        cache.put(key, tile())
+    cache.get("a")
+    cache.put("d", tile())
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.stats().evictions == 1
+
+
+def test_budget_limits_bytes_not_entries():
+    cache = ImageCache(budget=900)
+    cache.put("big", tile(20, 10))
+    cache.put("small", tile(5, 10))
+    cache.put("too big", tile(40, 10))
+    assert len(cache) == 2 and cache.get("too big") is None
+
+    cache.resize(600)
+    assert cache.get("big") is None and cache.get("small") is not None
+    cache.put("small", tile(1, 1))
+    assert cache.stats().nbytes == 3
+
+
+def test_zero_budget_disables_caching():
+    cache = ImageCache(budget=0)
+    cache.put("a", tile())
+    assert cache.get("a") is None and len(cache) == 0
+
+
+def test_content_key_follows_the_patches(png_bytes):
+    buf = CowBuffer(png_bytes)
+    edited = buf.copy()
+    edited.write(100, b"\x00\x01")
+    again = buf.copy()
+    again.write(100, b"\x00\x01")
+    assert content_key(buf) != content_key(edited) == content_key(again)
+    assert content_key(png_bytes) == content_key(bytes(png_bytes))
+    assert content_key(edited) != content_key(edited.tobytes())
@@ -0,0 +1,66 @@
+"""Region maps and how RegionTracker keeps them across edits."""
+
+import pytest
+
+from hexglitcher import engine
+from hexglitcher.buffer import CowBuffer
+from hexglitcher.formats import RegionTracker, detect_format, index_regions
+
+from .conftest import encode
+
+
+@pytest.mark.parametrize("fmt, options", [
+    ("JPEG", {"quality": 90}),
+    ("PNG", {}),
+    ("GIF", {}),
+    ("BMP", {}),
+    ("WEBP", {"quality": 80}),
+])
+def test_index_regions_finds_image_data(fmt, options):
+    data = encode(fmt, **options)
+    regions = index_regions(data)
+    assert detect_format(data) == regions.format == fmt
+    assert 0 < regions.target_bytes < len(data)
+    assert all(0 < start < end <= len(data) for start, end in regions.targets)
+    assert regions.targets == sorted(regions.targets)
+
+
+def test_stacked_glitches_keep_the_targets(monkeypatch):
+    buf = CowBuffer(encode("JPEG", size=(512, 512), quality=90))
+    tracker = RegionTracker()
+    first = tracker.regions(buf)
+
+    # Lookups after the first index must not materialise the buffer
+    def tobytes(self):
+        raise AssertionError("RegionTracker materialised the buffer")
+    monkeypatch.setattr(CowBuffer, "tobytes", tobytes)
+
+    for seed in range(3):
+        header_size, targets = tracker.protection(buf, 500, True)
+        buf = engine.random_glitch(buf, 50, "Random", header_size, seed=seed, regions=targets)
+        assert tracker.regions(buf) is first
+
+
+def test_edit_to_protected_bytes_reindexes(png_buffer):
+    tracker = RegionTracker()
+    first = tracker.regions(png_buffer)
+    # Offset 33 is the length field of the chunk after IHDR
+    edited = png_buffer.copy()
+    edited.write(33, b"\x00\x00\x00\x04")
+    assert tracker.regions(edited) == index_regions(edited.tobytes()) != first
+
+
+def test_length_change_reindexes(png_bytes):
+    tracker = RegionTracker()
+    tracker.regions(png_bytes)
+    longer = png_bytes + b"\x00" * 16
+    assert tracker.regions(longer) == index_regions(longer)
+    assert tracker.regions(b"not an image at all") is None
+
+
+def test_copy_is_independent(png_buffer):
+    tracker = RegionTracker()
+    first = tracker.regions(png_buffer)
+    copy = tracker.copy()
+    tracker.regions(b"\x00" * 100)
+    assert copy.regions(png_buffer) is first
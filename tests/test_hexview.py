@@ -0,0 +1,66 @@
+"""The virtualised hex view formats only its window and finds modified bytes."""
+
+import pytest
+
+from hexglitcher import hexview
+from hexglitcher.buffer import CowBuffer
+from hexglitcher.hexview import (BYTES_PER_ROW, ascii_column, byte_index, format_rows, hex_column,
+                                 next_difference, offset_width, row_count)
+
+DATA = bytes(range(256)) * 4
+
+
+def test_rows_show_offset_hex_and_ascii():
+    rows = format_rows(DATA, 4, 2)
+    assert [row.offset for row in rows] == [64, 80]
+    assert rows[0].text == "00000040  " + " ".join(f"{b:02X}" for b in range(64, 80)) + "  @ABCDEFGHIJKLMNO"
+    assert rows[1].text.endswith("PQRSTUVWXYZ[\\]^_")
+    assert format_rows(b"\x00\x7f\xff", 0, 1)[0].text.endswith("  ...")
+
+
+def test_window_only_reads_its_rows(monkeypatch):
+    buf = CowBuffer(DATA)
+
+    def tobytes(self):
+        raise AssertionError("format_rows materialised the buffer")
+    monkeypatch.setattr(CowBuffer, "tobytes", tobytes)
+    last = format_rows(buf, row_count(len(DATA)) - 1, 10)
+    assert len(last) == 1 and last[0].offset == len(DATA) - BYTES_PER_ROW
+    assert format_rows(buf, row_count(len(DATA)), 10) == []
+
+
+def test_modified_columns_are_marked():
+    buf = CowBuffer(DATA)
+    edited = buf.copy()
+    edited.write(BYTES_PER_ROW + 3, b"\x00\x00")
+    rows = format_rows(edited, 0, 2, reference=buf)
+    assert rows[0].modified == [] and rows[1].modified == [3, 4]
+    # References of another length are ignored
+    assert format_rows(edited, 1, 1, reference=DATA[:-1])[0].modified == []
+
+
+def test_columns_map_back_to_bytes():
+    width = offset_width(len(DATA))
+    for index in (0, 7, BYTES_PER_ROW - 1):
+        assert byte_index(width, hex_column(width, index)) == index
+        assert byte_index(width, hex_column(width, index) + 1) == index
+        assert byte_index(width, ascii_column(width, index)) == index
+    assert byte_index(width, 0) is None
+    assert byte_index(width, hex_column(width, 0) + 2) is None
+    assert offset_width(1 << 40) == 10 and offset_width((1 << 40) + 1) == 11
+
+
+@pytest.mark.parametrize("shared_base", [True, False])
+def test_next_difference(monkeypatch, shared_base):
+    # Small chunks so the unshared case crosses chunk boundaries
+    monkeypatch.setattr(hexview, "SCAN_CHUNK", 100)
+    reference = CowBuffer(DATA) if shared_base else DATA
+    edited = CowBuffer(DATA)
+    edited.write(10, b"\xaa")
+    edited.write(517, b"\xbb")
+    # Writing a byte's own value is not a difference
+    edited.write(300, DATA[300:301])
+    assert next_difference(edited, reference) == 10
+    assert next_difference(edited, reference, 11) == 517
+    assert next_difference(edited, reference, 518) is None
+    assert next_difference(edited, DATA[:-1]) is None
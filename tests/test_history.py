@@ -0,0 +1,56 @@
+"""Undo/redo round trips for every kind of history step."""
+
+from array import array
+
+from hexglitcher import engine
+from hexglitcher.buffer import CowBuffer
+from hexglitcher.history import History, PatchStep, ReplaceStep, SpliceStep
+
+SOURCE = bytes(range(256)) * 16
+
+
+def test_patch_step_round_trip_returns_to_pristine():
+    original = CowBuffer(SOURCE)
+    history = History()
+    first = engine.random_glitch(original, 10, "Random", 16, seed=1, backend="python")
+    second = engine.random_glitch(first, 10, "Bitwise XOR", 16, seed=2, backend="python")
+    assert isinstance(history.push("a", original, first), PatchStep)
+    history.push("b", first, second)
+
+    back = history.undo(history.undo(second))
+    assert back.tobytes() == SOURCE
+    assert back.is_pristine
+
+    forward = history.redo(history.redo(back))
+    assert forward.tobytes() == second.tobytes()
+    # Cycles must not grow the overlay
+    again = history.redo(history.redo(history.undo(history.undo(forward))))
+    assert len(again.patches) == len(forward.patches)
+
+
+def test_splice_step_round_trip():
+    original = CowBuffer(SOURCE)
+    changed = CowBuffer(SOURCE[:100] + b"inserted" + SOURCE[140:])
+    history = History()
+    assert isinstance(history.push("splice", original, changed), SpliceStep)
+    assert history.undo(changed).tobytes() == SOURCE
+    assert history.redo(original).tobytes() == changed.tobytes()
+
+
+def test_replace_step_round_trip_for_both_lengths():
+    original = CowBuffer(SOURCE)
+    offsets = array("q", [offset for offset in range(0, len(SOURCE), 256)])
+    for replace in (b"\xaa", b"\xaa\xbb\xcc"):
+        result = engine.replace_matches(original, offsets, 1, replace)
+        history = History()
+        history.push_step(ReplaceStep("replace", offsets, b"\x00", replace))
+        undone = history.undo(result)
+        assert undone.tobytes() == SOURCE
+        assert history.redo(undone).tobytes() == result.tobytes()
+
+
+def test_same_length_replace_undo_is_pristine():
+    original = CowBuffer(SOURCE)
+    offsets = array("q", [0, 256, 512])
+    result = engine.replace_matches(original, offsets, 1, b"\xff")
+    assert ReplaceStep("r", offsets, b"\x00", b"\xff").undo(result).is_pristine
@@ -0,0 +1,81 @@
+"""Latest-request-wins workers run the newest job and drop stale results."""
+
+import threading
+import time
+
+import pytest
+
+from hexglitcher.buffer import CowBuffer
+from hexglitcher.live import LiveRunner
+from hexglitcher.preview import PreviewWorker
+
+
+def wait_for(worker, timeout: float = 5.0):
+    """Poll worker until it is idle, returning the last current result."""
+    deadline = time.monotonic() + timeout
+    while worker.busy:
+        assert time.monotonic() < deadline, "worker did not finish"
+        time.sleep(0.005)
+    return worker.poll()
+
+
+@pytest.fixture
+def runner():
+    runner = LiveRunner()
+    yield runner
+    runner.stop()
+
+
+def test_jobs_queued_behind_a_running_one_are_coalesced(runner):
+    started, release = threading.Event(), threading.Event()
+    ran = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        ran.append("slow")
+        return "slow"
+
+    first = runner.submit(slow)
+    assert started.wait(5)
+    for value in ("stale", "latest"):
+        runner.submit(lambda value=value: ran.append(value) or value)
+    # The running job's result is stale before it even finishes
+    assert not runner.is_current(first)
+    release.set()
+
+    result = wait_for(runner)
+    assert result.value == "latest" and result.error is None
+    assert ran == ["slow", "latest"]
+    assert runner.runs == 2 and runner.coalesced == 1
+
+
+def test_cancel_drops_the_running_result(runner):
+    release = threading.Event()
+    runner.submit(lambda: release.wait(5))
+    runner.cancel()
+    release.set()
+    assert wait_for(runner) is None
+
+
+def test_errors_are_delivered(runner):
+    def fail():
+        raise ValueError("bad parameters")
+
+    runner.submit(fail)
+    result = wait_for(runner)
+    assert result.value is None and result.error == "bad parameters"
+
+
+def test_preview_worker_renders_and_reports_broken_files(png_bytes):
+    worker = PreviewWorker((32, 32))
+    try:
+        generation = worker.submit(CowBuffer(png_bytes))
+        result = wait_for(worker)
+        assert result.generation == generation and max(result.image.size) == 32
+
+        worker.submit(b"\x00" * 64)
+        result = wait_for(worker)
+        assert result.image is None and result.error
+    finally:
+        worker.stop()
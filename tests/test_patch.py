@@ -0,0 +1,92 @@
+"""PatchSet merging and application, with and without NumPy."""
+
+import random
+
+import pytest
+
+from hexglitcher import patch
+from hexglitcher.buffer import CowBuffer
+from hexglitcher.patch import PatchSet
+
+BASE = bytes(range(256)) * 4
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(patch, "np", None)
+    elif patch.np is None:
+        pytest.skip("NumPy is not installed")
+    return request.param
+
+
+def reference(base: bytes, *edits) -> bytes:
+    """Apply (offsets, values) edit lists one by one, the slow obvious way."""
+    out = bytearray(base)
+    for offsets, values in edits:
+        for offset, value in zip(offsets, values):
+            out[offset] = value
+    return bytes(out)
+
+
+def test_from_edits_sorts_and_later_duplicates_win(backend):
+    patches = PatchSet.from_edits([9, 3, 9, 5, 3], [1, 2, 3, 4, 5])
+    assert list(patches.offsets) == [3, 5, 9]
+    assert list(patches.values) == [5, 4, 3]
+
+
+def test_merge_layers_new_edits_on_top(backend):
+    rng = random.Random(1)
+    first = ([rng.randrange(len(BASE)) for _ in range(300)], [rng.getrandbits(8) for _ in range(300)])
+    second = ([rng.randrange(len(BASE)) for _ in range(300)], [rng.getrandbits(8) for _ in range(300)])
+    merged = PatchSet.from_edits(*first).merge(*second)
+
+    assert list(merged.offsets) == sorted(set(merged.offsets))
+    out = bytearray(BASE)
+    merged.apply(out)
+    assert bytes(out) == reference(BASE, first, second)
+
+
+def test_merge_leaves_the_original_untouched(backend):
+    original = PatchSet.from_edits([1, 2], [7, 8])
+    original.merge([2, 3], [9, 9])
+    assert list(original.offsets) == [1, 2] and list(original.values) == [7, 8]
+
+
+def test_apply_writes_only_inside_the_window(backend):
+    patches = PatchSet.from_edits([2, 10, 11, 20], [0xAA, 0xBB, 0xCC, 0xDD])
+    window = bytearray(BASE[8:16])
+    patches.apply(window, base_offset=8)
+    assert window == bytes([8, 9, 0xBB, 0xCC, 12, 13, 14, 15])
+
+
+def test_prune_drops_writes_of_base_values(backend):
+    patches = PatchSet.from_edits([4, 5, 6], [4, 0, 6])
+    pruned = patches.prune(BASE)
+    assert list(pruned.offsets) == [5] and list(pruned.values) == [0]
+    kept = PatchSet.from_edits([5], [0])
+    assert kept.prune(BASE) is kept
+
+
+def test_first_difference():
+    a = PatchSet.from_edits([1, 5, 9], [1, 1, 1])
+    assert a.first_difference(a.merge([9], [1])) is None
+    assert a.first_difference(a.merge([7], [0])) == 7
+    assert a.first_difference(PatchSet()) == 1
+
+
+def test_cow_buffer_reads_through_the_overlay(backend):
+    buf = CowBuffer(BASE)
+    copy = buf.copy()
+    buf.write(100, b"\x00\x01\x02")
+    buf[0] = 0xFF
+    buf.scatter([101, 500], [9, 9])
+
+    expected = bytearray(BASE)
+    expected[100:103] = b"\x00\x09\x02"
+    expected[0] = 0xFF
+    expected[500] = 9
+    assert buf.tobytes() == bytes(expected)
+    assert buf[99:104] == bytes(expected[99:104])
+    assert b"".join(buf.iter_chunks(97)) == bytes(expected)
+    assert copy.is_pristine and copy.tobytes() == BASE
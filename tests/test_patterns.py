@@ -0,0 +1,84 @@
+"""Find/replace counts for hex, wildcard and regex patterns."""
+
+import re
+
+import pytest
+
+from hexglitcher import engine
+from hexglitcher.buffer import CowBuffer
+from hexglitcher.patterns import compile_pattern
+
+HEADER = 8
+DATA = b"\xff\xd8" * 4 + b"\xff\x00\xd8\xff\x01\x02\xd8\xff\xd8\xff\x10\xd8" * 10 + b"\xff\x00"
+
+
+def expected_count(regex: bytes) -> int:
+    """Non-overlapping matches after the header, as re.sub would count them."""
+    return len(list(re.compile(regex, re.DOTALL).finditer(DATA, HEADER)))
+
+
+@pytest.mark.parametrize("text, kind, regex", [
+    ("FF D8", "hex", rb"\xff\xd8"),
+    ("FF ?? D8", "wildcard", rb"\xff.\xd8"),
+    ("ff??d8", "wildcard", rb"\xff.\xd8"),
+    (r"\xff[\x00-\x0f]+\xd8", "regex", rb"\xff[\x00-\x0f]+\xd8"),
+    (r"\xff.{1,2}\xd8", "regex", rb"\xff.{1,2}\xd8"),
+])
+def test_find_replace_counts_every_match_once(text, kind, regex):
+    count = expected_count(regex)
+    assert count > 0
+    result, replaced = engine.find_replace(DATA, compile_pattern(text, kind), b"\x00", HEADER)
+    assert replaced == count
+    assert bytes(result) == DATA[:HEADER] + re.sub(regex, b"\x00", DATA[HEADER:], flags=re.DOTALL)
+
+
+def test_cow_buffer_and_bytes_agree():
+    pattern = compile_pattern("FF ?? D8", "wildcard")
+    plain, plain_count = engine.find_replace(DATA, pattern, b"\xaa\xbb\xcc", HEADER)
+    cow, cow_count = engine.find_replace(CowBuffer(DATA), pattern, b"\xaa\xbb\xcc", HEADER)
+    assert isinstance(cow, CowBuffer) and not cow.is_pristine
+    assert cow_count == plain_count and cow.tobytes() == bytes(plain)
+
+
+def test_limits_restrict_the_count():
+    pattern = compile_pattern("FF ?? D8", "wildcard")
+    total = expected_count(rb"\xff.\xd8")
+
+    _, capped = engine.find_replace(DATA, pattern, b"\x00", HEADER, max_count=3)
+    assert capped == 3
+
+    _, windowed = engine.find_replace(DATA, pattern, b"\x00", HEADER, window=(HEADER, HEADER + 24))
+    assert windowed == len(list(re.finditer(rb"\xff.\xd8", DATA[HEADER:HEADER + 24], re.DOTALL)))
+
+    _, some = engine.find_replace(DATA, pattern, b"\x00", HEADER, probability=0.5, seed=11)
+    _, again = engine.find_replace(DATA, pattern, b"\x00", HEADER, probability=0.5, seed=11)
+    assert 0 < some < total and some == again
+
+
+def test_regions_skip_matches_that_cross_them():
+    pattern = compile_pattern("FF ?? D8", "wildcard")
+    starts, _ = engine.find_spans(DATA, pattern, HEADER)
+    first = starts[0]
+    # A region ending inside the first match excludes it
+    spans = engine.find_spans(DATA, pattern, HEADER, regions=[(HEADER, first + 2), (first + 3, len(DATA))])
+    assert list(spans[0]) == list(starts[1:])
+
+
+def test_select_spans_keeps_file_order():
+    starts, ends = list(range(0, 100, 10)), list(range(5, 105, 10))
+    picked = engine.select_spans(starts, ends, 0.5, max_count=2, seed=3)
+    assert len(picked[0]) == 2 and list(picked[0]) == sorted(picked[0])
+    assert all(end - start == 5 for start, end in zip(*picked))
+
+
+@pytest.mark.parametrize("text, kind", [
+    ("FF ? D8", "wildcard"),
+    ("FF GG", "wildcard"),
+    ("", "regex"),
+    ("(", "regex"),
+    (r"\xff*", "regex"),
+    ("FF", "glob"),
+])
+def test_invalid_patterns_are_rejected(text, kind):
+    with pytest.raises(ValueError):
+        compile_pattern(text, kind)
@@ -0,0 +1,81 @@
+"""Pixel effects on decoded arrays and their round trip through the encoders."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from hexglitcher import pixel  # noqa: E402
+from hexglitcher.pixel import apply_pixel_effect, decode_pixels, luminance  # noqa: E402
+
+from .conftest import encode  # noqa: E402
+
+
+def image(height: int = 40, width: int = 53) -> "np.ndarray":
+    return np.random.default_rng(9).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def test_luminance_does_not_overflow():
+    pixels = image()
+    pixels[0, 0] = 255
+    wide = pixels.astype(np.int64)
+    expected = (wide[..., 0] * 77 + wide[..., 1] * 150 + wide[..., 2] * 29) >> 8
+    luma = luminance(pixels)
+    assert luma.dtype == np.uint8 and luma[0, 0] == 255
+    assert np.array_equal(luma, expected)
+
+
+def test_sort_orders_runs_and_keeps_other_pixels():
+    pixels = image()
+    low, high = 60, 180
+    result = pixel.pixel_sort(pixels, low, high)
+    luma, sorted_luma = luminance(pixels), luminance(result)
+    outside = (luma < low) | (luma > high)
+    assert np.array_equal(result[outside], pixels[outside])
+    for row, out in zip(pixels, result):
+        # Each row is a permutation of its own pixels
+        assert sorted(map(bytes, row)) == sorted(map(bytes, out))
+    inside = ~outside[:, 1:] & ~outside[:, :-1]
+    assert (sorted_luma[:, 1:][inside] >= sorted_luma[:, :-1][inside]).all()
+
+
+def test_vertical_sort_is_a_transposed_row_sort():
+    pixels = image()
+    expected = pixel.pixel_sort(pixels.transpose(1, 0, 2).copy(), 30, 220).transpose(1, 0, 2)
+    assert np.array_equal(pixel.pixel_sort(pixels, 30, 220, vertical=True), expected)
+
+
+def test_channel_shift_rolls_each_channel():
+    pixels = image()
+    result = pixel.channel_shift(pixels, [(3, -2), (0, 0)])
+    assert np.array_equal(result[..., 0], np.roll(pixels[..., 0], (-2, 3), axis=(0, 1)))
+    assert np.array_equal(result[..., 1:], pixels[..., 1:])
+
+
+def test_slices_are_seeded():
+    pixels = image()
+    first = pixel.slice_displace(pixels, 5, 10, seed=3)
+    assert np.array_equal(first, pixel.slice_displace(pixels, 5, 10, seed=3))
+    assert not np.array_equal(first, pixels)
+    assert np.array_equal(pixel.slice_displace(pixels, 0, 10, seed=3), pixels)
+
+
+@pytest.mark.parametrize("op", [
+    {"effect": "sort", "low": 200, "high": 100},
+    {"effect": "blur"},
+])
+def test_invalid_effects_are_rejected(op):
+    with pytest.raises(ValueError):
+        pixel.run_effect(image(), op)
+
+
+def test_png_round_trip_is_lossless(png_bytes):
+    op = {"effect": "channel_shift", "offsets": [[5, 1], [0, 0], [0, 0]]}
+    pixels, _ = decode_pixels(png_bytes)
+    result, _ = decode_pixels(apply_pixel_effect(png_bytes, op, workers=1))
+    assert np.array_equal(result, pixel.run_effect(pixels, op, workers=1))
+
+
+def test_jpeg_keeps_its_size_and_format():
+    data = encode("JPEG", quality=90)
+    result, source = decode_pixels(apply_pixel_effect(data, {"effect": "sort"}, workers=1))
+    assert source.format == "JPEG" and result.shape == decode_pixels(data)[0].shape
@@ -0,0 +1,57 @@
+"""PNG pixel-stream glitching keeps the container valid."""
+
+import io
+import struct
+import zlib
+
+import pytest
+from PIL import Image
+
+from hexglitcher import png
+
+
+def scanlines(data: bytes) -> bytes:
+    """Inflate the concatenated IDAT payloads of a PNG."""
+    idat = b"".join(bytes(data[offset:offset + length])
+                    for chunk_type, offset, length in png.iter_chunks(data) if chunk_type == b"IDAT")
+    return zlib.decompress(idat)
+
+
+@pytest.mark.parametrize("mode", ["Random", "Bitwise XOR"])
+def test_glitched_png_chunks_have_valid_crcs(png_bytes, mode):
+    result = png.glitch_png(png_bytes, 50, mode, seed=3).tobytes()
+    assert result[:len(png.PNG_SIGNATURE)] == png.PNG_SIGNATURE
+
+    types = []
+    for chunk_type, offset, length in png.iter_chunks(result):
+        (crc,) = struct.unpack(">I", result[offset + length:offset + length + 4])
+        assert crc == zlib.crc32(result[offset:offset + length], zlib.crc32(chunk_type))
+        types.append(chunk_type)
+    assert types[0] == b"IHDR" and types[-1] == b"IEND"
+
+    assert scanlines(result) != scanlines(png_bytes)
+    with Image.open(io.BytesIO(result)) as image:
+        image.load()
+
+
+def test_glitch_keeps_filter_bytes(png_bytes):
+    before, after = scanlines(png_bytes), scanlines(png.glitch_png(png_bytes, 5, "Increment", seed=4).tobytes())
+    row = 1 + 96 * 3
+    assert len(after) == len(before) == 64 * row
+    assert after[::row] == before[::row]
+
+
+def test_edit_count_does_not_depend_on_piece_size(png_bytes, monkeypatch):
+    # 18 KB of scanlines at 1/5000 is 3 edits, however the stream is split
+    monkeypatch.setattr(png, "INFLATE_PIECE", 1000)
+    before = scanlines(png_bytes)
+    after = scanlines(png.glitch_png(png_bytes, 5000, "Increment", seed=5).tobytes())
+    changed = sum(a != b for a, b in zip(before, after))
+    assert 1 <= changed <= 3
+
+
+def test_edit_budget_shares_out_every_edit():
+    budget = png.EditBudget(10_000, 700)
+    shares = [budget.take(999) for _ in range(11)]
+    assert sum(shares) == budget.edits == 14
+    assert max(shares) - min(shares[:10]) <= 1
@@ -0,0 +1,68 @@
+"""Partial re-decodes of restart-coded JPEGs match a full decode of the same bytes."""
+
+import random
+
+import pytest
+from PIL import ImageChops
+
+from hexglitcher.buffer import CowBuffer
+from hexglitcher.jpeg import patched_restart_markers, restart_candidates, restart_markers, scan_layout
+from hexglitcher.preview import IncrementalDecoder, render_thumbnail
+
+from .conftest import encode
+
+SIZE = (128, 128)
+
+
+@pytest.fixture
+def restart_jpeg() -> bytes:
+    return encode("JPEG", size=(256, 256), quality=90, restart_marker_rows=1)
+
+
+def same_pixels(a, b) -> bool:
+    return a.size == b.size and ImageChops.difference(a.convert("RGB"), b.convert("RGB")).getbbox() is None
+
+
+def test_edit_late_in_the_scan_is_redecoded_in_part(restart_jpeg, monkeypatch):
+    markers = restart_markers(restart_jpeg, scan_layout(restart_jpeg))
+    decoder = IncrementalDecoder()
+    buf = CowBuffer(restart_jpeg)
+    decoder.render(buf, SIZE)
+
+    def tobytes(self):
+        raise AssertionError("IncrementalDecoder materialised the buffer")
+    monkeypatch.setattr(CowBuffer, "tobytes", tobytes)
+
+    for index in (-3, -6):
+        buf = buf.copy()
+        buf.write((markers[index] + markers[index + 1]) // 2, b"\x00\x13")
+        image = decoder.render(buf, SIZE)
+        monkeypatch.undo()
+        assert same_pixels(image, render_thumbnail(buf, SIZE))
+        monkeypatch.setattr(CowBuffer, "tobytes", tobytes)
+    assert (decoder.full_decodes, decoder.partial_decodes) == (1, 2)
+
+
+def test_header_edit_is_decoded_in_full(restart_jpeg):
+    decoder = IncrementalDecoder()
+    decoder.render(CowBuffer(restart_jpeg), SIZE)
+    edited = CowBuffer(restart_jpeg)
+    # A different quantisation value changes every row
+    edited.write(restart_jpeg.index(b"\xff\xdb") + 10, b"\x40")
+    assert same_pixels(decoder.render(edited, SIZE), render_thumbnail(edited, SIZE))
+    assert decoder.full_decodes == 2 and decoder.partial_decodes == 0
+
+
+def test_patched_markers_match_a_full_scan(restart_jpeg):
+    layout = scan_layout(restart_jpeg)
+    candidates = restart_candidates(restart_jpeg, layout)
+    markers = restart_markers(restart_jpeg, layout)
+    rng = random.Random(4)
+    for _ in range(200):
+        buf = CowBuffer(restart_jpeg)
+        for _ in range(rng.randint(1, 6)):
+            # Aim at and around existing markers, where edits create or destroy them
+            offset = rng.choice(markers) + rng.randint(-1, 2) if rng.random() < 0.5 else \
+                rng.randrange(layout.scan_start, len(restart_jpeg))
+            buf.write(offset, bytes([rng.choice([0xFF, 0xD0 + rng.randrange(8), rng.randrange(256)])]))
+        assert patched_restart_markers(buf, layout, candidates) == restart_markers(buf.tobytes(), layout)
@@ -0,0 +1,42 @@
+"""Frame sequences keep same-named frames from different folders apart."""
+
+import os
+
+import pytest
+
+from hexglitcher.recipe import Recipe
+from hexglitcher.sequence import run_sequence, sort_frames
+
+RECIPE = Recipe([{"op": "write", "offset": 40, "data": "00"}])
+
+
+def write_frames(root, png_bytes, *names):
+    for name in names:
+        path = root.joinpath(*name.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(png_bytes)
+
+
+def test_frames_sort_naturally_by_relative_path(tmp_path):
+    paths = [str(tmp_path / d / f) for d, f in
+             [("b", "f_1.png"), ("a", "f_10.png"), ("a", "f_2.png"), ("b", "f_0.png")]]
+    assert [name for _, name in sort_frames(paths)] == [
+        os.path.join("a", "f_2.png"), os.path.join("a", "f_10.png"),
+        os.path.join("b", "f_0.png"), os.path.join("b", "f_1.png")]
+
+
+def test_same_named_frames_do_not_overwrite_each_other(tmp_path, png_bytes):
+    write_frames(tmp_path / "in", png_bytes, "shot_a/0001.png", "shot_b/0001.png")
+    out = tmp_path / "out"
+    results = list(run_sequence([str(tmp_path / "in" / "**" / "*.png")], str(out), RECIPE, workers=1))
+
+    assert all(result.ok for result in results)
+    assert [result.output for result in results] == [str(out / "shot_a" / "0001.png"),
+                                                     str(out / "shot_b" / "0001.png")]
+    assert all(os.path.exists(result.output) for result in results)
+
+
+def test_output_over_an_input_frame_is_rejected(tmp_path, png_bytes):
+    write_frames(tmp_path, png_bytes, "0001.png", "0002.png")
+    with pytest.raises(ValueError, match="must not contain"):
+        next(run_sequence([str(tmp_path)], str(tmp_path), RECIPE, workers=1))
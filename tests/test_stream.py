@@ -0,0 +1,63 @@
+"""Streamed find/replace matches the whole-file result."""
+
+import mmap
+import random
+
+import pytest
+
+from hexglitcher import batch
+from hexglitcher.buffer import mapped_file
+from hexglitcher.patterns import compile_pattern, match_length
+from hexglitcher.stream import stream_glitch
+
+
+def sample(size: int = 20_000) -> bytes:
+    """Random bytes salted with FF..D8 runs of varying length."""
+    rng = random.Random(7)
+    data = bytearray(rng.getrandbits(8) for _ in range(size))
+    for _ in range(400):
+        at = rng.randrange(size - 40)
+        run = rng.randrange(0, 30)
+        data[at:at + run + 2] = b"\xff" + bytes(rng.choice(b"\x01\x02\x03") for _ in range(run)) + b"\xd8"
+    return bytes(data)
+
+
+@pytest.mark.parametrize("text, kind, max_match", [
+    ("FF 01", "hex", None),
+    ("FF ?? ?? D8", "wildcard", None),
+    (r"\xff[\x01-\x03]*\xd8", "regex", 32),
+])
+@pytest.mark.parametrize("chunk_size", [97, 1024, 1 << 20])
+def test_stream_equals_in_memory(tmp_path, text, kind, max_match, chunk_size):
+    data = sample()
+    source = tmp_path / "in.jpg"
+    source.write_bytes(data)
+    find = compile_pattern(text, kind)
+    params = {"header_size": 64, "protect": "header", "intensity": 0, "mode": "Random", "find": find,
+              "max_match": max_match if max_match is not None else match_length(text, kind),
+              "replace": b"\x00\x11\x22"}
+
+    expected = bytes(batch.glitch_data(data, params, seed=1))
+    result = stream_glitch(str(source), str(tmp_path / "out.jpg"), params, seed=1, chunk_size=chunk_size)
+
+    assert (tmp_path / "out.jpg").read_bytes() == expected
+    assert result.replaced > 0
+    assert result.bytes_written == len(expected)
+
+
+def test_match_length_by_kind():
+    assert match_length("FF D8 00", "hex") == 3
+    assert match_length("FF ?? D8", "wildcard") == 3
+    assert match_length(r"\xff.+", "regex") is None
+
+
+def test_mapped_file_closes_the_mapping(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"\x01" * 4096)
+    with mapped_file(str(path)) as data:
+        assert isinstance(data, mmap.mmap) and data[0] == 1
+    assert data.closed
+
+    path.write_bytes(b"")
+    with mapped_file(str(path)) as data:
+        assert data == b""
@@ -0,0 +1,78 @@
+"""Banded processing gives the same result as processing the whole image."""
+
+from functools import partial
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from hexglitcher import pixel, tiling  # noqa: E402
+from hexglitcher.tiling import map_bands, split_bands  # noqa: E402
+
+
+def image(height: int = 61, width: int = 37) -> "np.ndarray":
+    return np.random.default_rng(5).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+# Module-level kernels, so process pools can pickle them
+
+def _roll(tile: "np.ndarray", first_row: int, shift: int) -> "np.ndarray":
+    return np.roll(tile, shift, axis=0)
+
+
+def _row_ramp(tile: "np.ndarray", first_row: int) -> "np.ndarray":
+    rows = np.arange(first_row, first_row + len(tile)) % 256
+    return tile ^ rows.astype(np.uint8)[:, None, None]
+
+
+@pytest.mark.parametrize("bands", [1, 2, 3, 7, 61])
+@pytest.mark.parametrize("axis", [0, 1])
+def test_wrapped_overlap_matches_untiled_roll(bands, axis):
+    pixels = image()
+    out = map_bands(pixels, partial(_roll, shift=5), overlap=5, axis=axis, wrap=True, workers=4, bands=bands)
+    assert np.array_equal(out, np.roll(pixels, 5, axis=axis))
+
+
+@pytest.mark.parametrize("bands", [2, 5])
+def test_kernel_sees_image_rows(bands):
+    pixels = image()
+    out = map_bands(pixels, _row_ramp, workers=3, bands=bands)
+    assert np.array_equal(out, _row_ramp(pixels, 0))
+
+
+def test_process_mode_matches_thread_mode():
+    pixels = image()
+    kernel = partial(_roll, shift=-3)
+    threads = map_bands(pixels, kernel, overlap=3, wrap=True, workers=2, bands=3)
+    processes = map_bands(pixels, kernel, overlap=3, wrap=True, workers=2, bands=3, mode="process")
+    assert np.array_equal(processes, threads)
+    assert np.array_equal(processes, np.roll(pixels, -3, axis=0))
+
+
+@pytest.mark.parametrize("op, untiled", [
+    ({"effect": "sort", "low": 40, "high": 200}, lambda p: pixel.pixel_sort(p, 40, 200)),
+    ({"effect": "sort", "low": 40, "high": 200, "vertical": True},
+     lambda p: pixel.pixel_sort(p, 40, 200, vertical=True)),
+    ({"effect": "channel_shift", "offsets": [[4, -7], [0, 0], [-4, 7]]},
+     lambda p: pixel.channel_shift(p, [(4, -7), (0, 0), (-4, 7)])),
+    ({"effect": "slices", "count": 6, "max_shift": 9, "seed": 2},
+     lambda p: pixel.slice_displace(p, 6, 9, seed=2)),
+])
+def test_effects_match_untiled_kernels(monkeypatch, op, untiled):
+    # Force several bands even on a small image
+    monkeypatch.setattr(tiling, "MIN_BAND_PIXELS", 1)
+    pixels = image()
+    assert np.array_equal(pixel.run_effect(pixels, op, workers=4), untiled(pixels))
+
+
+def test_split_bands_cover_every_row_once():
+    bands = split_bands(10, 3, overlap=2)
+    assert [(band.start, band.stop) for band in bands] == [(0, 3), (3, 6), (6, 10)]
+    assert bands[0].before == 0 and bands[-1].after == 0
+    assert all(band.before == 2 for band in split_bands(10, 3, overlap=2, wrap=True))
+    assert len(split_bands(2, 5)) == 2
+
+
+def test_wrong_tile_shape_is_an_error():
+    with pytest.raises(ValueError):
+        map_bands(image(), lambda tile, first_row: tile[1:], workers=2, bands=2)
@@ -0,0 +1,112 @@
+"""precheck accepts decodable files and rejects certain failures without decoding."""
+
+import zlib
+
+import pytest
+
+from hexglitcher import engine, validity
+from hexglitcher.buffer import CowBuffer
+from hexglitcher.formats import index_regions
+from hexglitcher.png import _chunk, iter_chunks
+from hexglitcher.validity import decode_error, precheck, retry_until_decodable
+
+from .conftest import encode
+
+
+@pytest.fixture
+def no_materialise(monkeypatch):
+    """Fail the test if a check copies a whole CowBuffer."""
+    def tobytes(self):
+        raise AssertionError("precheck materialised the buffer")
+    monkeypatch.setattr(CowBuffer, "tobytes", tobytes)
+
+
+def edited(data: bytes, offset: int, value: bytes) -> CowBuffer:
+    buf = CowBuffer(data)
+    buf.write(offset, value)
+    return buf
+
+
+def with_filter_byte(png: bytes, value: int) -> bytes:
+    """Re-encode a PNG with its first row filter type set to value."""
+    idat = b"".join(png[offset:offset + length] for kind, offset, length in iter_chunks(png) if kind == b"IDAT")
+    raw = bytearray(zlib.decompress(idat))
+    raw[0] = value
+    head = png[:png.index(b"IDAT") - 4]
+    return head + _chunk(b"IDAT", zlib.compress(bytes(raw))) + _chunk(b"IEND", b"")
+
+
+@pytest.mark.parametrize("fmt, options", [
+    ("JPEG", {"quality": 90}), ("PNG", {}), ("BMP", {}), ("GIF", {}), ("WEBP", {"quality": 80}),
+])
+def test_target_edits_pass(fmt, options, no_materialise):
+    data = encode(fmt, **options)
+    start, end = index_regions(data).targets[0]
+    # Rewrite a target byte with its own value: the check reads through the
+    # patch, and the file stays decodable whatever the encoder produced
+    middle = (start + end) // 2
+    buf = edited(data, middle, data[middle:middle + 1])
+    assert not buf.is_pristine
+    assert precheck(data) is None
+    assert precheck(buf) is None
+
+
+def test_damaged_jpeg_frame_is_rejected(jpeg_bytes, no_materialise):
+    sof = jpeg_bytes.index(b"\xff\xc0")
+    # Zero the frame width
+    assert precheck(edited(jpeg_bytes, sof + 7, b"\x00\x00")) is not None
+
+
+def test_png_filter_bytes_are_checked(png_bytes, no_materialise):
+    assert precheck(with_filter_byte(png_bytes, 4)) is None
+    assert "filter" in precheck(CowBuffer(with_filter_byte(png_bytes, 9)))
+
+
+def test_png_ihdr_checksum_is_checked(png_bytes, no_materialise):
+    assert precheck(edited(png_bytes, 29, b"\x00\x00\x00\x00")) is not None
+
+
+def test_truncated_bmp_is_rejected(no_materialise):
+    data = encode("BMP")
+    assert "larger than the file" in precheck(data[:len(data) // 2])
+
+
+def test_damaged_webp_signature_is_rejected(no_materialise):
+    data = encode("WEBP", quality=80)
+    assert data[12:16] == b"VP8 "
+    assert precheck(edited(data, 23, b"\x00")) is not None
+
+
+def test_unknown_header_is_rejected():
+    assert precheck(b"\x00" * 64) is not None
+
+
+def test_decode_error_reports_broken_files(png_bytes):
+    assert decode_error(CowBuffer(png_bytes)) is None
+    assert decode_error(with_filter_byte(png_bytes, 9)) is not None
+
+
+def test_retry_returns_the_first_decodable_seed(jpeg_bytes, monkeypatch):
+    tried = []
+
+    def glitch(seed):
+        tried.append(seed)
+        # Only the third attempt leaves the header intact
+        return CowBuffer(jpeg_bytes) if len(tried) == 3 else b"\x00" * 64
+
+    result = retry_until_decodable(glitch, seed=1, budget=5)
+    assert result.attempts == 3 and result.seed == tried[-1]
+    assert result.data.tobytes() == jpeg_bytes
+
+
+def test_retry_gives_up_after_max_attempts():
+    result = retry_until_decodable(lambda seed: b"\x00" * 64, seed=1, budget=5, max_attempts=4)
+    assert result == validity.RetryResult(None, None, 4)
+
+
+def test_random_glitches_that_pass_decode(jpeg_bytes):
+    buf = CowBuffer(jpeg_bytes)
+    targets = index_regions(jpeg_bytes).targets
+    result = retry_until_decodable(
+        lambda seed: engine.random_glitch(buf, 2000, "Random", 0, seed=seed, regions=targets), seed=2, budget=5)
+    assert result.data is not None and decode_error(result.data) is None